@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Measure trunk staging throughput on a synthetic plugin tree."""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taxjar_release import staging  # noqa: E402
+from taxjar_release.manifest import Manifest, ManifestEntry  # noqa: E402
+from taxjar_release.sync import file_digest, sync_tree  # noqa: E402
+
+
+def make_tree(root: str, files: int, seed: int = 0) -> Manifest:
+    """
+    Create a tree of PHP-sized files spread over nested directories.
+
+    Args:
+        root: Directory to fill
+        files: Number of files
+        seed: Random seed for sizes and layout
+
+    Returns:
+        Manifest of the created files
+    """
+    rng = random.Random(seed)
+    entries = []
+    for i in range(files):
+        directory = f'includes/module-{i % 50}/sub-{i % 7}'
+        path = f'{directory}/class-{i}.php'
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Most plugin files are a few KB; a few are much larger.
+        size = int(rng.lognormvariate(8.5, 1.0))
+        with open(full_path, 'wb') as f:
+            f.write(rng.randbytes(size))
+        entries.append(ManifestEntry(path=path, size=size, sha256=file_digest(full_path)))
+    return Manifest(entries)
+
+
+def time_sync(source: str, target: str, manifest: Manifest, workers: int) -> float:
+    """Return seconds taken to sync source into target."""
+    start = time.perf_counter()
+    sync_tree(source, target, manifest, max_workers=workers)
+    return time.perf_counter() - start
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the benchmark and print throughput per configuration."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=10000, help='Files in the tree (default: 10000)')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per configuration (default: 3)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, staging.STAGE_WORKERS],
+                        help=f'Worker counts to compare (default: 1 {staging.STAGE_WORKERS})')
+    parser.add_argument('--dir', help='Where to build the trees (default: system temp dir)')
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='staging-bench-', dir=args.dir)
+    try:
+        source = os.path.join(root, 'source')
+        manifest = make_tree(source, args.files)
+        megabytes = manifest.total_size / 1e6
+        print(f'{len(manifest)} files, {megabytes:.1f} MB in {root}')
+
+        print(f'\n{"workers":>7} {"fresh":>9} {"files/s":>9} {"MB/s":>7} {"unchanged":>10}')
+        for workers in args.workers:
+            fresh, resync = [], []
+            for run in range(args.runs):
+                target = os.path.join(root, f'target-{workers}-{run}')
+                os.mkdir(target)
+                fresh.append(time_sync(source, target, manifest, workers))
+                resync.append(time_sync(source, target, manifest, workers))
+                shutil.rmtree(target)
+            median = statistics.median(fresh)
+            print(f'{workers:>7} {median:>8.2f}s {len(manifest) / median:>9.0f} '
+                  f'{megabytes / median:>7.1f} {statistics.median(resync):>9.2f}s')
+
+        method = staging.copy_file(os.path.join(source, next(iter(manifest)).path), os.path.join(root, 'probe'))
+        print(f'\nCopy method on this filesystem: {method}')
+    finally:
+        shutil.rmtree(root)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Compare SVN deploy checkout modes against the plugin repository."""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taxjar_release.svn import CHECKOUT_MODES, SVNDeployManager  # noqa: E402
+
+
+def checkout_once(mode: str, url: str) -> Dict[str, float]:
+    """
+    Run one checkout in a fresh directory.
+
+    Args:
+        mode: Checkout mode
+        url: Repository URL
+
+    Returns:
+        Seconds taken and number of files and directories checked out
+    """
+    manager = SVNDeployManager(checkout_mode=mode)
+    manager.SVN_URL = url
+    manager._temp_dir = tempfile.mkdtemp(prefix='svn-bench-')
+    try:
+        start = time.perf_counter()
+        manager._checkout_repo()
+        seconds = time.perf_counter() - start
+        entries = sum(
+            len(dirs) + len(files)
+            for root, dirs, files in os.walk(manager._temp_dir)
+            if '.svn' not in root.split(os.sep)
+        )
+    finally:
+        shutil.rmtree(manager._temp_dir)
+    return {'seconds': seconds, 'entries': entries}
+
+
+def main(argv: List[str] = None) -> int:
+    """Benchmark each checkout mode and print a summary."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default=SVNDeployManager.SVN_URL, help='Repository URL')
+    parser.add_argument('--runs', type=int, default=3, help='Checkouts per mode (default: 3)')
+    parser.add_argument('--modes', nargs='+', choices=CHECKOUT_MODES, default=list(CHECKOUT_MODES))
+    args = parser.parse_args(argv)
+
+    results = {}
+    for run in range(args.runs):
+        # Alternate the order so neither mode always gets a warm server cache.
+        modes = args.modes if run % 2 == 0 else list(reversed(args.modes))
+        for mode in modes:
+            results.setdefault(mode, []).append(checkout_once(mode, args.url))
+
+    print(f'\n{"mode":<8} {"median":>8} {"min":>8} {"max":>8} {"entries":>8}')
+    for mode in args.modes:
+        seconds = [r['seconds'] for r in results[mode]]
+        print(f'{mode:<8} {statistics.median(seconds):>7.2f}s {min(seconds):>7.2f}s '
+              f'{max(seconds):>7.2f}s {results[mode][0]["entries"]:>8.0f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""Agent-local cache directory shared across builds."""
+import os
+from typing import Optional
+
+
+CACHE_DIR_ENV = 'RELEASE_TOOL_CACHE_DIR'
+
+
+def cache_dir(name: str) -> Optional[str]:
+    """
+    Return a named subdirectory of the agent cache, creating it if needed.
+
+    Caching across builds is opt-in: nothing is written unless
+    RELEASE_TOOL_CACHE_DIR points at a directory on the agent.
+
+    Args:
+        name: Subdirectory for one kind of cached data
+
+    Returns:
+        Directory path, or None if no cache is configured or it is unusable
+    """
+    root = os.getenv(CACHE_DIR_ENV)
+    if not root:
+        return None
+
+    path = os.path.join(root, name)
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError:
+        return None
+    return path
@@ -1,17 +1,33 @@
 """CLI interface for release automation."""
 import argparse
 import os
+import re
+import shlex
+import signal
 import sys
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from .validators import VersionValidator
 from .version import VersionDetector
 from .github import GitHubReleaseManager
-from .svn import SVNDeployManager
+from .svn import CHECKOUT_MODES, CHECKOUT_SPARSE, SVNDeployManager
+from .verify import ReleaseVerifier
+from .matrix import MATRIX_FILE, VersionMatrixRefresher
+from .cache import cache_dir
+from .deadline import BUDGET_ENV, Deadline
+from .tracing import TRACE_FILE_ENV, Tracer, set_tracer
 from .clients.git import GitClient
 from .clients.buildkite import BuildkiteClient
 from .clients.wordpress import WordPressClient
 from .clients.subprocess_runner import SubprocessRunner
+from .clients.cassette import RecordingSubprocessRunner, ReplayingSubprocessRunner
+
+
+CASSETTE_RECORD_ENV = 'RELEASE_CASSETTE_RECORD'
+CASSETTE_REPLAY_ENV = 'RELEASE_CASSETTE_REPLAY'
+CASSETTE_TIME_SCALE_ENV = 'RELEASE_CASSETTE_TIME_SCALE'
+VERIFY_TIMEOUT_SECONDS = 300
+VARIABLE_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -20,6 +36,17 @@ def create_parser() -> argparse.ArgumentParser:
         description='TaxJar WooCommerce Release Automation',
         prog='release-tool',
     )
+    parser.add_argument(
+        '--trace',
+        metavar='FILE',
+        help=f'Write a Chrome trace of external calls to FILE (uses {TRACE_FILE_ENV} env if not provided)',
+    )
+    parser.add_argument(
+        '--budget',
+        type=float,
+        metavar='SECONDS',
+        help=f'Total time budget for external commands (uses {BUDGET_ENV} env if not provided)',
+    )
 
     subparsers = parser.add_subparsers(dest='command', required=True)
 
@@ -54,6 +81,80 @@ def create_parser() -> argparse.ArgumentParser:
         '--version',
         help='Version to deploy (uses VERSION env if not provided)',
     )
+    svn_parser.add_argument(
+        '--checkout',
+        choices=CHECKOUT_MODES,
+        default=os.getenv('SVN_CHECKOUT_MODE', CHECKOUT_SPARSE),
+        help='Check out trunk alone, or the root at depth immediates with trunk expanded '
+             '(default: SVN_CHECKOUT_MODE or sparse)',
+    )
+    svn_parser.add_argument(
+        '--no-cache',
+        dest='use_cache',
+        action='store_false',
+        help='Check out afresh instead of reusing the working copy under RELEASE_TOOL_CACHE_DIR',
+    )
+
+    # verify-release
+    verify_parser = subparsers.add_parser(
+        'verify-release',
+        help='Wait for a release to appear on WordPress.org',
+    )
+    verify_parser.add_argument(
+        '--version',
+        help='Version to verify (uses VERSION env if not provided)',
+    )
+    verify_parser.add_argument(
+        '--timeout',
+        type=float,
+        default=VERIFY_TIMEOUT_SECONDS,
+        metavar='SECONDS',
+        help=f'How long to wait for the version to appear (default: {VERIFY_TIMEOUT_SECONDS:.0f})',
+    )
+
+    # matrix-refresh
+    matrix_parser = subparsers.add_parser(
+        'matrix-refresh',
+        help='Update version-matrix.sh with the latest WooCommerce/WordPress versions',
+    )
+    matrix_parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Do not write; exit 1 if the matrix is out of date or a warning is raised',
+    )
+    matrix_parser.add_argument(
+        '--matrix-file',
+        default=MATRIX_FILE,
+        help=f'Matrix file to update (default: {MATRIX_FILE})',
+    )
+    matrix_parser.add_argument(
+        '--plugin-file',
+        default=VersionDetector.PLUGIN_FILE,
+        help=f'Plugin file with the "WC tested up to" header (default: {VersionDetector.PLUGIN_FILE})',
+    )
+
+    # meta
+    meta_parser = subparsers.add_parser(
+        'meta',
+        help='Read Buildkite meta-data',
+    )
+    meta_subparsers = meta_parser.add_subparsers(dest='meta_command', required=True)
+    export_parser = meta_subparsers.add_parser(
+        'export',
+        help='Export meta-data keys as environment variables',
+    )
+    export_parser.add_argument(
+        'keys',
+        nargs='+',
+        metavar='KEY[=VAR]',
+        help='Meta-data key, optionally with the variable name to export it as',
+    )
+    export_parser.add_argument(
+        '--print',
+        dest='print_exports',
+        action='store_true',
+        help='Print shell export statements for eval instead of writing BUILDKITE_ENV_FILE',
+    )
 
     return parser
 
@@ -71,35 +172,134 @@ def main(argv: Optional[List[str]] = None) -> int:
     parser = create_parser()
     args = parser.parse_args(argv)
 
-    try:
-        if args.command == 'validate-version':
-            return cmd_validate_version()
-
-        elif args.command == 'detect-version':
-            return cmd_detect_version()
+    budget = args.budget if args.budget is not None else _env_float(BUDGET_ENV)
+    deadline = Deadline.from_budget(budget)
+    if not deadline.unlimited:
+        _exit_on_sigterm()
 
-        elif args.command == 'github-release':
-            version = args.version or os.getenv('VERSION')
-            return cmd_github_release(version)
+    trace_file = args.trace or os.getenv(TRACE_FILE_ENV)
+    tracer = Tracer(enabled=bool(trace_file))
+    previous_tracer = set_tracer(tracer)
 
-        elif args.command == 'svn-deploy':
-            version = args.version or os.getenv('VERSION')
-            return cmd_svn_deploy(version)
+    try:
+        with tracer.stage(args.command):
+            return run_command(args, deadline)
 
     except Exception as e:
         print(f'ERROR: {e}', file=sys.stderr)
         return 1
 
+    finally:
+        set_tracer(previous_tracer)
+        if trace_file:
+            write_trace(tracer, trace_file)
+
+
+def run_command(args: argparse.Namespace, deadline: Optional[Deadline] = None) -> int:
+    """
+    Dispatch a parsed command.
+
+    Args:
+        args: Parsed command line arguments
+        deadline: Release time budget for external commands
+
+    Returns:
+        Exit code (0 for success, 1 for failure)
+    """
+    if args.command == 'validate-version':
+        return cmd_validate_version()
+
+    elif args.command == 'detect-version':
+        return cmd_detect_version()
+
+    elif args.command == 'github-release':
+        version = args.version or os.getenv('VERSION')
+        return cmd_github_release(version, deadline)
+
+    elif args.command == 'svn-deploy':
+        version = args.version or os.getenv('VERSION')
+        return cmd_svn_deploy(version, deadline, args.checkout, args.use_cache)
+
+    elif args.command == 'verify-release':
+        version = args.version or os.getenv('VERSION')
+        return cmd_verify_release(version, args.timeout, deadline)
+
+    elif args.command == 'matrix-refresh':
+        return cmd_matrix_refresh(args.matrix_file, args.plugin_file, args.check)
+
+    elif args.command == 'meta' and args.meta_command == 'export':
+        return cmd_meta_export(args.keys, args.print_exports)
+
     return 0
 
 
+def _env_float(name: str) -> Optional[float]:
+    """Read a float from the environment, ignoring unset or empty values."""
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+def _exit_on_sigterm() -> None:
+    """
+    Turn SIGTERM into SystemExit.
+
+    Commands with a timeout run in their own process group, so they do not
+    receive the agent's SIGTERM on cancellation. Unwinding lets the runner
+    terminate those groups instead of leaving them orphaned.
+    """
+    def handler(signum, frame):
+        raise SystemExit(128 + signum)
+
+    signal.signal(signal.SIGTERM, handler)
+
+
+def write_trace(tracer: Tracer, path: str) -> None:
+    """Write the trace file without masking the command's own result."""
+    try:
+        tracer.write(path)
+        print(f'Trace written to {path}', file=sys.stderr)
+    except OSError as e:
+        print(f'WARNING: Failed to write trace {path}: {e}', file=sys.stderr)
+
+
+def create_runner() -> SubprocessRunner:
+    """
+    Create the SubprocessRunner for a command.
+
+    Replays from RELEASE_CASSETTE_REPLAY or records to
+    RELEASE_CASSETTE_RECORD when set; runs commands directly otherwise.
+    """
+    replay_path = os.getenv(CASSETTE_REPLAY_ENV)
+    if replay_path:
+        time_scale = float(os.getenv(CASSETTE_TIME_SCALE_ENV, '0'))
+        return ReplayingSubprocessRunner(replay_path, time_scale=time_scale)
+
+    record_path = os.getenv(CASSETTE_RECORD_ENV)
+    if record_path:
+        return RecordingSubprocessRunner(
+            record_path,
+            secrets_to_redact=[
+                os.getenv('WORDPRESS_SVN_PASSWORD', ''),
+                os.getenv('GITHUB_TOKEN', ''),
+            ],
+            autosave=True,
+        )
+
+    return SubprocessRunner()
+
+
 def cmd_validate_version() -> int:
     """Run version validation."""
     git_client = GitClient()
-    buildkite_client = BuildkiteClient()
+    buildkite_client = BuildkiteClient(runner=create_runner(), buffered=True, asynchronous=True)
 
-    validator = VersionValidator(git_client, buildkite_client)
-    result = validator.validate()
+    try:
+        validator = VersionValidator(git_client, buildkite_client)
+        result = validator.validate()
+    finally:
+        # Failed or abandoned side-channel calls are reported by close();
+        # writes later steps depend on were made with required=True.
+        buildkite_client.close()
 
     return 0 if result.success else 1
 
@@ -107,29 +307,39 @@ def cmd_validate_version() -> int:
 def cmd_detect_version() -> int:
     """Run version detection."""
     git_client = GitClient()
-    buildkite_client = BuildkiteClient()
+    buildkite_client = BuildkiteClient(runner=create_runner(), buffered=True, asynchronous=True)
     wordpress_client = WordPressClient()
 
-    detector = VersionDetector(git_client, buildkite_client, wordpress_client)
-    result = detector.detect()
+    try:
+        detector = VersionDetector(git_client, buildkite_client, wordpress_client)
+        result = detector.detect()
+    finally:
+        # Failed or abandoned side-channel calls are reported by close();
+        # writes later steps depend on were made with required=True.
+        buildkite_client.close()
 
     return 0 if result.success else 1
 
 
-def cmd_github_release(version: Optional[str]) -> int:
+def cmd_github_release(version: Optional[str], deadline: Optional[Deadline] = None) -> int:
     """Create GitHub release."""
     if not version:
         print('ERROR: VERSION not provided', file=sys.stderr)
         return 1
 
-    runner = SubprocessRunner()
-    manager = GitHubReleaseManager(runner=runner)
+    runner = create_runner()
+    manager = GitHubReleaseManager(runner=runner, deadline=deadline)
     manager.create_release(version)
 
     return 0
 
 
-def cmd_svn_deploy(version: Optional[str]) -> int:
+def cmd_svn_deploy(
+    version: Optional[str],
+    deadline: Optional[Deadline] = None,
+    checkout_mode: str = CHECKOUT_SPARSE,
+    use_cache: bool = True,
+) -> int:
     """Deploy to WordPress.org SVN."""
     if not version:
         print('ERROR: VERSION not provided', file=sys.stderr)
@@ -143,12 +353,141 @@ def cmd_svn_deploy(version: Optional[str]) -> int:
               file=sys.stderr)
         return 1
 
-    runner = SubprocessRunner()
-    manager = SVNDeployManager(runner=runner)
+    runner = create_runner()
+    manager = SVNDeployManager(
+        runner=runner,
+        deadline=deadline,
+        checkout_mode=checkout_mode,
+        cache_dir=cache_dir('svn') if use_cache else None,
+    )
     manager.deploy(version, username, password)
 
     return 0
 
 
+def cmd_verify_release(
+    version: Optional[str],
+    timeout: float = VERIFY_TIMEOUT_SECONDS,
+    deadline: Optional[Deadline] = None,
+) -> int:
+    """Wait for a release to appear on WordPress.org and report the latency."""
+    if not version:
+        print('ERROR: VERSION not provided', file=sys.stderr)
+        return 1
+
+    if deadline and not deadline.unlimited:
+        timeout = min(timeout, deadline.remaining())
+
+    print('--- Waiting for WordPress.org to update')
+    # The verifier polls on its own; transport retries would overrun the deadline.
+    wordpress_client = WordPressClient(session=WordPressClient.create_session(retry=False))
+    verifier = ReleaseVerifier(wordpress_client)
+    result = verifier.verify(version, Deadline(timeout))
+
+    print(f'+++ {result.message}' if result.success else result.message)
+    if result.tag_latency is not None:
+        print(f'SVN tag {version} visible after {result.tag_latency:.1f}s')
+
+    print('+++ Release Complete')
+    print(f'GitHub: https://github.com/taxjar/taxjar-woocommerce-plugin/releases/tag/{version}')
+    print(f'WordPress.org: https://wordpress.org/plugins/{ReleaseVerifier.PLUGIN_SLUG}/')
+
+    return 0
+
+
+def cmd_matrix_refresh(matrix_file: str, plugin_file: str, check: bool = False) -> int:
+    """Refresh the WooCommerce test version matrix."""
+    with open(matrix_file) as f:
+        matrix = f.read()
+    with open(plugin_file) as f:
+        plugin = f.read()
+
+    refresher = VersionMatrixRefresher(WordPressClient())
+    result = refresher.refresh(matrix, plugin)
+
+    for entry in result.entries:
+        print(f'{entry.major}.x: WC {entry.wc_version}, PHP {entry.php_version}, WP {entry.wp_version}')
+    for warning in result.warnings:
+        print(f'WARNING: {warning}', file=sys.stderr)
+
+    if not result.changed:
+        print(f'{matrix_file} is up to date')
+    elif check:
+        print(f'{matrix_file} is out of date (run release-tool matrix-refresh)')
+    else:
+        with open(matrix_file, 'w') as f:
+            f.write(result.content)
+        print(f'Updated {matrix_file}')
+
+    if check and (result.changed or result.warnings):
+        return 1
+    return 0
+
+
+def cmd_meta_export(specs: List[str], print_exports: bool = False) -> int:
+    """Export Buildkite meta-data keys as environment variables."""
+    try:
+        exports = [parse_export_spec(spec) for spec in specs]
+    except ValueError as e:
+        print(f'ERROR: {e}', file=sys.stderr)
+        return 1
+
+    env_file = os.getenv('BUILDKITE_ENV_FILE')
+    if not print_exports and not env_file:
+        print('ERROR: BUILDKITE_ENV_FILE not set (use --print to eval exports instead)',
+              file=sys.stderr)
+        return 1
+
+    buildkite_client = BuildkiteClient(runner=create_runner())
+    values = buildkite_client.prefetch(key for key, _ in exports)
+
+    lines = []
+    for key, variable in exports:
+        value = values.get(key)
+        if value is None:
+            print(f'Meta-data {key} not set; {variable} not exported', file=sys.stderr)
+            continue
+        if '\n' in value or '\r' in value:
+            # An env file line ends at the line break; the rest would be read as more variables.
+            print(f'ERROR: Meta-data {key} contains a line break; nothing exported', file=sys.stderr)
+            return 1
+        if print_exports:
+            lines.append(f'export {variable}={shlex.quote(value)}')
+        else:
+            lines.append(f'{variable}={value}')
+
+    if print_exports:
+        for line in lines:
+            print(line)
+    elif lines:
+        with open(env_file, 'a') as f:
+            f.write(''.join(f'{line}\n' for line in lines))
+
+    return 0
+
+
+def parse_export_spec(spec: str) -> Tuple[str, str]:
+    """
+    Split a KEY[=VAR] export spec.
+
+    Without a variable name the key is upper-cased with non-alphanumeric
+    characters replaced by underscores (release-version -> RELEASE_VERSION).
+
+    Args:
+        spec: Export spec from the command line
+
+    Returns:
+        Tuple of (meta-data key, variable name)
+
+    Raises:
+        ValueError: If the variable name is not a valid shell identifier
+    """
+    key, _, variable = spec.partition('=')
+    variable = variable or re.sub(r'[^A-Za-z0-9_]', '_', key).upper()
+    if not VARIABLE_NAME.fullmatch(variable):
+        raise ValueError(f'Invalid variable name {variable!r} for meta-data {key!r}')
+    return key, variable
+
+
 if __name__ == '__main__':
     sys.exit(main())
@@ -0,0 +1,194 @@
+"""Process-wide detection of buildkite-agent capabilities."""
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, FrozenSet, Optional
+
+from .subprocess_runner import SubprocessRunner
+from ..cache import cache_dir
+
+
+AGENT_BINARY = 'buildkite-agent'
+PROBE_TTL_SECONDS = 15 * 60
+
+_COMMAND_LINE = re.compile(r'^\s{2,}([a-z][a-z0-9-]*)\s{2,}\S')
+_FLAG = re.compile(r'(?<![\w-])(--[a-z][a-z0-9-]*)')
+
+# Subcommands every supported agent has; assumed without probing.
+CORE_SUBCOMMANDS = frozenset({'annotate', 'meta-data'})
+
+
+class AgentCapabilities:
+    """
+    What the local buildkite-agent can do.
+
+    Availability is decided without spawning anything: the binary must be
+    on PATH and the job must have an agent access token. The core
+    subcommands (CORE_SUBCOMMANDS) are then assumed. Other subcommands,
+    and the flags of any subcommand, are read from the agent's help output
+    the first time they are asked about, then remembered.
+    """
+
+    def __init__(
+        self,
+        available: bool,
+        runner: Optional[SubprocessRunner] = None,
+        binary: Optional[str] = None,
+        persist_path: Optional[str] = None,
+    ):
+        """
+        Initialize AgentCapabilities.
+
+        Args:
+            available: Whether buildkite-agent can be used at all
+            runner: Runner for help probes (no probing if not provided)
+            binary: Resolved path of the agent binary
+            persist_path: File shared by steps on the same agent
+        """
+        self.available = available
+        self.binary = binary
+        self._runner = runner
+        self._persist_path = persist_path
+        self._subcommands: Optional[FrozenSet[str]] = None
+        self._flags: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def supports(self, subcommand: str) -> bool:
+        """
+        Check whether the agent has a subcommand.
+
+        Args:
+            subcommand: Subcommand such as ``annotate`` or ``meta-data``
+
+        Returns:
+            True if the agent is available and the subcommand exists
+        """
+        if not self.available:
+            return False
+        if subcommand in CORE_SUBCOMMANDS:
+            return True
+        subcommands = self._probe_subcommands()
+        return not subcommands or subcommand in subcommands
+
+    def supports_flag(self, subcommand: str, flag: str) -> bool:
+        """
+        Check whether a subcommand accepts a flag.
+
+        Args:
+            subcommand: Subcommand such as ``annotate``
+            flag: Flag such as ``--append``
+
+        Returns:
+            True if the flag appears in the subcommand's help
+        """
+        if not self.supports(subcommand):
+            return False
+        # Only the subcommand's own help is read, and only when a caller
+        # actually needs an optional flag.
+        flags = self._probe_flags(subcommand)
+        return flags is None or flag in flags
+
+    def _probe_subcommands(self) -> Optional[FrozenSet[str]]:
+        """Parse top-level help once. Empty means unknown, so permissive."""
+        with self._lock:
+            if self._subcommands is None:
+                output = self._help([])
+                self._subcommands = frozenset(
+                    match.group(1)
+                    for match in map(_COMMAND_LINE.match, output.splitlines())
+                    if match
+                )
+                self._save()
+            return self._subcommands
+
+    def _probe_flags(self, subcommand: str) -> Optional[FrozenSet[str]]:
+        """Parse a subcommand's help once. None means unknown, so permissive."""
+        with self._lock:
+            if subcommand not in self._flags:
+                self._flags[subcommand] = frozenset(_FLAG.findall(self._help([subcommand])))
+                self._save()
+            return self._flags[subcommand] or None
+
+    def _help(self, args) -> str:
+        """Return help output, or an empty string if it cannot be read."""
+        if not self._runner:
+            return ''
+        try:
+            result = self._runner.run([AGENT_BINARY, *args, '--help'], check=False)
+        except OSError:
+            return ''
+        return f'{result.stdout or ""}\n{result.stderr or ""}'
+
+    def _load(self) -> None:
+        """Load probe results persisted by an earlier step."""
+        if not self._persist_path:
+            return
+        try:
+            if time.time() - os.path.getmtime(self._persist_path) > PROBE_TTL_SECONDS:
+                return
+            with open(self._persist_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('binary') != self.binary:
+            return
+        if data.get('subcommands') is not None:
+            self._subcommands = frozenset(data['subcommands'])
+        self._flags = {sub: frozenset(flags) for sub, flags in data.get('flags', {}).items()}
+
+    def _save(self) -> None:
+        """Persist probe results for later steps. Caller holds the lock."""
+        if not self._persist_path:
+            return
+        data = {
+            'binary': self.binary,
+            'subcommands': sorted(self._subcommands) if self._subcommands is not None else None,
+            'flags': {sub: sorted(flags) for sub, flags in self._flags.items()},
+        }
+        tmp_path = f'{self._persist_path}.{os.getpid()}'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._persist_path)
+        except OSError:
+            pass
+
+
+_capabilities: Optional[AgentCapabilities] = None
+_capabilities_lock = threading.Lock()
+
+
+def get_agent_capabilities(runner: Optional[SubprocessRunner] = None) -> AgentCapabilities:
+    """
+    Return the process-wide agent capabilities, detecting them once.
+
+    Args:
+        runner: Runner used for help probes on first detection
+
+    Returns:
+        Shared AgentCapabilities
+    """
+    global _capabilities
+    with _capabilities_lock:
+        if _capabilities is None:
+            binary = shutil.which(AGENT_BINARY)
+            available = bool(binary and os.getenv('BUILDKITE_AGENT_ACCESS_TOKEN'))
+            persist_dir = cache_dir('buildkite-agent') if available else None
+            _capabilities = AgentCapabilities(
+                available=available,
+                runner=runner or SubprocessRunner(),
+                binary=binary,
+                persist_path=os.path.join(persist_dir, 'capabilities.json') if persist_dir else None,
+            )
+        return _capabilities
+
+
+def reset_agent_capabilities() -> None:
+    """Forget detected capabilities (for testing)."""
+    global _capabilities
+    with _capabilities_lock:
+        _capabilities = None
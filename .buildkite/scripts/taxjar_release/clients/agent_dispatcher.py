@@ -0,0 +1,226 @@
+"""Background execution of buildkite-agent side-channel calls."""
+import queue
+import sys
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+from .subprocess_runner import SubprocessRunner
+from ..tracing import describe_command
+
+
+DEFAULT_LANES = 4
+DEFAULT_MAX_PENDING = 64
+DEFAULT_JOIN_TIMEOUT = 30.0
+
+
+@dataclass
+class DispatchFailure:
+    """A dispatched command that failed."""
+    cmd: List[str]
+    returncode: Optional[int] = None
+    error: Optional[Exception] = None
+    abandoned: bool = False
+
+    def describe(self) -> str:
+        """Return a one-line description of the failure."""
+        if self.abandoned:
+            reason = 'abandoned before it finished'
+        elif self.error is None:
+            reason = f'exit {self.returncode}'
+        else:
+            reason = str(self.error)
+        return f'{describe_command(self.cmd)}: {reason}'
+
+
+@dataclass(eq=False)
+class _Call:
+    """A queued command."""
+    cmd: List[str]
+    input: Optional[str]
+    abandoned: bool = False
+
+
+class AgentDispatcher:
+    """
+    Runs commands on background threads off the critical path.
+
+    Commands are routed to a fixed set of lanes by key. Each lane is one
+    thread with a bounded queue, so commands sharing a key run in the
+    order they were submitted while different keys run concurrently.
+    Submitting blocks when a lane's queue is full.
+    """
+
+    def __init__(
+        self,
+        runner: Optional[SubprocessRunner] = None,
+        lanes: int = DEFAULT_LANES,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        join_timeout: float = DEFAULT_JOIN_TIMEOUT,
+    ):
+        """
+        Initialize AgentDispatcher.
+
+        Args:
+            runner: SubprocessRunner instance (created if not provided)
+            lanes: Number of worker threads
+            max_pending: Queue size per lane
+            join_timeout: Seconds close() waits for queued commands
+        """
+        self.runner = runner or SubprocessRunner()
+        self.join_timeout = join_timeout
+        self._queues = [queue.Queue(maxsize=max_pending) for _ in range(max(1, lanes))]
+        self._threads: List[Optional[threading.Thread]] = [None] * len(self._queues)
+        self._failures: List[DispatchFailure] = []
+        self._outstanding: Set[_Call] = set()
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @property
+    def failures(self) -> List[DispatchFailure]:
+        """Return failures recorded so far."""
+        with self._lock:
+            return list(self._failures)
+
+    def submit(self, key: str, cmd: List[str], input: Optional[str] = None) -> None:
+        """
+        Queue a command to run in the background.
+
+        Runs the command synchronously once the dispatcher is closed.
+
+        Args:
+            key: Ordering key; commands with the same key run in order
+            cmd: Command and arguments as list
+            input: String to pass to stdin
+        """
+        lane = zlib.crc32(key.encode('utf-8')) % len(self._queues)
+        call = _Call(cmd=list(cmd), input=input)
+        with self._lock:
+            if self._closed:
+                run_inline = True
+            else:
+                run_inline = False
+                self._pending += 1
+                self._outstanding.add(call)
+                self._start_lane(lane)
+
+        if run_inline:
+            self._execute(call)
+        else:
+            self._queues[lane].put(call)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for queued commands to finish.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if every queued command finished
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def close(self) -> List[DispatchFailure]:
+        """
+        Wait up to join_timeout for queued commands and report failures.
+
+        Commands that have not finished after the timeout are abandoned and
+        reported as failures: queued ones never run, and the worker threads
+        are daemons that do not hold up interpreter exit. Later calls
+        return the same failures without reporting them again.
+
+        Returns:
+            Failures of commands that ran, followed by abandoned commands
+        """
+        if self._closed:
+            return self.failures
+
+        drained = self.join(self.join_timeout)
+        with self._lock:
+            self._closed = True
+
+        if not drained:
+            self._abandon()
+        with self._lock:
+            failures = list(self._failures)
+
+        if not drained:
+            abandoned = sum(1 for failure in failures if failure.abandoned)
+            print(f'WARNING: {abandoned} buildkite-agent call(s) still pending after '
+                  f'{self.join_timeout:.0f}s were abandoned', file=sys.stderr)
+        if failures:
+            print(f'WARNING: {len(failures)} buildkite-agent call(s) failed:', file=sys.stderr)
+            for failure in failures:
+                print(f'  {failure.describe()}', file=sys.stderr)
+        return failures
+
+    def _abandon(self) -> None:
+        """Drop queued commands and record every unfinished command as a failure."""
+        dropped = 0
+        for calls in self._queues:
+            while True:
+                try:
+                    call = calls.get_nowait()
+                except queue.Empty:
+                    break
+                dropped += 1
+                with self._lock:
+                    self._outstanding.discard(call)
+                    self._record_abandoned(call)
+
+        with self._idle:
+            self._pending -= dropped
+            # Commands still running may finish later, but are reported now.
+            for call in self._outstanding:
+                self._record_abandoned(call)
+            self._outstanding.clear()
+
+    def _record_abandoned(self, call: _Call) -> None:
+        """Record an abandoned command as a failure. Caller holds the lock."""
+        call.abandoned = True
+        self._failures.append(DispatchFailure(cmd=call.cmd, abandoned=True))
+
+    def _start_lane(self, lane: int) -> None:
+        """Start a lane's worker thread if needed. Caller holds the lock."""
+        if self._threads[lane] is None:
+            thread = threading.Thread(
+                target=self._work,
+                args=(self._queues[lane],),
+                name=f'agent-dispatch-{lane}',
+                daemon=True,
+            )
+            self._threads[lane] = thread
+            thread.start()
+
+    def _work(self, calls: queue.Queue) -> None:
+        """Run queued commands for one lane forever."""
+        while True:
+            call = calls.get()
+            try:
+                self._execute(call)
+            finally:
+                with self._idle:
+                    self._outstanding.discard(call)
+                    self._pending -= 1
+                    self._idle.notify_all()
+
+    def _execute(self, call: _Call) -> None:
+        """Run one command and record a failure."""
+        try:
+            result = self.runner.run(call.cmd, check=False, input=call.input)
+        except Exception as e:
+            failure = DispatchFailure(cmd=call.cmd, error=e)
+        else:
+            if result.returncode == 0:
+                return
+            failure = DispatchFailure(cmd=call.cmd, returncode=result.returncode)
+
+        with self._lock:
+            # An abandoned command was already reported.
+            if not call.abandoned:
+                self._failures.append(failure)
@@ -0,0 +1,290 @@
+"""Content-addressed cache for git blobs."""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_COMMITS = 100
+# Pruning goes this far below the limits so the next one is many writes away.
+PRUNE_TO = 0.8
+
+_TEMP_PREFIX = '.tmp'
+
+
+def git_blob_oid(data: bytes) -> str:
+    """Return the git object id of a blob with the given content."""
+    header = f'blob {len(data)}\0'.encode()
+    return hashlib.sha1(header + data).hexdigest()
+
+
+class BlobCache:
+    """
+    Size-bounded LRU of blob content keyed by object id.
+
+    An optional directory adds a second, persistent layer. Blobs read
+    from disk are verified against their object id, so a damaged file is
+    treated as a miss. The directory also stores which blob a path
+    resolves to at a given commit, letting later builds of the same
+    commit skip git entirely.
+
+    Disk usage is measured once, on the first write, and then estimated
+    from the writes this process makes. When the estimate crosses
+    max_disk_bytes or max_commits, the directory is scanned again and the
+    least recently used blobs and commit indexes are removed until they
+    are down to PRUNE_TO of the limits.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+        max_commits: int = DEFAULT_MAX_COMMITS,
+    ):
+        """
+        Initialize BlobCache.
+
+        Args:
+            max_bytes: Maximum total size of blobs held in memory
+            directory: Optional on-disk cache directory
+            max_disk_bytes: Maximum total size of blobs kept on disk
+            max_commits: Maximum number of commit path indexes kept on disk
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_commits = max_commits
+        self.hits = 0
+        self.misses = 0
+        self._blobs: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._size = 0
+        # Estimated disk usage (None until first measured).
+        self._disk_bytes: Optional[int] = None
+        self._disk_commits = 0
+        self._disk_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current memory usage."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._blobs),
+                'bytes': self._size,
+            }
+
+    def get(self, oid: str) -> Optional[bytes]:
+        """
+        Look up a blob by object id.
+
+        Args:
+            oid: Blob object id (hex)
+
+        Returns:
+            Blob content, or None on a miss
+        """
+        with self._lock:
+            data = self._blobs.get(oid)
+            if data is not None:
+                self._blobs.move_to_end(oid)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(oid)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(oid, data)
+            return data
+
+    def put(self, oid: str, data: bytes) -> None:
+        """
+        Store a blob.
+
+        Args:
+            oid: Blob object id (hex)
+            data: Blob content
+        """
+        with self._lock:
+            self._remember(oid, data)
+        if self._write_disk(self._blob_path(oid), data):
+            self._track_disk(blob_bytes=len(data))
+
+    def get_path_oid(self, commit: str, path: str) -> Optional[str]:
+        """
+        Look up the blob a path resolved to at a commit in an earlier build.
+
+        Args:
+            commit: Full commit sha
+            path: Path relative to the repo root
+
+        Returns:
+            Blob object id, or None if unknown
+        """
+        index_path = self._index_path(commit)
+        if not index_path:
+            return None
+        try:
+            with open(index_path) as f:
+                oid = json.load(f).get(path)
+        except (OSError, ValueError):
+            return None
+        self._touch(index_path)
+        return oid
+
+    def put_path_oid(self, commit: str, path: str, oid: str) -> None:
+        """
+        Record the blob a path resolves to at a commit.
+
+        Args:
+            commit: Full commit sha
+            path: Path relative to the repo root
+            oid: Blob object id
+        """
+        index_path = self._index_path(commit)
+        if not index_path:
+            return
+        new_index = False
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+            new_index = True
+        index[path] = oid
+        if self._write_disk(index_path, json.dumps(index).encode()):
+            self._track_disk(commits=int(new_index))
+
+    def _remember(self, oid: str, data: bytes) -> None:
+        """Insert into the memory LRU and evict down to max_bytes. Caller holds the lock."""
+        if len(data) > self.max_bytes:
+            return
+        previous = self._blobs.pop(oid, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._blobs[oid] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._blobs.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _blob_path(self, oid: str) -> Optional[str]:
+        """Return the on-disk path for a blob."""
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, 'blobs', oid[:2], oid[2:])
+
+    def _index_path(self, commit: str) -> Optional[str]:
+        """Return the on-disk path of a commit's path index."""
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, 'commits', f'{commit}.json')
+
+    def _read_disk(self, oid: str) -> Optional[bytes]:
+        """Read and verify a blob from disk."""
+        path = self._blob_path(oid)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if git_blob_oid(data) != oid:
+            return None
+        self._touch(path)
+        return data
+
+    def _track_disk(self, blob_bytes: int = 0, commits: int = 0) -> None:
+        """Add a write to the disk usage estimate and prune when it crosses a limit."""
+        with self._disk_lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += blob_bytes
+                self._disk_commits += commits
+                if self._disk_bytes <= self.max_disk_bytes and self._disk_commits <= self.max_commits:
+                    return
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Measure the directory and prune it if over a limit. Caller holds _disk_lock."""
+        blobs = self._scan_disk('blobs')
+        total = sum(size for _, size, _ in blobs)
+        if total > self.max_disk_bytes:
+            for _, size, path in sorted(blobs):
+                if total <= self.max_disk_bytes * PRUNE_TO:
+                    break
+                self._remove(path)
+                total -= size
+
+        commits = sorted(self._scan_disk('commits'), reverse=True)
+        keep = len(commits)
+        if keep > self.max_commits:
+            keep = int(self.max_commits * PRUNE_TO)
+            for _, _, path in commits[keep:]:
+                self._remove(path)
+
+        self._disk_bytes = total
+        self._disk_commits = keep
+
+    def _scan_disk(self, subdir: str) -> List[Tuple[float, int, str]]:
+        """Return (last used, size, path) of the cache files under a subdirectory."""
+        entries = []
+        for root, _, names in os.walk(os.path.join(self.directory, subdir)):
+            for name in names:
+                # Skip files another writer has not renamed into place yet.
+                if name.startswith(_TEMP_PREFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        """Mark a cache file as recently used."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """Delete a cache file, ignoring one already gone."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _write_disk(path: Optional[str], data: bytes) -> bool:
+        """Atomically write a cache file, ignoring failures; return True if written."""
+        if not path:
+            return False
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=_TEMP_PREFIX, dir=os.path.dirname(path))
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        return True
@@ -1,15 +1,50 @@
 """Buildkite agent wrapper with graceful degradation."""
-from typing import Optional
+import atexit
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from .agent_capabilities import AgentCapabilities, get_agent_capabilities
+from .agent_dispatcher import AgentDispatcher, DispatchFailure
 from .subprocess_runner import SubprocessRunner
+from ..exceptions import BuildkiteError
+
+
+ANNOTATION_SEPARATOR = '\n\n'
+
+
+@dataclass
+class _PendingAnnotation:
+    """Annotation bodies buffered for one context."""
+    style: str
+    parts: List[str] = field(default_factory=list)
 
 
 class BuildkiteClient:
-    """Wrapper for buildkite-agent commands."""
+    """
+    Wrapper for buildkite-agent commands.
+
+    In buffered mode annotations and meta-data writes are held in memory
+    and sent by flush(): annotations are merged per context and metadata
+    writes are coalesced, last write wins per key.
+
+    In asynchronous mode writes run on an AgentDispatcher in the
+    background, ordered per annotation context and per metadata key.
+    Either mode registers close() to run at interpreter exit.
+
+    Metadata reads go through an in-process cache that set_metadata
+    keeps coherent, so this process's own writes are visible even before
+    they reach the agent. A key known to be absent is cached as None.
+    """
 
     def __init__(
         self,
         runner: Optional[SubprocessRunner] = None,
         available: Optional[bool] = None,
+        capabilities: Optional[AgentCapabilities] = None,
+        buffered: bool = False,
+        asynchronous: bool = False,
+        dispatcher: Optional[AgentDispatcher] = None,
     ):
         """
         Initialize BuildkiteClient.
@@ -17,22 +52,34 @@ class BuildkiteClient:
         Args:
             runner: SubprocessRunner instance (created if not provided)
             available: Override availability check (for testing)
+            capabilities: Agent capabilities (detected once per process if not provided)
+            buffered: Hold annotations and meta-data writes until flush()
+            asynchronous: Run writes on a background dispatcher
+            dispatcher: Dispatcher for asynchronous writes (created if not provided)
         """
         self.runner = runner or SubprocessRunner()
-        self._available = available if available is not None else self._check_availability()
-
-    def _check_availability(self) -> bool:
-        """Check if buildkite-agent is available."""
-        try:
-            self.runner.run(['buildkite-agent', '--version'], check=False)
-            return True
-        except FileNotFoundError:
-            return False
+        if capabilities is None:
+            if available is not None:
+                capabilities = AgentCapabilities(available=available)
+            else:
+                capabilities = get_agent_capabilities(self.runner)
+        self.capabilities = capabilities
+        self.buffered = buffered
+        self._annotations: Dict[Optional[str], _PendingAnnotation] = {}
+        self._metadata: Dict[str, str] = {}
+        self._cache: Dict[str, Optional[str]] = {}
+        self._flushed_annotations: Dict[Optional[str], List[str]] = {}
+        self._lock = threading.Lock()
+        if dispatcher is None and asynchronous:
+            dispatcher = AgentDispatcher(self.runner)
+        self.dispatcher = dispatcher
+        if buffered or dispatcher:
+            atexit.register(self.close)
 
     @property
     def is_available(self) -> bool:
         """Return whether buildkite-agent is available."""
-        return self._available
+        return self.capabilities.available
 
     def annotate(
         self,
@@ -48,31 +95,57 @@ class BuildkiteClient:
             style: Annotation style (info, warning, error, success)
             context: Unique context key for updating annotations
         """
-        if not self._available:
+        if not self.capabilities.supports('annotate'):
             print(f'[{style.upper()}] {message}')
             return
 
+        if self.buffered:
+            with self._lock:
+                pending = self._annotations.setdefault(context, _PendingAnnotation(style))
+                pending.style = style
+                pending.parts.append(message)
+            return
+
         cmd = ['buildkite-agent', 'annotate', message, '--style', style]
         if context:
             cmd.extend(['--context', context])
 
-        self.runner.run(cmd, check=False)
+        self._write(f'annotate:{context}', cmd)
 
-    def set_metadata(self, key: str, value: str) -> None:
+    def set_metadata(self, key: str, value: str, required: bool = False) -> None:
         """
         Set Buildkite meta-data.
 
         Args:
             key: Meta-data key
             value: Meta-data value
+            required: Write now, bypassing buffering and the dispatcher, and
+                raise if the write fails (for keys later steps depend on)
+
+        Raises:
+            BuildkiteError: If a required write fails
         """
-        if not self._available:
+        if not self.capabilities.supports('meta-data'):
             return
 
-        self.runner.run(
-            ['buildkite-agent', 'meta-data', 'set', key, value],
-            check=False,
-        )
+        cmd = ['buildkite-agent', 'meta-data', 'set', key, value]
+        if required:
+            try:
+                self.runner.run(cmd, check=True)
+            except (subprocess.CalledProcessError, OSError) as e:
+                raise BuildkiteError(f'Could not set meta-data {key}: {e}') from e
+
+        with self._lock:
+            self._cache[key] = value
+            if required:
+                # A buffered write of the key would overwrite this one at flush.
+                self._metadata.pop(key, None)
+                return
+            if self.buffered:
+                self._metadata[key] = value
+                return
+
+        self._write(f'meta-data:{key}', cmd)
 
     def get_metadata(self, key: str) -> Optional[str]:
         """
@@ -84,18 +157,26 @@ class BuildkiteClient:
         Returns:
             Meta-data value or None if unavailable
         """
-        if not self._available:
+        if not self.capabilities.supports('meta-data'):
             return None
 
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+
         try:
             result = self.runner.run(
                 ['buildkite-agent', 'meta-data', 'get', key],
                 check=True,
             )
-            return result.stdout.strip()
+        except subprocess.CalledProcessError:
+            self._remember(key, None)
+            return None
         except Exception:
             return None
 
+        return self._remember(key, result.stdout.strip())
+
     def metadata_exists(self, key: str) -> bool:
         """
         Check if Buildkite meta-data key exists.
@@ -106,14 +187,127 @@ class BuildkiteClient:
         Returns:
             True if key exists, False otherwise
         """
-        if not self._available:
+        if not self.capabilities.supports('meta-data'):
             return False
 
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key] is not None
+
         try:
             self.runner.run(
                 ['buildkite-agent', 'meta-data', 'exists', key],
                 check=True,
             )
             return True
+        except subprocess.CalledProcessError:
+            self._remember(key, None)
+            return False
         except Exception:
             return False
+
+    def prefetch(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Fetch meta-data keys concurrently into the cache.
+
+        Keys already cached are not fetched again.
+
+        Args:
+            keys: Meta-data keys
+
+        Returns:
+            Value of each key, None for keys that are absent or unreadable
+        """
+        keys = list(dict.fromkeys(keys))
+        if not self.capabilities.supports('meta-data'):
+            return {key: None for key in keys}
+
+        with self._lock:
+            missing = [key for key in keys if key not in self._cache]
+
+        if missing:
+            batch = self.runner.run_many(
+                [['buildkite-agent', 'meta-data', 'get', key] for key in missing],
+                check=True,
+            )
+            for key, outcome in zip(missing, batch.outcomes):
+                if outcome.ok:
+                    self._remember(key, outcome.result.stdout.strip())
+                elif isinstance(outcome.error, subprocess.CalledProcessError):
+                    self._remember(key, None)
+
+        with self._lock:
+            return {key: self._cache.get(key) for key in keys}
+
+    def _remember(self, key: str, value: Optional[str]) -> Optional[str]:
+        """Cache a value read from the agent unless this process wrote one since."""
+        with self._lock:
+            return self._cache.setdefault(key, value)
+
+    def flush(self) -> None:
+        """
+        Send buffered annotations and meta-data writes.
+
+        Metadata writes run concurrently, one agent call per key. Each
+        annotation context is sent once with its merged body on stdin;
+        contexts already sent by an earlier flush are extended with
+        ``--append`` when the agent supports it. Failures are ignored,
+        as they are for unbuffered writes. With a dispatcher the calls
+        are queued and flush() returns immediately.
+        """
+        with self._lock:
+            annotations, self._annotations = self._annotations, {}
+            metadata, self._metadata = self._metadata, {}
+
+        if self.dispatcher:
+            for key, value in metadata.items():
+                self._write(f'meta-data:{key}', ['buildkite-agent', 'meta-data', 'set', key, value])
+        elif metadata:
+            self.runner.run_many(
+                [['buildkite-agent', 'meta-data', 'set', key, value] for key, value in metadata.items()],
+                check=False,
+            )
+
+        for context, pending in annotations.items():
+            self._send_annotation(context, pending)
+
+    def _send_annotation(self, context: Optional[str], pending: _PendingAnnotation) -> None:
+        """Send one merged annotation context."""
+        cmd = ['buildkite-agent', 'annotate', '--style', pending.style]
+        if context:
+            cmd.extend(['--context', context])
+
+        parts = pending.parts
+        sent = self._flushed_annotations.setdefault(context, [])
+        if sent:
+            if self.capabilities.supports_flag('annotate', '--append'):
+                cmd.append('--append')
+                parts = [''] + parts
+            else:
+                parts = sent + parts
+        sent.extend(pending.parts)
+
+        try:
+            self._write(f'annotate:{context}', cmd, input=ANNOTATION_SEPARATOR.join(parts))
+        except OSError:
+            pass
+
+    def close(self) -> List[DispatchFailure]:
+        """
+        Flush buffered writes and wait for background calls to finish.
+
+        Returns:
+            Background calls that failed or were abandoned (always empty
+            without a dispatcher)
+        """
+        self.flush()
+        if self.dispatcher:
+            return self.dispatcher.close()
+        return []
+
+    def _write(self, key: str, cmd: List[str], input: Optional[str] = None) -> None:
+        """Run an agent write now, or queue it on the dispatcher."""
+        if self.dispatcher:
+            self.dispatcher.submit(key, cmd, input=input)
+        else:
+            self.runner.run(cmd, check=False, input=input)
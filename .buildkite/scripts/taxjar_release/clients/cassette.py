@@ -0,0 +1,320 @@
+"""Record/replay SubprocessRunner implementations backed by a cassette file."""
+import atexit
+import json
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .subprocess_runner import SubprocessRunner
+from ..exceptions import CassetteError
+
+
+CASSETTE_VERSION = 2
+REDACTED = '[REDACTED]'
+
+# Exceptions a command can raise before it runs, restored on replay.
+_REPLAYABLE_ERRORS = {
+    'FileNotFoundError': FileNotFoundError,
+    'PermissionError': PermissionError,
+}
+
+
+def _temp_path_pattern() -> re.Pattern:
+    """Match per-run temporary paths such as /tmp/svn-deploy-abc123."""
+    return re.compile(re.escape(tempfile.gettempdir()) + r'/[^/\s]+')
+
+
+def normalize(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize per-run temporary paths so recordings match across runs.
+
+    Args:
+        value: Argument, path or output text
+
+    Returns:
+        Value with temporary directory names replaced by ``<tmp>``
+    """
+    if value is None:
+        return None
+    return _temp_path_pattern().sub('<tmp>', value)
+
+
+class RecordingSubprocessRunner(SubprocessRunner):
+    """
+    Runs commands for real and records every invocation to a cassette.
+
+    Anything passed through ``input=`` is treated as a secret: it is
+    scrubbed from recorded output and only its presence is stored, so a
+    cassette holds nothing to guess a password against.
+    """
+
+    def __init__(
+        self,
+        cassette_path: str,
+        runner: Optional[SubprocessRunner] = None,
+        secrets_to_redact: Optional[List[str]] = None,
+        autosave: bool = False,
+    ):
+        """
+        Initialize RecordingSubprocessRunner.
+
+        Args:
+            cassette_path: Path the cassette is written to
+            runner: Runner that executes commands (created if not provided)
+            secrets_to_redact: Additional strings scrubbed from the cassette
+            autosave: Save the cassette automatically at interpreter exit
+        """
+        self.cassette_path = cassette_path
+        self.runner = runner or SubprocessRunner()
+        self._secrets = [s for s in (secrets_to_redact or []) if s]
+        self._interactions: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        if autosave:
+            atexit.register(self.save)
+
+    @property
+    def interactions(self) -> List[Dict[str, Any]]:
+        """Return a copy of the recorded interactions."""
+        with self._lock:
+            return list(self._interactions)
+
+    def run(
+        self,
+        cmd: List[str],
+        check: bool = True,
+        capture: bool = True,
+        input: Optional[str] = None,
+        cwd: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> subprocess.CompletedProcess:
+        """Execute a command through the wrapped runner and record it."""
+        if input:
+            self._add_secret(input)
+
+        start = time.perf_counter()
+        try:
+            result = self.runner.run(
+                cmd, check=False, capture=capture, input=input, cwd=cwd, timeout=timeout,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            self._record(cmd, cwd, input, start, error=e)
+            raise
+
+        self._record(
+            cmd, cwd, input, start,
+            returncode=result.returncode,
+            stdout=result.stdout,
+            stderr=result.stderr,
+        )
+
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(
+                result.returncode, cmd, output=result.stdout, stderr=result.stderr,
+            )
+        return result
+
+    def stream(
+        self,
+        cmd: List[str],
+        check: bool = True,
+        cwd: Optional[str] = None,
+        binary: bool = False,
+        tee: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Iterator[Union[str, bytes]]:
+        """Stream a command through the wrapped runner and record its output."""
+        start = time.perf_counter()
+        chunks: List[str] = []
+        returncode = 0
+        try:
+            for chunk in self.runner.stream(cmd, check=check, cwd=cwd, binary=binary, tee=tee, **kwargs):
+                if binary:
+                    chunks.append(chunk.decode('utf-8', errors='replace'))
+                else:
+                    chunks.append(chunk + '\n')
+                yield chunk
+        except subprocess.CalledProcessError as e:
+            returncode = e.returncode
+            raise
+        finally:
+            self._record(cmd, cwd, None, start, returncode=returncode, stdout=''.join(chunks), stderr='')
+
+    def save(self) -> None:
+        """Write the cassette to disk."""
+        document = {
+            'version': CASSETTE_VERSION,
+            'interactions': self.interactions,
+        }
+        with open(self.cassette_path, 'w') as f:
+            json.dump(document, f, indent=2)
+
+    def _add_secret(self, value: str) -> None:
+        """Register a value to scrub from recorded text."""
+        with self._lock:
+            if value not in self._secrets:
+                self._secrets.append(value)
+
+    def _redact(self, value: Optional[str]) -> Optional[str]:
+        """Scrub secrets and normalize temporary paths."""
+        if value is None:
+            return None
+        for secret in self._secrets:
+            value = value.replace(secret, REDACTED)
+        return normalize(value)
+
+    def _record(
+        self,
+        cmd: List[str],
+        cwd: Optional[str],
+        input: Optional[str],
+        start: float,
+        returncode: Optional[int] = None,
+        stdout: Optional[str] = None,
+        stderr: Optional[str] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        """Append one interaction to the cassette."""
+        interaction = {
+            'argv': [self._redact(arg) for arg in cmd],
+            'cwd': self._redact(cwd),
+            'stdin': input is not None,
+            'returncode': returncode,
+            'stdout': self._redact(stdout),
+            'stderr': self._redact(stderr),
+            'duration': round(time.perf_counter() - start, 6),
+        }
+        if error is not None:
+            interaction['error'] = type(error).__name__
+            interaction['error_message'] = self._redact(str(error))
+
+        with self._lock:
+            self._interactions.append(interaction)
+
+
+class ReplayingSubprocessRunner(SubprocessRunner):
+    """
+    Serves commands from a cassette instead of executing them.
+
+    Each recorded interaction is used once. Commands are matched on argv
+    and cwd after normalization, so concurrent callers may consume them
+    out of order.
+    """
+
+    def __init__(self, cassette_path: str, time_scale: float = 0.0):
+        """
+        Initialize ReplayingSubprocessRunner.
+
+        Args:
+            cassette_path: Path of a cassette written by RecordingSubprocessRunner
+            time_scale: Fraction of each recorded duration to sleep for
+                (0 replays instantly, 1 replays in real time)
+
+        Raises:
+            CassetteError: If the cassette cannot be read
+        """
+        try:
+            with open(cassette_path) as f:
+                document = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CassetteError(f'Cannot read cassette {cassette_path}: {e}') from e
+
+        if document.get('version') != CASSETTE_VERSION:
+            raise CassetteError(f'Unsupported cassette version in {cassette_path}')
+
+        self.cassette_path = cassette_path
+        self.time_scale = time_scale
+        self._pending: List[Dict[str, Any]] = list(document.get('interactions', []))
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        """Return the number of interactions not yet replayed."""
+        with self._lock:
+            return len(self._pending)
+
+    def run(
+        self,
+        cmd: List[str],
+        check: bool = True,
+        capture: bool = True,
+        input: Optional[str] = None,
+        cwd: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> subprocess.CompletedProcess:
+        """Return the recorded result for a command."""
+        interaction = self._take(cmd, cwd, input)
+        self._wait(interaction)
+
+        error = interaction.get('error')
+        if error == 'TimeoutExpired':
+            raise subprocess.TimeoutExpired(cmd, timeout or interaction['duration'])
+        if error:
+            raise _REPLAYABLE_ERRORS.get(error, OSError)(interaction.get('error_message', error))
+
+        result = subprocess.CompletedProcess(
+            args=cmd,
+            returncode=interaction['returncode'],
+            stdout=interaction['stdout'] if capture else None,
+            stderr=interaction['stderr'] if capture else None,
+        )
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(
+                result.returncode, cmd, output=result.stdout, stderr=result.stderr,
+            )
+        return result
+
+    def stream(
+        self,
+        cmd: List[str],
+        check: bool = True,
+        cwd: Optional[str] = None,
+        binary: bool = False,
+        tee: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Iterator[Union[str, bytes]]:
+        """Yield the recorded output of a streamed command."""
+        interaction = self._take(cmd, cwd, None)
+        self._wait(interaction)
+
+        stdout = interaction.get('stdout') or ''
+        if tee:
+            with open(tee, 'a') as log:
+                log.write(stdout)
+        if binary:
+            yield stdout.encode('utf-8')
+        else:
+            yield from stdout.splitlines()
+
+        if check and interaction['returncode'] != 0:
+            raise subprocess.CalledProcessError(interaction['returncode'], cmd)
+
+    def _take(
+        self,
+        cmd: List[str],
+        cwd: Optional[str],
+        input: Optional[str],
+    ) -> Dict[str, Any]:
+        """Remove and return the first interaction matching a command."""
+        argv = [normalize(arg) for arg in cmd]
+        normalized_cwd = normalize(cwd)
+
+        with self._lock:
+            for index, interaction in enumerate(self._pending):
+                if interaction['argv'] == argv and interaction['cwd'] == normalized_cwd:
+                    break
+            else:
+                raise CassetteError(f'No recorded interaction for {argv} in {normalized_cwd}')
+
+            if interaction.get('stdin', False) != (input is not None):
+                raise CassetteError(f'stdin for {argv} does not match the recording')
+
+            return self._pending.pop(index)
+
+    def _wait(self, interaction: Dict[str, Any]) -> None:
+        """Sleep for the scaled recorded duration."""
+        if self.time_scale > 0:
+            time.sleep(interaction.get('duration', 0) * self.time_scale)
+
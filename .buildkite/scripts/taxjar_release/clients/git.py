@@ -1,24 +1,50 @@
 """GitPython wrapper for git operations."""
 import os
-import subprocess
-from typing import Optional
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
 import git
 
+from .blob_cache import BlobCache
+from ..cache import cache_dir
+from ..tracing import get_tracer
+
+
+# First git version that reads safe.directory from command-line config.
+SAFE_DIRECTORY_ENV_VERSION = (2, 38)
+
 
 class GitClient:
     """Wrapper around GitPython for testability."""
 
-    def __init__(self, repo_path: str = '.', repo: Optional[git.Repo] = None):
+    def __init__(
+        self,
+        repo_path: str = '.',
+        repo: Optional[git.Repo] = None,
+        blob_cache: Optional[BlobCache] = None,
+    ):
         """
         Initialize GitClient.
 
         Args:
             repo_path: Path to git repository
             repo: GitPython Repo instance (for testing)
+            blob_cache: Blob content cache (created if not provided, with an
+                on-disk layer when RELEASE_TOOL_CACHE_DIR is set)
         """
-        if repo is None:
-            self._configure_safe_directory(repo_path)
-        self.repo = repo or git.Repo(repo_path)
+        self.repo_path = repo_path
+        self._repo = repo
+        self.blob_cache = blob_cache or BlobCache(directory=cache_dir('git-blobs'))
+        self._path_oids: Dict[Tuple[str, str], str] = {}
+        # GitPython's persistent cat-file processes are not thread-safe
+        self._cat_file_lock = threading.Lock()
+
+    @property
+    def repo(self) -> git.Repo:
+        """Return the GitPython Repo, opening it on first use."""
+        if self._repo is None:
+            self._configure_safe_directory(self.repo_path)
+            self._repo = git.Repo(self.repo_path)
+        return self._repo
 
     @staticmethod
     def _configure_safe_directory(repo_path: str) -> None:
@@ -27,50 +53,355 @@ class GitClient:
 
         In Docker containers (e.g., Buildkite), the repo may be owned by
         a different user. Git 2.35.2+ requires safe.directory config.
+
+        Git 2.38+ honours safe.directory from command-line config, so the
+        setting is passed to every git child of this process through
+        GIT_CONFIG_COUNT/GIT_CONFIG_KEY_n/GIT_CONFIG_VALUE_n and the global
+        gitconfig is left untouched. Older versions only read it from
+        system or global config, so it is added to the global gitconfig
+        there, unless an equivalent entry is already present.
         """
         abs_path = os.path.abspath(repo_path)
         try:
-            subprocess.run(
-                ['git', 'config', '--global', '--add', 'safe.directory', abs_path],
-                check=False,
-                capture_output=True,
-            )
-        except FileNotFoundError:
+            version = git.Git().version_info
+        except git.CommandError:
+            return
+
+        if version >= SAFE_DIRECTORY_ENV_VERSION:
+            GitClient._export_safe_directory(abs_path)
+        else:
+            GitClient._add_global_safe_directory(abs_path)
+
+    @staticmethod
+    def _export_safe_directory(abs_path: str) -> None:
+        """Pass safe.directory to git children as command-line config."""
+        try:
+            count = int(os.environ.get('GIT_CONFIG_COUNT') or 0)
+        except ValueError:
+            count = 0
+
+        for index in range(count):
+            if (os.environ.get(f'GIT_CONFIG_KEY_{index}') == 'safe.directory'
+                    and os.environ.get(f'GIT_CONFIG_VALUE_{index}') in (abs_path, '*')):
+                return
+
+        os.environ[f'GIT_CONFIG_KEY_{count}'] = 'safe.directory'
+        os.environ[f'GIT_CONFIG_VALUE_{count}'] = abs_path
+        os.environ['GIT_CONFIG_COUNT'] = str(count + 1)
+
+    @staticmethod
+    def _add_global_safe_directory(abs_path: str) -> None:
+        """Add safe.directory to the global gitconfig if it is missing."""
+        config = git.Git()
+        try:
+            entries = config.config('--global', '--get-all', 'safe.directory').splitlines()
+        except git.GitCommandError:
+            # Exit status 1: no entries yet
+            entries = []
+        except git.CommandError:
+            return
+        if abs_path in entries or '*' in entries:
+            return
+        try:
+            config.config('--global', '--add', 'safe.directory', abs_path)
+        except git.CommandError:
             pass
 
     def get_file_content(self, filepath: str, ref: str = 'HEAD') -> str:
         """
         Get file content at specific git ref.
 
+        Reads go through a long-lived ``git cat-file --batch`` process, so
+        repeated reads do not spawn git, and content is memoized by blob
+        id, so the same blob is only read once.
+
         Args:
             filepath: Path to file relative to repo root
             ref: Git ref (branch, tag, commit)
 
         Returns:
             File content as string
+
+        Raises:
+            ValueError: If the path does not exist at ref or is not a file
+        """
+        with get_tracer().span('git cat-file', 'git', ref=ref, path=filepath) as span:
+            oid = self.resolve_blob(filepath, ref)
+            data = self.blob_cache.get(oid)
+            span['cache_hit'] = data is not None
+            if data is None:
+                with self._cat_file_lock:
+                    _, _, _, data = self.repo.git.get_object_data(oid)
+                self.blob_cache.put(oid, data)
+            span['output_bytes'] = len(data)
+
+        get_tracer().counter('git_blob_cache', self.blob_cache.stats())
+        return data.decode('utf-8', errors='replace')
+
+    def resolve_blob(self, filepath: str, ref: str = 'HEAD') -> str:
+        """
+        Resolve a path at a ref to its blob object id.
+
+        Resolutions at a commit are immutable, so they are memoized, and
+        persisted when the blob cache has a directory.
+
+        Args:
+            filepath: Path to file relative to repo root
+            ref: Git ref (branch, tag, commit)
+
+        Returns:
+            Blob object id (hex)
+
+        Raises:
+            ValueError: If the path does not exist at ref or is not a file
+        """
+        commit = self._resolve_commit(ref)
+        if commit:
+            oid = self._path_oids.get((commit, filepath))
+            if oid is None:
+                oid = self.blob_cache.get_path_oid(commit, filepath)
+            if oid:
+                self._path_oids[(commit, filepath)] = oid
+                return oid
+
+        with self._cat_file_lock:
+            hexsha, typename, _ = self.repo.git.get_object_header(f'{commit or ref}:{filepath}')
+        if typename != b'blob':
+            raise ValueError(f'{ref}:{filepath} is a {typename.decode()}, not a file')
+
+        oid = hexsha.decode()
+        if commit:
+            self._path_oids[(commit, filepath)] = oid
+            self.blob_cache.put_path_oid(commit, filepath, oid)
+        return oid
+
+    def _resolve_commit(self, ref: str) -> Optional[str]:
+        """Resolve a ref to a commit sha without spawning git, or None."""
+        try:
+            with self._cat_file_lock:
+                hexsha = self.repo.commit(ref).hexsha
+        except Exception:
+            return None
+        return hexsha if isinstance(hexsha, str) else None
+
+    def get_many(self, requests: Sequence[Tuple[str, str]]) -> List[str]:
+        """
+        Get the content of several files through the same cat-file process.
+
+        Args:
+            requests: (ref, filepath) pairs
+
+        Returns:
+            File contents in request order
+
+        Raises:
+            ValueError: If any path does not exist at its ref
+        """
+        return [self.get_file_content(filepath, ref) for ref, filepath in requests]
+
+    def close(self) -> None:
+        """Stop the persistent git processes, if the repo was opened."""
+        if self._repo is None:
+            return
+        with self._cat_file_lock:
+            self._repo.git.clear_cache()
+
+    @property
+    def is_shallow(self) -> bool:
+        """Return True if the repository is a shallow clone."""
+        return os.path.exists(os.path.join(self.repo.git_dir, 'shallow'))
+
+    @property
+    def is_partial(self) -> bool:
+        """Return True if the repository is a partial (filtered) clone."""
+        reader = self.repo.config_reader()
+        if reader.has_option('extensions', 'partialClone'):
+            return True
+        for section in reader.sections():
+            if section.startswith('remote ') and reader.has_option(section, 'promisor'):
+                if str(reader.get_value(section, 'promisor')).lower() == 'true':
+                    return True
+        return False
+
+    def ensure_ref(self, ref: str, paths: Sequence[str] = ()) -> bool:
+        """
+        Make sure a remote-tracking ref and the given paths can be read.
+
+        Shallow and partial CI checkouts often lack the comparison branch.
+        When it is missing, only that branch is fetched: at depth 1 in a
+        shallow clone, without blobs in a partial clone (blobs are then
+        fetched on demand when read), and as a single ref otherwise.
+
+        Args:
+            ref: Remote-tracking ref such as ``origin/master``
+            paths: Paths that must exist at the ref
+
+        Returns:
+            True if the ref and paths are available
         """
-        return self.repo.git.show(f'{ref}:{filepath}')
+        if self._ref_has_paths(ref, paths):
+            return True
+
+        remote, _, branch = ref.partition('/')
+        if not branch:
+            return False
+
+        args = ['--no-tags']
+        if self.is_partial:
+            args.append('--filter=blob:none')
+        elif self.is_shallow:
+            args.append('--depth=1')
+        refspec = f'+refs/heads/{branch}:refs/remotes/{remote}/{branch}'
+
+        print(f'Fetching {ref} for comparison ({" ".join(args)})')
+        try:
+            with get_tracer().span('git fetch', 'git', ref=ref, args=args):
+                self.repo.git.fetch(*args, remote, refspec)
+        except git.GitCommandError as e:
+            print(f'WARNING: Could not fetch {ref}: {e.stderr.strip() if e.stderr else e}')
+            return False
+
+        return self._ref_has_paths(ref, paths)
+
+    def _ref_has_paths(self, ref: str, paths: Sequence[str]) -> bool:
+        """Return True if ref resolves and every path exists at it."""
+        if self._resolve_commit(ref) is None:
+            return False
+        try:
+            for path in paths:
+                self.resolve_blob(path, ref)
+        except ValueError:
+            return False
+        return True
 
     def get_current_branch(self) -> str:
         """
         Get name of current branch.
 
+        CI agents usually check out a detached HEAD, in which case the
+        branch is taken from BUILDKITE_BRANCH.
+
         Returns:
             Branch name
+
+        Raises:
+            TypeError: If HEAD is detached and BUILDKITE_BRANCH is not set
+        """
+        with get_tracer().span('git active_branch', 'git'):
+            if self.repo.head.is_detached:
+                branch = os.getenv('BUILDKITE_BRANCH')
+                if not branch:
+                    raise TypeError('HEAD is detached and BUILDKITE_BRANCH is not set')
+                return branch
+            return self.repo.active_branch.name
+
+    def merge_base(self, ref1: str, ref2: str) -> Optional[str]:
+        """
+        Find the best common ancestor of two refs.
+
+        Args:
+            ref1: First git ref
+            ref2: Second git ref
+
+        Returns:
+            Commit sha, or None if the refs share no available history
+            (for example in a shallow clone)
+        """
+        with get_tracer().span('git merge-base', 'git', refs=[ref1, ref2]):
+            try:
+                bases = self.repo.merge_base(ref1, ref2)
+            except git.GitCommandError:
+                return None
+        return bases[0].hexsha if bases else None
+
+    def list_files(self) -> List[str]:
+        """
+        List files tracked in the index (git ls-files).
+
+        Returns:
+            Paths relative to repo root, with '/' separators
+        """
+        with get_tracer().span('git ls-files', 'git') as span:
+            output = self.repo.git.ls_files('-z')
+            files = [path for path in output.split('\0') if path]
+            span['files'] = len(files)
+        return files
+
+    def blob_oids(self, paths: Sequence[str], ref: str) -> Dict[str, Optional[str]]:
         """
-        return self.repo.active_branch.name
+        Get the blob id of each path at a ref without reading content.
+
+        Args:
+            paths: Paths relative to repo root
+            ref: Git ref
+
+        Returns:
+            Path to blob id, or None for paths that do not exist at ref
+        """
+        oids = {}
+        for path in paths:
+            try:
+                oids[path] = self.resolve_blob(path, ref)
+            except ValueError:
+                oids[path] = None
+        return oids
+
+    def object_oids(self, paths: Sequence[str], ref: str) -> Dict[str, Optional[str]]:
+        """
+        Get the object id of each path at a ref, whether a file or a directory.
+
+        A directory's tree id changes whenever anything under it changes,
+        so comparing ids covers whole subtrees.
+
+        Args:
+            paths: Paths relative to repo root
+            ref: Git ref
+
+        Returns:
+            Path to blob or tree id, or None for paths that do not exist at ref
+        """
+        oids = {}
+        for path in paths:
+            try:
+                oids[path] = self.resolve_blob(path, ref)
+            except ValueError:
+                oids[path] = self._object_oid(path, ref)
+        return oids
+
+    def _object_oid(self, path: str, ref: str) -> Optional[str]:
+        """Return the id of any object at ref:path, or None if it does not exist."""
+        commit = self._resolve_commit(ref)
+        try:
+            with self._cat_file_lock:
+                hexsha, _, _ = self.repo.git.get_object_header(f'{commit or ref}:{path}')
+        except ValueError:
+            return None
+        return hexsha.decode()
+
+    def paths_unchanged(self, paths: Sequence[str], ref1: str, ref2: str) -> bool:
+        """
+        Check whether paths are identical at two refs by comparing object ids.
+
+        Args:
+            paths: Paths relative to repo root (files or directories)
+            ref1: First git ref
+            ref2: Second git ref
+
+        Returns:
+            True if every path has the same blob or tree (or is absent) at both refs
+        """
+        return self.object_oids(paths, ref1) == self.object_oids(paths, ref2)
 
     def file_changed(self, filepath: str, ref1: str, ref2: str) -> bool:
         """
-        Check if file changed between two refs.
+        Check if a file or directory changed between two refs.
 
         Args:
-            filepath: Path to file relative to repo root
+            filepath: Path to a file or directory relative to repo root
             ref1: First git ref
             ref2: Second git ref
 
         Returns:
-            True if file differs between refs
+            True if the path differs between refs
         """
-        diff = self.repo.git.diff(ref1, ref2, '--', filepath)
-        return bool(diff)
+        return not self.paths_unchanged([filepath], ref1, ref2)
@@ -0,0 +1,303 @@
+"""Disk-backed HTTP cache with conditional revalidation for requests."""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Headers that describe the transfer rather than the stored body.
+_TRANSFER_HEADERS = {'connection', 'content-encoding', 'content-length', 'keep-alive', 'transfer-encoding'}
+# Headers a 304 may update on the stored response.
+_REVALIDATION_HEADERS = ('Cache-Control', 'Date', 'ETag', 'Expires', 'Last-Modified')
+_MAX_AGE = re.compile(r'(?:^|,)\s*max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+
+@dataclass
+class CacheEntry:
+    """A stored response and when it was last validated."""
+    url: str
+    headers: Dict[str, str]
+    stored_at: float
+    fresh_for: float = 0.0
+    body: bytes = field(default=b'', repr=False)
+
+    @property
+    def etag(self) -> Optional[str]:
+        """Return the stored ETag, if any."""
+        return CaseInsensitiveDict(self.headers).get('ETag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        """Return the stored Last-Modified date, if any."""
+        return CaseInsensitiveDict(self.headers).get('Last-Modified')
+
+
+class HTTPCacheStore:
+    """
+    Response store on disk, one metadata and one body file per URL.
+
+    Entries are dropped once they have not been validated for ttl
+    seconds. When the store grows past max_bytes the least recently used
+    entries are removed. Without a directory entries are kept in memory
+    for the life of the process.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize HTTPCacheStore.
+
+        Args:
+            directory: Directory for cache files (None to keep entries in memory)
+            ttl: Seconds an entry is kept without being revalidated
+            max_bytes: Total body size kept on disk
+            clock: Wall clock (for testing)
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._memory: Dict[str, CacheEntry] = {}
+
+    def now(self) -> float:
+        """Return the current time on the store's clock."""
+        return self._clock()
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Load the entry for a URL.
+
+        Args:
+            url: Request URL
+
+        Returns:
+            Stored entry, or None if absent, expired or unreadable
+        """
+        if self.directory is None:
+            with self._lock:
+                entry = self._memory.get(url)
+                if entry and self._clock() - entry.stored_at > self.ttl:
+                    del self._memory[url]
+                    entry = None
+            return replace(entry, headers=dict(entry.headers)) if entry else None
+
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            entry = CacheEntry(body=body, **meta)
+        except (OSError, ValueError, TypeError):
+            return None
+
+        if entry.url != url or self._clock() - entry.stored_at > self.ttl:
+            self._remove(meta_path, body_path)
+            return None
+
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, entry: CacheEntry) -> None:
+        """
+        Store an entry, then evict old entries if the store is too large.
+
+        Args:
+            entry: Entry to store
+        """
+        if self.directory is None:
+            with self._lock:
+                self._memory[entry.url] = replace(entry, headers=dict(entry.headers))
+            return
+
+        meta_path, body_path = self._paths(entry.url)
+        meta = asdict(entry)
+        del meta['body']
+        suffix = f'.{os.getpid()}.{threading.get_ident()}'
+        try:
+            with open(body_path + suffix, 'wb') as f:
+                f.write(entry.body)
+            os.replace(body_path + suffix, body_path)
+            with open(meta_path + suffix, 'w') as f:
+                json.dump(meta, f)
+            os.replace(meta_path + suffix, meta_path)
+        except OSError:
+            return
+        self._evict()
+
+    def _paths(self, url: str):
+        """Return the metadata and body paths for a URL."""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, digest)
+        return f'{base}.json', f'{base}.body'
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the store fits max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                meta_path = os.path.join(self.directory, name)
+                body_path = meta_path[:-len('.json')] + '.body'
+                try:
+                    used = os.stat(meta_path).st_mtime
+                    size = os.stat(body_path).st_size
+                except OSError:
+                    continue
+                entries.append((used, size, meta_path, body_path))
+                total += size
+
+            for used, size, meta_path, body_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(meta_path, body_path)
+                total -= size
+
+    @staticmethod
+    def _remove(*paths: str) -> None:
+        """Delete files, ignoring ones already gone."""
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that serves GET requests from an HTTPCacheStore.
+
+    Fresh entries are returned without a request. Stale entries are
+    revalidated with If-None-Match/If-Modified-Since, and a 304 refreshes
+    the stored entry. Freshness comes from Cache-Control max-age, capped
+    at max_freshness; responses without it are always revalidated, and
+    no-store responses are never stored. A request sent with
+    ``Cache-Control: no-cache`` skips fresh entries but still revalidates.
+    Responses carry a cache_status attribute of 'hit', 'revalidated' or
+    'miss'.
+    """
+
+    def __init__(
+        self,
+        store: HTTPCacheStore,
+        max_freshness: Optional[float] = None,
+        **kwargs,
+    ):
+        """
+        Initialize CachingAdapter.
+
+        Args:
+            store: Response store
+            max_freshness: Upper bound on max-age in seconds (None to trust the server)
+            **kwargs: Passed to HTTPAdapter
+        """
+        super().__init__(**kwargs)
+        self.store = store
+        self.max_freshness = max_freshness
+
+    def send(self, request, stream=False, **kwargs):
+        """Send a request, answering from the cache where possible."""
+        if request.method != 'GET' or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        entry = self.store.get(request.url)
+        now = self.store.now()
+        revalidate = 'no-cache' in request.headers.get('Cache-Control', '').lower()
+        if entry and not revalidate and now - entry.stored_at < entry.fresh_for:
+            return self._cached_response(request, entry, 'hit')
+
+        if entry:
+            if entry.etag:
+                request.headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request.headers['If-Modified-Since'] = entry.last_modified
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if entry and response.status_code == 304:
+            # Drain and release the 304 so its connection goes back to the pool.
+            response.content
+            response.close()
+            for name in _REVALIDATION_HEADERS:
+                if name in response.headers:
+                    entry.headers[name] = response.headers[name]
+            entry.stored_at = now
+            entry.fresh_for = self._freshness(entry.headers)
+            self.store.put(entry)
+            return self._cached_response(request, entry, 'revalidated')
+
+        response.cache_status = 'miss'
+        if response.status_code == 200 and self._storable(response.headers):
+            self.store.put(CacheEntry(
+                url=request.url,
+                headers={k: v for k, v in response.headers.items() if k.lower() not in _TRANSFER_HEADERS},
+                stored_at=now,
+                fresh_for=self._freshness(response.headers),
+                body=response.content,
+            ))
+        return response
+
+    def _freshness(self, headers) -> float:
+        """Return seconds a response may be served without revalidation."""
+        cache_control = CaseInsensitiveDict(headers).get('Cache-Control', '')
+        if 'no-cache' in cache_control.lower():
+            return 0.0
+        match = _MAX_AGE.search(cache_control)
+        if not match:
+            return 0.0
+        seconds = float(match.group(1))
+        if self.max_freshness is not None:
+            seconds = min(seconds, self.max_freshness)
+        return seconds
+
+    @staticmethod
+    def _storable(headers) -> bool:
+        """Return True if a response may be stored and later revalidated."""
+        headers = CaseInsensitiveDict(headers)
+        if 'no-store' in headers.get('Cache-Control', '').lower():
+            return False
+        if headers.get('Vary', '').strip() == '*':
+            return False
+        return bool(headers.get('ETag') or headers.get('Last-Modified') or _MAX_AGE.search(
+            headers.get('Cache-Control', '')))
+
+    def _cached_response(self, request, entry: CacheEntry, status: str) -> requests.Response:
+        """Build a 200 response from a stored entry."""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry.body
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.cache_status = status
+        return response
@@ -1,6 +1,62 @@
 """Testable subprocess wrapper."""
+import os
+import signal
 import subprocess
-from typing import List, Optional
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Union
+
+from ..tracing import describe_command, get_tracer
+
+
+DEFAULT_MAX_WORKERS = 8
+STREAM_CHUNK_SIZE = 64 * 1024
+STDERR_TAIL_BYTES = 64 * 1024
+TERMINATE_GRACE_SECONDS = 5
+
+
+@dataclass
+class CommandOutcome:
+    """Outcome of a single command run as part of a batch."""
+    cmd: List[str]
+    result: Optional[subprocess.CompletedProcess] = None
+    error: Optional[Exception] = None
+    cancelled: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """Return True if the command ran and did not raise."""
+        return self.error is None and not self.cancelled
+
+
+@dataclass
+class BatchResult:
+    """Ordered outcomes of a batch of commands."""
+    outcomes: List[CommandOutcome] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        """Return True if every command ran and succeeded."""
+        return all(outcome.ok for outcome in self.outcomes)
+
+    @property
+    def results(self) -> List[Optional[subprocess.CompletedProcess]]:
+        """Return CompletedProcess objects in submission order."""
+        return [outcome.result for outcome in self.outcomes]
+
+    @property
+    def failures(self) -> List[CommandOutcome]:
+        """Return outcomes of commands that raised."""
+        return [outcome for outcome in self.outcomes if outcome.error is not None]
+
+    def raise_first_error(self) -> None:
+        """Re-raise the first collected error, if any."""
+        for outcome in self.outcomes:
+            if outcome.error is not None:
+                raise outcome.error
 
 
 class SubprocessRunner:
@@ -13,25 +69,267 @@ class SubprocessRunner:
         capture: bool = True,
         input: Optional[str] = None,
         cwd: Optional[str] = None,
+        timeout: Optional[float] = None,
     ) -> subprocess.CompletedProcess:
         """
         Execute a subprocess command.
 
+        With a timeout the command runs in its own process group, and the
+        whole group is terminated when the timeout expires.
+
         Args:
             cmd: Command and arguments as list
             check: Raise CalledProcessError on non-zero exit
             capture: Capture stdout/stderr
             input: String to pass to stdin
             cwd: Working directory for command
+            timeout: Seconds before the process group is killed
 
         Returns:
             CompletedProcess with stdout, stderr, returncode
+
+        Raises:
+            subprocess.TimeoutExpired: If the command exceeds the timeout
         """
-        return subprocess.run(
+        with get_tracer().span(describe_command(cmd), 'subprocess', cmd=cmd, timeout=timeout) as span:
+            if timeout is None:
+                result = subprocess.run(
+                    cmd,
+                    capture_output=capture,
+                    text=True,
+                    input=input,
+                    cwd=cwd,
+                )
+            else:
+                result = self._run_with_timeout(cmd, capture, input, cwd, timeout)
+
+            span['exit_code'] = result.returncode
+            span['output_bytes'] = _output_size(result.stdout, result.stderr)
+
+        if check:
+            result.check_returncode()
+        return result
+
+    @staticmethod
+    def _run_with_timeout(
+        cmd: List[str],
+        capture: bool,
+        input: Optional[str],
+        cwd: Optional[str],
+        timeout: float,
+    ) -> subprocess.CompletedProcess:
+        """Run a command in its own process group with a timeout."""
+        pipe = subprocess.PIPE if capture else None
+        proc = subprocess.Popen(
             cmd,
-            check=check,
-            capture_output=capture,
+            stdin=subprocess.PIPE if input is not None else None,
+            stdout=pipe,
+            stderr=pipe,
             text=True,
-            input=input,
             cwd=cwd,
+            start_new_session=True,
         )
+        try:
+            stdout, stderr = proc.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            terminate_process_group(proc)
+            stdout, stderr = proc.communicate()
+            _report_timeout(cmd, timeout, stderr)
+            raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
+        except BaseException:
+            terminate_process_group(proc)
+            raise
+
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+    def run_many(
+        self,
+        cmds: List[List[str]],
+        check: bool = True,
+        cwd: Optional[str] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        cancel_on_failure: bool = False,
+        timeout: Optional[float] = None,
+    ) -> BatchResult:
+        """
+        Execute independent commands concurrently on a bounded worker pool.
+
+        Every command goes through run(), so subclasses see each call.
+        Errors are collected per command instead of raised; use
+        BatchResult.raise_first_error() to restore fail-fast behaviour.
+
+        Args:
+            cmds: Commands to execute
+            check: Treat non-zero exit as an error for that command
+            cwd: Working directory for every command
+            max_workers: Maximum number of concurrent processes
+            cancel_on_failure: Skip commands not yet started once one fails
+            timeout: Per-command timeout in seconds
+
+        Returns:
+            BatchResult with one outcome per command, in submission order
+        """
+        outcomes = [CommandOutcome(cmd=list(cmd)) for cmd in cmds]
+        if not outcomes:
+            return BatchResult()
+
+        failed = threading.Event()
+
+        def execute(outcome: CommandOutcome) -> None:
+            if cancel_on_failure and failed.is_set():
+                outcome.cancelled = True
+                return
+            try:
+                outcome.result = self.run(outcome.cmd, check=check, cwd=cwd, timeout=timeout)
+            except Exception as e:
+                outcome.error = e
+                failed.set()
+
+        workers = max(1, min(max_workers, len(outcomes)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(execute, outcomes))
+
+        return BatchResult(outcomes=outcomes)
+
+    def stream(
+        self,
+        cmd: List[str],
+        check: bool = True,
+        cwd: Optional[str] = None,
+        binary: bool = False,
+        tee: Optional[str] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Union[str, bytes]]:
+        """
+        Execute a command and yield its stdout while it runs.
+
+        Output is never accumulated in memory: text mode yields decoded
+        lines without their trailing newline, binary mode yields raw
+        chunks as they arrive. stderr is spooled to a temporary file so a
+        chatty command cannot block on a full pipe.
+
+        Args:
+            cmd: Command and arguments as list
+            check: Raise CalledProcessError on non-zero exit once stdout ends
+            cwd: Working directory for command
+            binary: Yield raw byte chunks instead of decoded lines
+            tee: Path of a log file that receives a copy of stdout
+            chunk_size: Maximum chunk size in binary mode
+            timeout: Seconds before the process group is killed
+
+        Yields:
+            Decoded lines (text mode) or byte chunks (binary mode)
+
+        Raises:
+            subprocess.CalledProcessError: If check is True and the command fails
+            subprocess.TimeoutExpired: If the command exceeds the timeout
+        """
+        tracer = get_tracer()
+        with tracer.span(describe_command(cmd), 'subprocess', cmd=cmd, streamed=True) as span, \
+                tempfile.TemporaryFile() as stderr_file:
+            span['output_bytes'] = 0
+            proc = subprocess.Popen(
+                cmd,
+                cwd=cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=stderr_file,
+                start_new_session=timeout is not None,
+            )
+            timed_out = threading.Event()
+            timer = None
+            if timeout is not None:
+                def expire() -> None:
+                    timed_out.set()
+                    terminate_process_group(proc)
+
+                timer = threading.Timer(timeout, expire)
+                timer.daemon = True
+                timer.start()
+
+            log = None
+            try:
+                log = open(tee, 'ab') if tee else None
+                if binary:
+                    chunks = iter(lambda: proc.stdout.read1(chunk_size), b'')
+                else:
+                    chunks = iter(proc.stdout.readline, b'')
+
+                for chunk in chunks:
+                    span['output_bytes'] += len(chunk)
+                    if log:
+                        log.write(chunk)
+                    if binary:
+                        yield chunk
+                    else:
+                        yield chunk.decode('utf-8', errors='replace').rstrip('\r\n')
+
+                returncode = proc.wait()
+                span['exit_code'] = returncode
+            finally:
+                if timer:
+                    timer.cancel()
+                if proc.poll() is None:
+                    if timeout is not None:
+                        terminate_process_group(proc)
+                    else:
+                        proc.kill()
+                    proc.wait()
+                proc.stdout.close()
+                if log:
+                    log.close()
+
+            if timed_out.is_set():
+                stderr = _read_tail(stderr_file)
+                _report_timeout(cmd, timeout, stderr)
+                raise subprocess.TimeoutExpired(cmd, timeout, stderr=stderr)
+
+            if check and returncode != 0:
+                raise subprocess.CalledProcessError(returncode, cmd, stderr=_read_tail(stderr_file))
+
+
+def _output_size(*outputs: Optional[Union[str, bytes]]) -> int:
+    """Return the combined length of captured outputs."""
+    return sum(len(output) for output in outputs if output)
+
+
+def _read_tail(stream) -> str:
+    """Return the last STDERR_TAIL_BYTES of a spooled file as text."""
+    stream.seek(0, 2)
+    stream.seek(max(0, stream.tell() - STDERR_TAIL_BYTES))
+    return stream.read().decode('utf-8', errors='replace')
+
+
+def _report_timeout(cmd: List[str], timeout: float, stderr: Optional[str]) -> None:
+    """Print diagnostics for a command killed by its timeout."""
+    print(f'Command timed out after {timeout:.0f}s and was terminated: {describe_command(cmd)}',
+          file=sys.stderr)
+    if stderr:
+        print(f'Last stderr output:\n{stderr[-2000:]}', file=sys.stderr)
+
+
+def terminate_process_group(proc: subprocess.Popen) -> None:
+    """
+    Terminate a process started with start_new_session=True and its children.
+
+    Sends SIGTERM to the whole group, then SIGKILL if it has not exited
+    within TERMINATE_GRACE_SECONDS.
+
+    Args:
+        proc: Process that leads its own process group
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+
+    try:
+        proc.wait(timeout=TERMINATE_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        pass
+
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
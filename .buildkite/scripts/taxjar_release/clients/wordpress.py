@@ -1,54 +1,319 @@
 """WordPress.org API client."""
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
 import requests
+from urllib3.util.retry import Retry
+
+from .http_cache import CachingAdapter, HTTPCacheStore
+from ..cache import cache_dir
+from ..exceptions import WordPressAPIError
+from ..tracing import get_tracer
+
+
+CONNECT_TIMEOUT_SECONDS = 5
+READ_TIMEOUT_SECONDS = 20
+POOL_SIZE = 4
+
+
+class _CappedRetry(Retry):
+    """Retry that will not sleep longer than MAX_RETRY_AFTER for Retry-After."""
+
+    MAX_RETRY_AFTER = 30
+
+    def get_retry_after(self, response):
+        """Return the server's Retry-After, capped at MAX_RETRY_AFTER."""
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.MAX_RETRY_AFTER)
+
+
+def transport_retry() -> Retry:
+    """
+    Return the retry policy for WordPress.org requests.
+
+    Only idempotent GET and HEAD requests are retried: on connection
+    errors, read errors and 429/5xx responses. Retry-After is honoured
+    up to _CappedRetry.MAX_RETRY_AFTER seconds; otherwise retries back
+    off exponentially. The final response is returned, not raised, so
+    callers see the real status code.
+    """
+    return _CappedRetry(
+        total=3,
+        connect=3,
+        read=2,
+        status=3,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
 
 
 class WordPressClient:
     """Client for WordPress.org plugin API."""
 
     API_BASE = 'https://api.wordpress.org/plugins/info/1.0'
+    SVN_BASE = 'https://plugins.svn.wordpress.org'
+    CORE_API = 'https://api.wordpress.org/core/version-check/1.7/'
+    # Plugin info decides whether a release runs, so never trust it for long.
+    CACHE_MAX_FRESHNESS = 60
 
-    def __init__(self, session: Optional[requests.Session] = None):
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        api_base: Optional[str] = None,
+        svn_base: Optional[str] = None,
+        core_api: Optional[str] = None,
+        timeout: Tuple[float, float] = (CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS),
+    ):
         """
         Initialize WordPressClient.
 
         Args:
-            session: requests Session instance (created if not provided)
+            session: requests Session instance (shared per process if not provided)
+            api_base: Plugin info API base URL (for testing)
+            svn_base: Plugin SVN repository base URL (for testing)
+            core_api: WordPress core version-check URL (for testing)
+            timeout: Connect and read timeouts in seconds for every request
+        """
+        self.session = session or get_session()
+        self.api_base = api_base or self.API_BASE
+        self.svn_base = svn_base or self.SVN_BASE
+        self.core_api = core_api or self.CORE_API
+        self.timeout = timeout
+
+    @classmethod
+    def create_session(cls, retry: bool = True) -> requests.Session:
+        """
+        Create a session with the tuned transport and HTTP cache mounted.
+
+        Connections are pooled and kept alive, responses are requested
+        gzip-compressed, and GET/HEAD requests are retried by
+        transport_retry(). Responses are cached on disk under
+        RELEASE_TOOL_CACHE_DIR when it is set, and in memory for this
+        process otherwise.
+
+        Args:
+            retry: Retry failed requests (callers that poll on their own
+                turn this off so a request never outlives its timeout)
+
+        Returns:
+            Configured session
+        """
+        session = requests.Session()
+        session.headers['Accept-Encoding'] = 'gzip, deflate'
+        adapter = CachingAdapter(
+            HTTPCacheStore(cache_dir('http')),
+            max_freshness=cls.CACHE_MAX_FRESHNESS,
+            max_retries=transport_retry() if retry else 0,
+            pool_connections=POOL_SIZE,
+            pool_maxsize=POOL_SIZE,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def get_plugin_info(
+        self,
+        slug: str,
+        revalidate: bool = False,
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get the plugin info document from WordPress.org.
+
+        Args:
+            slug: Plugin slug (e.g., 'taxjar-simplified-taxes-for-woocommerce')
+            revalidate: Check a cached response with the server even if fresh
+            timeout: Connect and read timeouts for this request (client default if not provided)
+
+        Returns:
+            Plugin info (version, versions, sections, ...)
+
+        Raises:
+            WordPressAPIError: If the API cannot be reached or returns an error
         """
-        self.session = session or requests.Session()
+        return self._get_json(f'{self.api_base}/{slug}.json', 'plugin API', revalidate, timeout)
 
-    def get_plugin_version(self, slug: str) -> str:
+    def get_plugin_version(
+        self,
+        slug: str,
+        revalidate: bool = False,
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> str:
         """
         Get current version of plugin from WordPress.org.
 
         Args:
             slug: Plugin slug (e.g., 'taxjar-simplified-taxes-for-woocommerce')
+            revalidate: Check a cached response with the server even if fresh
+            timeout: Connect and read timeouts for this request (client default if not provided)
 
         Returns:
             Current version string
 
         Raises:
-            requests.HTTPError: If API request fails
+            WordPressAPIError: If the API cannot be reached or returns an error
+        """
+        return self.get_plugin_info(slug, revalidate, timeout).get('version', '')
+
+    def get_plugin_readme(self, slug: str, version: str) -> str:
         """
-        url = f'{self.API_BASE}/{slug}.json'
-        response = self.session.get(url)
-        response.raise_for_status()
-        data = response.json()
-        return data.get('version', '')
+        Get readme.txt of a tagged plugin version from the SVN repository.
+
+        Args:
+            slug: Plugin slug
+            version: Tagged version
+
+        Returns:
+            readme.txt content
+
+        Raises:
+            WordPressAPIError: If the readme cannot be fetched
+        """
+        return self._get(f'{self.svn_base}/{slug}/tags/{version}/readme.txt', 'SVN').text
+
+    def get_latest_wordpress_version(self) -> str:
+        """
+        Get the latest WordPress core release.
+
+        Returns:
+            Version string (e.g., '6.8.3')
+
+        Raises:
+            WordPressAPIError: If the core API cannot be reached or returns an error
+        """
+        data = self._get_json(self.core_api, 'core API')
+        try:
+            return data['offers'][0]['version']
+        except (KeyError, IndexError, TypeError) as e:
+            raise WordPressAPIError('WordPress.org core API returned no offers') from e
+
+    def _get(
+        self,
+        url: str,
+        service: str,
+        revalidate: bool = False,
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> requests.Response:
+        """Send a traced GET and raise WordPressAPIError on failure."""
+        headers = {'Cache-Control': 'no-cache'} if revalidate else None
+        try:
+            with get_tracer().span(f'GET {url}', 'http', url=url) as span:
+                response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+                span['status'] = response.status_code
+                span['output_bytes'] = len(response.content)
+                if hasattr(response, 'cache_status'):
+                    span['cache'] = response.cache_status
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise WordPressAPIError(f'WordPress.org {service} request failed: {e}') from e
+        return response
+
+    def _get_json(
+        self,
+        url: str,
+        service: str,
+        revalidate: bool = False,
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> Any:
+        """Send a traced GET and decode the JSON body."""
+        response = self._get(url, service, revalidate, timeout)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise WordPressAPIError(f'WordPress.org {service} returned invalid JSON: {e}') from e
 
     def version_exists(self, slug: str, version: str) -> bool:
         """
         Check if a specific version exists on WordPress.org.
 
+        The SVN tag is the answer: a release counts as existing only once
+        it is tagged, so a version that is current in the plugin info API
+        but was never tagged (a deploy that failed after the trunk commit)
+        does not exist. The plugin info API is queried alongside the tag
+        lookup and its answer is used only if the tag lookup fails.
+
         Args:
             slug: Plugin slug
             version: Version to check
 
         Returns:
-            True if version matches current WordPress.org version
+            True if the version is tagged, or if the tag lookup failed and
+            it is the current WordPress.org version
+
+        Raises:
+            WordPressAPIError: If neither lookup succeeds
         """
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='wporg')
+        tag_check = executor.submit(self.tag_exists, slug, version)
+        api_check = executor.submit(self.get_plugin_version, slug)
         try:
-            current_version = self.get_plugin_version(slug)
-            return current_version == version
-        except Exception:
-            return False
+            try:
+                return tag_check.result()
+            except WordPressAPIError as tag_error:
+                try:
+                    return api_check.result() == version
+                except WordPressAPIError:
+                    raise tag_error
+        finally:
+            # Do not wait for the API lookup once the tag has answered.
+            executor.shutdown(wait=False)
+
+    def tag_exists(
+        self,
+        slug: str,
+        version: str,
+        timeout: Optional[Tuple[float, float]] = None,
+    ) -> bool:
+        """
+        Check whether a version is tagged in the plugin SVN repository.
+
+        Args:
+            slug: Plugin slug
+            version: Version to check
+            timeout: Connect and read timeouts for this request (client default if not provided)
+
+        Returns:
+            True if tags/<version>/ exists
+
+        Raises:
+            WordPressAPIError: If the repository cannot be reached or answers
+                with an error other than 404
+        """
+        url = f'{self.svn_base}/{slug}/tags/{version}/'
+        try:
+            with get_tracer().span(f'HEAD {url}', 'http', url=url) as span:
+                response = self.session.head(url, allow_redirects=True, timeout=timeout or self.timeout)
+                span['status'] = response.status_code
+            if response.status_code == 404:
+                return False
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise WordPressAPIError(f'WordPress.org SVN request failed: {e}') from e
+        return True
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide WordPress.org session, creating it once."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = WordPressClient.create_session()
+        return _session
+
+
+def reset_session() -> None:
+    """Close and forget the process-wide session (for testing)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
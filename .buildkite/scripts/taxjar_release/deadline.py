@@ -0,0 +1,100 @@
+"""Release time budgets."""
+import time
+from typing import Callable, Optional
+
+from .exceptions import DeadlineExceededError
+
+
+BUDGET_ENV = 'RELEASE_BUDGET_SECONDS'
+
+# Time held back from commands so cleanup and annotations can still run.
+CLEANUP_RESERVE_SECONDS = 30
+CLEANUP_RESERVE_FRACTION = 0.1
+
+
+class Deadline:
+    """Tracks how much of a release time budget is left."""
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        reserve: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize Deadline.
+
+        Args:
+            seconds: Total budget in seconds (None for no limit)
+            reserve: Seconds at the end of the budget kept free for cleanup
+            clock: Monotonic clock (for testing)
+        """
+        self._clock = clock
+        self._end = None if seconds is None else clock() + seconds - reserve
+
+    @classmethod
+    def from_budget(cls, seconds: Optional[float]) -> 'Deadline':
+        """
+        Create a deadline that keeps a cleanup reserve.
+
+        The reserve is CLEANUP_RESERVE_SECONDS, capped at
+        CLEANUP_RESERVE_FRACTION of the budget.
+
+        Args:
+            seconds: Total budget in seconds (None for no limit)
+
+        Returns:
+            Deadline for command execution
+        """
+        if seconds is None:
+            return cls()
+        reserve = min(CLEANUP_RESERVE_SECONDS, seconds * CLEANUP_RESERVE_FRACTION)
+        return cls(seconds, reserve=reserve)
+
+    @property
+    def unlimited(self) -> bool:
+        """Return True if there is no budget."""
+        return self._end is None
+
+    def remaining(self) -> Optional[float]:
+        """Return seconds left, or None if there is no budget."""
+        if self._end is None:
+            return None
+        return max(0.0, self._end - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        """Return True if the budget is used up."""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """
+        Check whether work of the given length can finish in time.
+
+        Args:
+            seconds: Expected duration
+
+        Returns:
+            True if the budget has at least that much time left
+        """
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+
+    def timeout(self, operation: str = 'operation') -> Optional[float]:
+        """
+        Return the timeout for the next command.
+
+        Args:
+            operation: Description used in the error message
+
+        Returns:
+            Remaining seconds, or None if there is no budget
+
+        Raises:
+            DeadlineExceededError: If the budget is already used up
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError(f'Release time budget exhausted before {operation}')
+        return remaining
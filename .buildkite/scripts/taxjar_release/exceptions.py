@@ -19,3 +19,23 @@ class GitHubReleaseError(ReleaseError):
 class SVNDeployError(ReleaseError):
     """SVN deployment failed."""
     pass
+
+
+class WordPressAPIError(ReleaseError):
+    """WordPress.org could not be queried."""
+    pass
+
+
+class BuildkiteError(ReleaseError):
+    """A buildkite-agent call failed."""
+    pass
+
+
+class CassetteError(ReleaseError):
+    """Subprocess cassette could not be read or replayed."""
+    pass
+
+
+class DeadlineExceededError(ReleaseError):
+    """Release time budget ran out."""
+    pass
@@ -2,6 +2,7 @@
 import subprocess
 from typing import Optional
 
+from .deadline import Deadline
 from .retry import retry
 from .clients.subprocess_runner import SubprocessRunner
 from .exceptions import GitHubReleaseError
@@ -13,21 +14,29 @@ GITHUB_REPO = 'taxjar/taxjar-woocommerce-plugin'
 class GitHubReleaseManager:
     """Manages GitHub release creation."""
 
-    def __init__(self, runner: Optional[SubprocessRunner] = None, repo: str = GITHUB_REPO):
+    def __init__(
+        self,
+        runner: Optional[SubprocessRunner] = None,
+        repo: str = GITHUB_REPO,
+        deadline: Optional[Deadline] = None,
+    ):
         """
         Initialize GitHubReleaseManager.
 
         Args:
             runner: SubprocessRunner instance
             repo: GitHub repository in owner/repo format
+            deadline: Release time budget shared by all gh commands
         """
         self.runner = runner or SubprocessRunner()
         self.repo = repo
+        self.deadline = deadline or Deadline()
 
     @retry(
         max_attempts=3,
         backoff=[2, 4, 8],
         exceptions=(GitHubReleaseError,),
+        min_attempt_seconds=10,
     )
     def create_release(
         self,
@@ -62,9 +71,15 @@ class GitHubReleaseManager:
             cmd.append('--generate-notes')
 
         try:
-            result = self.runner.run(cmd, check=True)
+            result = self.runner.run(
+                cmd,
+                check=True,
+                timeout=self.deadline.timeout('gh release create'),
+            )
             print(f'✓ GitHub release {version} created')
             return result.stdout.strip()
+        except subprocess.TimeoutExpired as e:
+            raise GitHubReleaseError(f'Timed out creating release {version}: {e}') from e
         except subprocess.CalledProcessError as e:
             error_msg = f"Failed to create release {version}: {e}"
             if e.stderr:
@@ -0,0 +1,271 @@
+"""Deploy manifest: tracked plugin files minus .distignore exclusions."""
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Pattern, Set
+
+from .clients.git import GitClient
+from .sync import file_digest
+from .tracing import get_tracer
+
+
+DISTIGNORE_FILE = '.distignore'
+
+
+@dataclass
+class _Rule:
+    """One compiled .distignore pattern."""
+    pattern: str
+    regex: Pattern
+    negate: bool
+    dir_only: bool
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        """Return True if the rule applies to a path."""
+        if self.dir_only and not is_dir:
+            return False
+        return bool(self.regex.match(path))
+
+
+class DistIgnore:
+    """
+    Exclusion rules read from .distignore, with gitignore semantics.
+
+    Blank lines and '#' comments are skipped and '!' re-includes. A
+    trailing '/' matches directories only. A pattern containing another
+    '/' is anchored to the root; otherwise it matches at any depth. '*'
+    and '?' do not cross '/', and '**' matches any number of directories.
+    As in git, a file inside an excluded directory cannot be re-included.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        """
+        Initialize DistIgnore.
+
+        Args:
+            patterns: Lines of a .distignore file
+        """
+        self.rules: List[_Rule] = []
+        for line in patterns:
+            rule = _compile(line)
+            if rule:
+                self.rules.append(rule)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'DistIgnore':
+        """
+        Read rules from a file.
+
+        Args:
+            path: .distignore path
+
+        Returns:
+            DistIgnore (empty if the file does not exist)
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(f.read().splitlines())
+        except FileNotFoundError:
+            return cls()
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Check whether a path is excluded from the distribution.
+
+        Args:
+            path: Path relative to the plugin root, with '/' separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the path or one of its parent directories is excluded
+        """
+        parts = path.strip('/').split('/')
+        for depth in range(1, len(parts) + 1):
+            if self._excluded('/'.join(parts[:depth]), is_dir or depth < len(parts)):
+                return True
+        return False
+
+    def _excluded(self, path: str, is_dir: bool) -> bool:
+        """Return the outcome of the last rule matching a path."""
+        excluded = False
+        for rule in self.rules:
+            if rule.matches(path, is_dir):
+                excluded = not rule.negate
+        return excluded
+
+
+@dataclass
+class ManifestEntry:
+    """A file to ship."""
+    path: str
+    size: int
+    sha256: str
+
+
+class Manifest:
+    """
+    The files that make up a plugin release, with sizes and hashes.
+
+    Built once per release, it is the single file list shared by the SVN
+    sync and anything else that packages or verifies the release.
+    """
+
+    def __init__(self, entries: Iterable[ManifestEntry]):
+        """
+        Initialize Manifest.
+
+        Args:
+            entries: Files to ship
+        """
+        self.entries: Dict[str, ManifestEntry] = {entry.path: entry for entry in entries}
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.entries
+
+    def __iter__(self):
+        return iter(self.entries[path] for path in sorted(self.entries))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        """Return the entry for a path, if shipped."""
+        return self.entries.get(path)
+
+    @property
+    def total_size(self) -> int:
+        """Return the size of all shipped files in bytes."""
+        return sum(entry.size for entry in self.entries.values())
+
+    def directories(self) -> Set[str]:
+        """Return every directory that contains a shipped file."""
+        directories = set()
+        for path in self.entries:
+            parent = os.path.dirname(path)
+            while parent and parent not in directories:
+                directories.add(parent)
+                parent = os.path.dirname(parent)
+        return directories
+
+    def write(self, path: str) -> None:
+        """
+        Save the manifest as JSON.
+
+        Args:
+            path: Output file
+        """
+        with open(path, 'w') as f:
+            json.dump({'files': [asdict(entry) for entry in self]}, f, indent=2)
+
+    @classmethod
+    def read(cls, path: str) -> 'Manifest':
+        """
+        Load a manifest saved with write().
+
+        Args:
+            path: Manifest file
+
+        Returns:
+            Manifest
+        """
+        with open(path) as f:
+            return cls(ManifestEntry(**entry) for entry in json.load(f)['files'])
+
+
+def build_manifest(source_dir: str = '.', git_client: Optional[GitClient] = None) -> Manifest:
+    """
+    List the files to ship from a plugin checkout.
+
+    Only files tracked by git are considered. Hidden top-level entries
+    (.git, .buildkite, ...) are never shipped, and anything matched by the
+    source's .distignore is dropped. Tracked files missing from the
+    working tree are skipped.
+
+    Args:
+        source_dir: Plugin repository root
+        git_client: GitClient for source_dir (created if not provided)
+
+    Returns:
+        Manifest of the files to ship
+    """
+    git_client = git_client or GitClient(source_dir)
+    distignore = DistIgnore.from_file(os.path.join(source_dir, DISTIGNORE_FILE))
+
+    with get_tracer().span('build manifest', 'fs', source=source_dir) as span:
+        entries = []
+        for path in git_client.list_files():
+            if path.startswith('.') or distignore.is_ignored(path):
+                continue
+            full_path = os.path.join(source_dir, path)
+            try:
+                size = os.stat(full_path).st_size
+            except FileNotFoundError:
+                continue
+            entries.append(ManifestEntry(path=path, size=size, sha256=file_digest(full_path)))
+        manifest = Manifest(entries)
+        span['files'] = len(manifest)
+        span['bytes'] = manifest.total_size
+    return manifest
+
+
+def _compile(line: str) -> Optional[_Rule]:
+    """Compile one .distignore line, or return None for blanks and comments."""
+    pattern = re.sub(r'(?<!\\)\s+$', '', line)
+    if not pattern or pattern.startswith('#'):
+        return None
+
+    negate = pattern.startswith('!')
+    if negate:
+        pattern = pattern[1:]
+    elif pattern.startswith(('\\!', '\\#')):
+        pattern = pattern[1:]
+
+    dir_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    if not pattern:
+        return None
+
+    regex = _translate(pattern)
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+    return _Rule(pattern=line, regex=re.compile(f'^{regex}$'), negate=negate, dir_only=dir_only)
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob to a regular expression."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i) and (i == 0 or pattern[i - 1] == '/'):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i) and i + 2 == len(pattern) and (i == 0 or pattern[i - 1] == '/'):
+            out.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            out.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            out.append('[^/]')
+            i += 1
+        elif pattern[i] == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                out.append(re.escape('['))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            out.append(f'[{body}]')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(out)
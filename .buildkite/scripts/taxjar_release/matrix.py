@@ -0,0 +1,218 @@
+"""Refresh of the WooCommerce/WordPress/PHP test version matrix."""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .clients.wordpress import WordPressClient
+from .exceptions import WordPressAPIError
+from .version import VersionDetector
+
+
+MATRIX_FILE = '.buildkite/scripts/version-matrix.sh'
+
+_STABLE_VERSION = re.compile(r'^\d+\.\d+\.\d+$')
+_MATRIX_BLOCK = re.compile(r'(?P<head>^\s*"(?P<major>\d+)\.x"\)\n)(?P<body>.*?)(?=^\s*;;)', re.MULTILINE | re.DOTALL)
+_FALLBACK_BLOCK = re.compile(r'(?P<head>^\s*\*\)\n)(?P<body>.*?)(?=^\s*;;)', re.MULTILINE | re.DOTALL)
+_EXPORT = 'export {name}="{value}"'
+
+
+@dataclass
+class MatrixEntry:
+    """Versions tested for one WooCommerce major."""
+    major: int
+    wc_version: str
+    php_version: str
+    wp_version: str
+
+
+@dataclass
+class MatrixRefreshResult:
+    """Result of a matrix refresh."""
+    entries: List[MatrixEntry]
+    content: str
+    changed: bool
+    latest_wc: str
+    warnings: List[str] = field(default_factory=list)
+
+
+def version_key(version: str) -> Tuple[int, ...]:
+    """Return a sortable key for a dotted version."""
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+
+def parse_matrix(content: str) -> List[MatrixEntry]:
+    """
+    Parse the per-major entries of version-matrix.sh.
+
+    Args:
+        content: version-matrix.sh content
+
+    Returns:
+        Entries in file order
+    """
+    entries = []
+    for block in _MATRIX_BLOCK.finditer(content):
+        body = block.group('body')
+        entries.append(MatrixEntry(
+            major=int(block.group('major')),
+            wc_version=_export_value(body, 'WC_VERSION'),
+            php_version=_export_value(body, 'PHP_VERSION'),
+            wp_version=_export_value(body, 'WP_VERSION'),
+        ))
+    return entries
+
+
+def render_matrix(content: str, entries: List[MatrixEntry]) -> str:
+    """
+    Write entries back into version-matrix.sh, keeping everything else.
+
+    The fallback block is updated too when it mirrors one of the majors.
+
+    Args:
+        content: Current version-matrix.sh content
+        entries: Refreshed entries
+
+    Returns:
+        Updated content
+    """
+    by_major = {entry.major: entry for entry in entries}
+    fallback_major = None
+    fallback = _FALLBACK_BLOCK.search(content)
+    if fallback:
+        wc_version = _export_value(fallback.group('body'), 'WC_VERSION')
+        if wc_version:
+            fallback_major = version_key(wc_version)[0]
+
+    def update(block: re.Match, entry: Optional[MatrixEntry]) -> str:
+        body = block.group('body')
+        if entry:
+            body = _set_export(body, 'WC_VERSION', entry.wc_version)
+            body = _set_export(body, 'PHP_VERSION', entry.php_version)
+            body = _set_export(body, 'WP_VERSION', entry.wp_version)
+        return block.group('head') + body
+
+    content = _MATRIX_BLOCK.sub(lambda block: update(block, by_major.get(int(block.group('major')))), content)
+    return _FALLBACK_BLOCK.sub(lambda block: update(block, by_major.get(fallback_major)), content)
+
+
+def read_header(content: str, name: str) -> Optional[str]:
+    """Return a plugin header value such as 'WC tested up to'."""
+    match = re.search(rf'^[\s*]*{re.escape(name)}:\s*(\S+)', content, re.MULTILINE | re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def _export_value(body: str, name: str) -> Optional[str]:
+    """Return the value of an export line in a case block."""
+    match = re.search(rf'export {name}="([^"]*)"', body)
+    return match.group(1) if match else None
+
+
+def _set_export(body: str, name: str, value: str) -> str:
+    """Replace the value of an export line in a case block."""
+    return re.sub(rf'export {name}="[^"]*"', _EXPORT.format(name=name, value=value), body)
+
+
+class VersionMatrixRefresher:
+    """Finds the latest WooCommerce and WordPress versions for each tracked major."""
+
+    WC_SLUG = 'woocommerce'
+    MAX_WORKERS = 4
+
+    def __init__(self, wordpress_client: WordPressClient):
+        """
+        Initialize VersionMatrixRefresher.
+
+        Args:
+            wordpress_client: WordPress.org client
+        """
+        self.wordpress = wordpress_client
+
+    def refresh(self, matrix: str, plugin_file: str) -> MatrixRefreshResult:
+        """
+        Compute an up-to-date matrix.
+
+        For every tracked major, WC_VERSION becomes the latest stable
+        release of that major and WP_VERSION the minimum WordPress it
+        requires ("Requires at least" in that release's readme), capped at
+        the latest WordPress release. PHP_VERSION pins are kept. The
+        readmes and the core version are fetched concurrently.
+
+        Args:
+            matrix: Current version-matrix.sh content
+            plugin_file: Main plugin file content
+
+        Returns:
+            MatrixRefreshResult with the new content and any warnings
+
+        Raises:
+            WordPressAPIError: If WordPress.org cannot be queried
+        """
+        current = parse_matrix(matrix)
+        releases = self._stable_releases()
+        if not releases:
+            raise WordPressAPIError('WordPress.org lists no stable WooCommerce releases')
+        latest_wc = max(releases.values(), key=version_key)
+        warnings = []
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix='matrix') as executor:
+            latest_wp = executor.submit(self.wordpress.get_latest_wordpress_version)
+            readmes = {
+                entry.major: executor.submit(self.wordpress.get_plugin_readme, self.WC_SLUG, releases[entry.major])
+                for entry in current
+                if entry.major in releases
+            }
+
+            entries = []
+            for entry in current:
+                if entry.major not in readmes:
+                    warnings.append(f'No stable WooCommerce {entry.major}.x release found; keeping {entry.wc_version}')
+                    entries.append(entry)
+                    continue
+
+                wp_version = read_header(readmes[entry.major].result(), 'Requires at least') or entry.wp_version
+                if version_key(wp_version) > version_key(latest_wp.result()):
+                    wp_version = latest_wp.result()
+                entries.append(MatrixEntry(
+                    major=entry.major,
+                    wc_version=releases[entry.major],
+                    php_version=entry.php_version,
+                    wp_version=_major_minor(wp_version),
+                ))
+
+        newest_major = version_key(latest_wc)[0]
+        if current and newest_major > max(entry.major for entry in current):
+            warnings.append(f'WooCommerce {newest_major}.x ({latest_wc}) is not tracked in the matrix')
+
+        tested = read_header(plugin_file, 'WC tested up to')
+        if tested and version_key(latest_wc)[:2] > version_key(tested)[:2]:
+            warnings.append(
+                f'{VersionDetector.PLUGIN_FILE} declares "WC tested up to: {tested}" '
+                f'but WooCommerce {latest_wc} is available'
+            )
+
+        content = render_matrix(matrix, entries)
+        return MatrixRefreshResult(
+            entries=entries,
+            content=content,
+            changed=content != matrix,
+            latest_wc=latest_wc,
+            warnings=warnings,
+        )
+
+    def _stable_releases(self) -> Dict[int, str]:
+        """Return the latest stable WooCommerce release of each major."""
+        versions = self.wordpress.get_plugin_info(self.WC_SLUG).get('versions') or {}
+        releases: Dict[int, str] = {}
+        for version in versions:
+            if not _STABLE_VERSION.match(version):
+                continue
+            major = version_key(version)[0]
+            if major not in releases or version_key(version) > version_key(releases[major]):
+                releases[major] = version
+        return releases
+
+
+def _major_minor(version: str) -> str:
+    """Trim a WordPress version to major.minor, as the matrix pins it."""
+    return '.'.join(version.split('.')[:2])
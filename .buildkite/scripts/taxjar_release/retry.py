@@ -3,19 +3,29 @@ import functools
 import time
 from typing import Callable, List, Tuple, Type
 
+from .deadline import Deadline
+from .exceptions import DeadlineExceededError
+from .tracing import get_tracer
+
 
 def retry(
     max_attempts: int = 3,
     backoff: List[int] = None,
     exceptions: Tuple[Type[Exception], ...] = (Exception,),
+    min_attempt_seconds: float = 0,
 ) -> Callable:
     """
     Retry decorator with configurable backoff.
 
+    When the decorated function is a method whose instance has a
+    ``deadline`` attribute, no attempt is started unless the deadline
+    leaves at least ``min_attempt_seconds`` after the backoff sleep.
+
     Args:
         max_attempts: Maximum number of attempts
         backoff: List of sleep times between attempts (e.g., [2, 4, 8])
         exceptions: Tuple of exceptions to catch and retry
+        min_attempt_seconds: Time an attempt needs to have a chance of finishing
 
     Returns:
         Decorated function
@@ -26,15 +36,35 @@ def retry(
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            deadline = getattr(args[0], 'deadline', None) if args else None
+            if not isinstance(deadline, Deadline):
+                deadline = None
+
+            if deadline and not deadline.allows(min_attempt_seconds):
+                raise DeadlineExceededError(
+                    f'Not enough release time budget left to start {func.__qualname__}'
+                )
+
             for attempt in range(1, max_attempts + 1):
                 try:
-                    return func(*args, **kwargs)
+                    with get_tracer().span(
+                        f'{func.__qualname__} attempt {attempt}',
+                        'retry',
+                        attempt=attempt,
+                        max_attempts=max_attempts,
+                    ):
+                        return func(*args, **kwargs)
                 except exceptions as e:
                     if attempt >= max_attempts:
                         raise
 
-                    if attempt - 1 < len(backoff):
-                        sleep_time = backoff[attempt - 1]
+                    sleep_time = backoff[attempt - 1] if attempt - 1 < len(backoff) else 0
+                    if deadline and not deadline.allows(sleep_time + min_attempt_seconds):
+                        print(f'Attempt {attempt} failed: {e}. '
+                              f'Not retrying: release time budget nearly exhausted.')
+                        raise
+
+                    if sleep_time:
                         print(f'Attempt {attempt} failed: {e}. Retrying in {sleep_time}s...')
                         time.sleep(sleep_time)
                     else:
@@ -0,0 +1,160 @@
+"""Parallel file copies that use copy-on-write clones where available."""
+import errno
+import fcntl
+import os
+import shutil
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple, TypeVar
+
+from .tracing import get_tracer
+
+
+# Copies are I/O bound but still pay for Python per file, so more threads
+# than CPUs only adds contention.
+STAGE_WORKERS = min(8, os.cpu_count() or 1)
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# ioctl(2) request that shares extents between files (Linux _IOW(0x94, 9, int)).
+FICLONE = 0x40049409
+
+# Errors meaning "this method does not work between these filesystems".
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EBADF}
+
+METHOD_CLONE = 'clone'
+METHOD_COPY_FILE_RANGE = 'copy_file_range'
+METHOD_COPY = 'copy'
+
+# (source device, target device) -> methods known not to work.
+_unsupported: Dict[Tuple[int, int], Set[str]] = {}
+_unsupported_lock = threading.Lock()
+
+T = TypeVar('T')
+
+
+def copy_file(source: str, target: str) -> str:
+    """
+    Copy a file, keeping its mode and timestamps.
+
+    The copy is written to a temporary file next to the target and then
+    renamed over it, so a target that is a hard link never changes the
+    other links' content. The data is reflinked with FICLONE when the
+    filesystem supports it, copied in the kernel with copy_file_range
+    otherwise, and read and written as a last resort, including when
+    copy_file_range copies a different number of bytes than the source
+    holds. Methods that fail for a pair of devices are not tried again
+    for that pair.
+
+    Args:
+        source: File to copy
+        target: Destination path (replaced if it exists)
+
+    Returns:
+        Method used: METHOD_CLONE, METHOD_COPY_FILE_RANGE or METHOD_COPY
+    """
+    temp = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(source, 'rb') as src, open(temp, 'wb') as dst:
+            source_stat = os.fstat(src.fileno())
+            devices = (source_stat.st_dev, os.fstat(dst.fileno()).st_dev)
+            method = _copy_data(src, dst, devices, source_stat.st_size)
+        shutil.copystat(source, temp)
+        os.replace(temp, target)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    return method
+
+
+def _copy_data(src, dst, devices: Tuple[int, int], size: int) -> str:
+    """Copy file content between open files with the fastest working method."""
+    with _unsupported_lock:
+        unsupported = set(_unsupported.get(devices, ()))
+
+    if METHOD_CLONE not in unsupported:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return METHOD_CLONE
+        except OSError as e:
+            _check_unsupported(e, devices, METHOD_CLONE)
+
+    if METHOD_COPY_FILE_RANGE not in unsupported and hasattr(os, 'copy_file_range'):
+        copied = 0
+        try:
+            while True:
+                count = os.copy_file_range(src.fileno(), dst.fileno(), COPY_CHUNK_BYTES)
+                if not count:
+                    break
+                copied += count
+        except OSError as e:
+            _check_unsupported(e, devices, METHOD_COPY_FILE_RANGE)
+        else:
+            if copied == size:
+                return METHOD_COPY_FILE_RANGE
+            if not copied:
+                # Some filesystems report end of file without copying anything.
+                _mark_unsupported(devices, METHOD_COPY_FILE_RANGE)
+        # Start over in case part of the data was copied.
+        src.seek(0)
+        dst.seek(0)
+        dst.truncate()
+
+    shutil.copyfileobj(src, dst, COPY_CHUNK_BYTES)
+    return METHOD_COPY
+
+
+def _check_unsupported(error: OSError, devices: Tuple[int, int], method: str) -> None:
+    """Remember that a method does not work between devices, or re-raise."""
+    if error.errno not in _UNSUPPORTED:
+        raise error
+    _mark_unsupported(devices, method)
+
+
+def _mark_unsupported(devices: Tuple[int, int], method: str) -> None:
+    """Remember that a method does not work between devices."""
+    with _unsupported_lock:
+        _unsupported.setdefault(devices, set()).add(method)
+
+
+def run_parallel(
+    tasks: Iterable[T],
+    work: Callable[[T], Optional[str]],
+    max_workers: int = STAGE_WORKERS,
+) -> Counter:
+    """
+    Run work over tasks on a thread pool and count the outcomes.
+
+    Args:
+        tasks: Work items
+        work: Function run for each item; returns an outcome label or None
+        max_workers: Threads to use (1 runs inline)
+
+    Returns:
+        Counter of the labels returned
+
+    Raises:
+        Exception: The first error raised by work, after all items finish
+    """
+    tasks = list(tasks)
+    if max_workers <= 1 or len(tasks) <= 1:
+        outcomes = [work(task) for task in tasks]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage') as executor:
+            outcomes = list(executor.map(work, tasks))
+    return Counter(outcome for outcome in outcomes if outcome)
+
+
+def reset_copy_methods() -> None:
+    """Forget which copy methods failed (for testing)."""
+    with _unsupported_lock:
+        _unsupported.clear()
+
+
+def record_copy_methods(methods: Counter) -> None:
+    """Add copy method counts to the trace."""
+    get_tracer().counter('staging_copies', {method: methods.get(method, 0) for method in (
+        METHOD_CLONE, METHOD_COPY_FILE_RANGE, METHOD_COPY)})
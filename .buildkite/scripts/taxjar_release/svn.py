@@ -1,30 +1,82 @@
 """SVN deployment to WordPress.org."""
+import fcntl
+import hashlib
 import os
 import shutil
 import subprocess
 import tempfile
-from typing import Optional
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterator, List, Optional, Sequence
 
+from .deadline import Deadline
 from .retry import retry
+from .manifest import Manifest, build_manifest
+from .sync import SyncResult, sync_tree
+from .tracing import get_tracer
 from .clients.subprocess_runner import SubprocessRunner
 from .exceptions import SVNDeployError
 
 
+# Paths per svn add/delete invocation.
+STAGE_CHUNK_SIZE = 1000
+
+# Check out trunk alone, or the repository root at depth immediates with
+# trunk expanded (the original layout, and the default until
+# benchmarks/svn_checkout.py shows trunk alone is faster).
+CHECKOUT_TRUNK = 'trunk'
+CHECKOUT_SPARSE = 'sparse'
+CHECKOUT_MODES = (CHECKOUT_TRUNK, CHECKOUT_SPARSE)
+
+# How often to retry a cached working copy lock held by another build.
+LOCK_POLL_SECONDS = 1.0
+
+
 class SVNDeployManager:
     """Manages SVN deployment to WordPress.org."""
 
     SVN_URL = 'https://plugins.svn.wordpress.org/taxjar-simplified-taxes-for-woocommerce'
 
-    def __init__(self, runner: Optional[SubprocessRunner] = None):
+    def __init__(
+        self,
+        runner: Optional[SubprocessRunner] = None,
+        deadline: Optional[Deadline] = None,
+        checkout_mode: str = CHECKOUT_SPARSE,
+        cache_dir: Optional[str] = None,
+    ):
         """
         Initialize SVNDeployManager.
 
         Args:
             runner: SubprocessRunner instance
+            deadline: Release time budget shared by all SVN commands
+            checkout_mode: CHECKOUT_TRUNK or CHECKOUT_SPARSE
+            cache_dir: Agent directory that keeps the working copy between
+                deploys (None for a fresh checkout every time)
+
+        Raises:
+            ValueError: If checkout_mode is not one of CHECKOUT_MODES
         """
+        if checkout_mode not in CHECKOUT_MODES:
+            raise ValueError(f'Unknown checkout mode: {checkout_mode}')
         self.runner = runner or SubprocessRunner()
+        self.deadline = deadline or Deadline()
+        self.checkout_mode = checkout_mode
+        self.cache_dir = cache_dir
         self._temp_dir = None
 
+    @property
+    def _trunk_dir(self) -> str:
+        """Return the trunk directory of the working copy."""
+        return os.path.join(self._temp_dir, 'trunk')
+
+    @property
+    def _working_copy(self) -> str:
+        """Return the root of the checked-out working copy."""
+        if self.checkout_mode == CHECKOUT_TRUNK and self._temp_dir:
+            return self._trunk_dir
+        return self._temp_dir
+
     def deploy(
         self,
         version: str,
@@ -35,6 +87,10 @@ class SVNDeployManager:
         """
         Deploy version to WordPress.org SVN.
 
+        With a cache directory the working copy from the previous deploy is
+        reverted and updated instead of checked out again, under a lock
+        that serializes builds on the same agent.
+
         Args:
             version: Version to deploy
             username: WordPress.org SVN username
@@ -47,29 +103,121 @@ class SVNDeployManager:
         if not username or not password:
             raise SVNDeployError('SVN credentials not provided')
 
-        self._temp_dir = tempfile.mkdtemp(prefix='svn-deploy-')
+        if self.cache_dir:
+            self._temp_dir = os.path.join(self.cache_dir, self._cache_key())
+            lock = _exclusive_lock(f'{self._temp_dir}.lock', self.deadline)
+        else:
+            self._temp_dir = tempfile.mkdtemp(prefix='svn-deploy-')
+            lock = nullcontext()
 
         try:
-            print(f'+++ Deploying {version} to WordPress.org SVN')
-
-            self._checkout_repo()
-            self._update_trunk(version, source_dir)
-            self._commit_changes(version, username, password)
-            self._create_tag(version, username, password)
-
-            print(f'✓ SVN deployment {version} completed')
+            with lock:
+                print(f'+++ Deploying {version} to WordPress.org SVN')
+
+                tracer = get_tracer()
+                with tracer.stage('checkout'):
+                    if self.cache_dir:
+                        self._prepare_cached_working_copy()
+                    else:
+                        self._checkout_repo()
+                with tracer.stage('update_trunk'):
+                    self._update_trunk(version, source_dir)
+                with tracer.stage('commit'):
+                    self._commit_changes(version, username, password)
+                with tracer.stage('tag'):
+                    self._create_tag(version, username, password)
+
+                print(f'✓ SVN deployment {version} completed')
 
         finally:
             self._cleanup()
 
+    def _cache_key(self) -> str:
+        """Return the cache subdirectory for this repository and layout."""
+        digest = hashlib.sha256(self.SVN_URL.encode('utf-8')).hexdigest()[:12]
+        return f'{self.checkout_mode}-{digest}'
+
+    def _prepare_cached_working_copy(self) -> None:
+        """
+        Bring the cached working copy up to date, or check it out afresh.
+
+        A working copy that cannot be cleaned, reverted and updated, or
+        that points at another URL, is deleted and checked out again.
+        """
+        if os.path.isdir(os.path.join(self._working_copy, '.svn')):
+            try:
+                self._refresh_working_copy()
+                return
+            except (subprocess.CalledProcessError, SVNDeployError) as e:
+                print(f'Cached working copy is unusable ({e}); checking out afresh')
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+
+        os.makedirs(self._temp_dir, exist_ok=True)
+        self._checkout_repo()
+
+    def _refresh_working_copy(self) -> None:
+        """
+        Restore the cached working copy to a pristine, current state.
+
+        Raises:
+            subprocess.CalledProcessError: If an svn command fails
+            SVNDeployError: If the working copy is for a different URL
+        """
+        print('--- Updating cached SVN working copy')
+        working_copy = self._working_copy
+        expected_url = f'{self.SVN_URL}/trunk' if self.checkout_mode == CHECKOUT_TRUNK else self.SVN_URL
+        # Release stale locks, drop changes left by an interrupted deploy
+        # (including files it added), then update.
+        for cmd in (
+            ['svn', 'cleanup'],
+            ['svn', 'revert', '--recursive', '--quiet', '.'],
+            ['svn', 'cleanup', '--remove-unversioned', '--remove-ignored'],
+            ['svn', 'update', '--quiet'],
+        ):
+            self.runner.run(
+                cmd,
+                cwd=working_copy,
+                check=True,
+                timeout=self.deadline.timeout(f'svn {cmd[1]}'),
+            )
+
+        url = self.runner.run(
+            ['svn', 'info', '--show-item', 'url'],
+            cwd=working_copy,
+            check=True,
+            timeout=self.deadline.timeout('svn info'),
+        ).stdout.strip()
+        if url != expected_url:
+            raise SVNDeployError(f'working copy is for {url}, expected {expected_url}')
+        print('✓ SVN working copy up to date')
+
     def _checkout_repo(self) -> None:
-        """Checkout SVN repository."""
-        print('--- Checking out SVN repository')
+        """
+        Checkout SVN repository.
+
+        In trunk mode only trunk is checked out; tags are created with a
+        server-side copy and never need a working copy. In sparse mode the
+        root is checked out at depth immediates, which also lists tags/,
+        branches/ and assets/, and trunk is then expanded.
+        """
+        print(f'--- Checking out SVN repository ({self.checkout_mode})')
+        if self.checkout_mode == CHECKOUT_TRUNK:
+            self.runner.run(
+                ['svn', 'checkout', f'{self.SVN_URL}/trunk', self._trunk_dir,
+                 '--depth', 'infinity', '--quiet'],
+                cwd=self._temp_dir,
+                check=True,
+                timeout=self.deadline.timeout('svn checkout'),
+            )
+            print('✓ SVN checkout complete')
+            return
+
         self.runner.run(
             ['svn', 'checkout', self.SVN_URL, self._temp_dir,
              '--depth', 'immediates', '--quiet'],
             cwd=self._temp_dir,
             check=True,
+            timeout=self.deadline.timeout('svn checkout'),
         )
 
         # Update trunk with full depth
@@ -77,86 +225,154 @@ class SVNDeployManager:
             ['svn', 'update', 'trunk', '--set-depth', 'infinity', '--quiet'],
             cwd=self._temp_dir,
             check=True,
+            timeout=self.deadline.timeout('svn update'),
         )
         print('✓ SVN checkout complete')
 
-    def _update_trunk(self, version: str, source_dir: str = '.') -> None:
+    def _update_trunk(
+        self,
+        version: str,
+        source_dir: str = '.',
+        manifest: Optional[Manifest] = None,
+    ) -> None:
         """
         Update trunk with new version files.
 
+        Trunk receives the files in the deploy manifest: tracked files not
+        excluded by .distignore. Only files that differ from trunk are
+        written, and the sync reports which paths are new or gone, so no
+        svn status scan is needed to stage them.
+
         Args:
             version: Version being deployed (for logging)
             source_dir: Directory containing plugin files to deploy
+            manifest: Files to deploy (built from source_dir if not provided)
         """
         print('--- Updating trunk')
-        trunk_dir = os.path.join(self._temp_dir, 'trunk')
-
-        # Clear trunk contents (keep .svn)
-        for item in os.listdir(trunk_dir):
-            if item != '.svn':
-                item_path = os.path.join(trunk_dir, item)
-                if os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-                else:
-                    os.remove(item_path)
-
-        # Copy plugin files to trunk
-        for item in os.listdir(source_dir):
-            if item.startswith('.'):  # Skip hidden files/dirs
-                continue
-            src = os.path.join(source_dir, item)
-            dst = os.path.join(trunk_dir, item)
-            if os.path.isdir(src):
-                shutil.copytree(src, dst)
-            else:
-                shutil.copy2(src, dst)
+        trunk_dir = self._trunk_dir
+        if manifest is None:
+            manifest = build_manifest(source_dir)
+        print(f'Deploying {len(manifest)} files ({manifest.total_size} bytes)')
+
+        with get_tracer().span('sync trunk', 'fs', source=source_dir) as span:
+            result = sync_tree(
+                source_dir, trunk_dir, manifest,
+                before_replace=lambda paths: self._stage_replaced(trunk_dir, paths),
+            )
+            span['added'] = len(result.added)
+            span['deleted'] = len(result.deleted)
+            span['updated'] = len(result.updated)
+            span['unchanged'] = result.unchanged
+
+        self._stage_svn_changes(trunk_dir, result)
+
+        print(f'✓ Trunk updated ({len(result.added)} added, {len(result.deleted)} deleted, '
+              f'{len(result.updated)} modified)')
+
+    def _stage_replaced(self, trunk_dir: str, paths: List[str]) -> None:
+        """
+        Delete paths that change between file and directory.
 
-        # Stage SVN changes (add new files, delete removed files)
-        self._stage_svn_changes(trunk_dir)
+        Runs before the new nodes are written, while svn still finds the
+        old ones on disk; the sync then adds the new nodes, which svn
+        records as replacements.
 
-        print('✓ Trunk updated')
+        Args:
+            trunk_dir: Path to the trunk directory
+            paths: Paths relative to trunk_dir
+
+        Raises:
+            SVNDeployError: If any path could not be deleted
+        """
+        failed = self._svn_targets('delete', paths, trunk_dir)
+        if failed:
+            raise SVNDeployError(f'Could not stage {len(failed)} path(s): {", ".join(failed)}')
 
-    def _stage_svn_changes(self, trunk_dir: str) -> None:
+    def _stage_svn_changes(self, trunk_dir: str, result: SyncResult) -> None:
         """
         Stage SVN changes by adding new files and deleting removed files.
 
+        All paths go to one svn delete and one svn add --parents per
+        chunk of STAGE_CHUNK_SIZE, each reading its paths from a
+        --targets file, so the working copy database is opened once per
+        chunk rather than once per path.
+
         Args:
             trunk_dir: Path to the trunk directory
+            result: Changes made by the trunk sync
+
+        Raises:
+            SVNDeployError: If any path could not be staged
         """
-        # Get SVN status to find unversioned (?) and deleted (!) files
-        result = self.runner.run(
-            ['svn', 'status'],
-            cwd=trunk_dir,
-            check=True,
-        )
+        failed = self._svn_targets('delete', result.deleted, trunk_dir)
+        failed += self._svn_targets('add', result.added, trunk_dir, ['--parents'])
+        if failed:
+            raise SVNDeployError(f'Could not stage {len(failed)} path(s): {", ".join(failed)}')
 
-        for line in result.stdout.splitlines():
-            if not line.strip():
-                continue
+    def _svn_targets(
+        self,
+        subcommand: str,
+        paths: List[str],
+        cwd: str,
+        options: Sequence[str] = (),
+    ) -> List[str]:
+        """
+        Run an svn subcommand over paths in chunks.
+
+        svn reports each path it stages, and that output is echoed. If a
+        chunk fails, its paths are retried one at a time to find the ones
+        at fault.
 
-            status = line[0]
-            # Path starts after status flags (first 8 chars in svn status output)
-            file_path = line[7:].strip() if len(line) > 7 else line[1:].strip()
+        Args:
+            subcommand: 'add' or 'delete'
+            paths: Paths relative to cwd
+            cwd: Working copy directory
+            options: Extra svn options
 
-            if status == '?':
-                # Unversioned file - add it
-                self.runner.run(
-                    ['svn', 'add', file_path],
-                    cwd=trunk_dir,
-                    check=True,
+        Returns:
+            Paths that could not be staged
+        """
+        failed = []
+        for start in range(0, len(paths), STAGE_CHUNK_SIZE):
+            chunk = paths[start:start + STAGE_CHUNK_SIZE]
+            fd, targets = tempfile.mkstemp(prefix='svn-targets-', text=True)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(''.join(f'{_svn_path(path)}\n' for path in chunk))
+                result = self.runner.run(
+                    ['svn', subcommand, *options, '--targets', targets],
+                    cwd=cwd,
+                    check=False,
+                    timeout=self.deadline.timeout(f'svn {subcommand}'),
                 )
-            elif status == '!':
-                # Missing file - delete it
-                self.runner.run(
-                    ['svn', 'delete', file_path],
-                    cwd=trunk_dir,
-                    check=True,
+            finally:
+                os.remove(targets)
+
+            for line in result.stdout.splitlines():
+                print(f'  {line}')
+            if result.returncode == 0:
+                continue
+
+            print(f'svn {subcommand} failed for a batch of {len(chunk)}; retrying each path')
+            # --force makes re-adding a path staged by the failed batch a no-op.
+            retry_options = [*options, '--force'] if subcommand == 'add' else list(options)
+            for path in chunk:
+                single = self.runner.run(
+                    ['svn', subcommand, *retry_options, _svn_path(path)],
+                    cwd=cwd,
+                    check=False,
+                    timeout=self.deadline.timeout(f'svn {subcommand}'),
                 )
+                if single.returncode != 0:
+                    print(f'  ✗ {path}: {single.stderr.strip()}')
+                    failed.append(path)
+        return failed
 
     @retry(
         max_attempts=3,
         backoff=[5, 10, 20],
         exceptions=(subprocess.CalledProcessError,),
+        min_attempt_seconds=30,
     )
     def _commit_changes(
         self,
@@ -177,13 +393,20 @@ class SVNDeployManager:
             '-m', f'Preparing for {version} release',
         ]
 
-        self.runner.run(cmd, cwd=self._temp_dir, check=True, input=password)
+        self.runner.run(
+            cmd,
+            cwd=self._working_copy,
+            check=True,
+            input=password,
+            timeout=self.deadline.timeout('svn commit'),
+        )
         print('✓ Committed to trunk')
 
     @retry(
         max_attempts=3,
         backoff=[5, 10, 20],
         exceptions=(subprocess.CalledProcessError,),
+        min_attempt_seconds=15,
     )
     def _create_tag(
         self,
@@ -205,10 +428,58 @@ class SVNDeployManager:
             '-m', f'Tagging version {version}',
         ]
 
-        self.runner.run(cmd, cwd=self._temp_dir, check=True, input=password)
+        self.runner.run(
+            cmd,
+            cwd=self._temp_dir,
+            check=True,
+            input=password,
+            timeout=self.deadline.timeout('svn copy'),
+        )
         print(f'✓ Tagged version {version}')
 
     def _cleanup(self) -> None:
-        """Clean up temporary directory."""
+        """Clean up temporary directory (a cached working copy is kept)."""
+        if self.cache_dir:
+            return
         if self._temp_dir and os.path.exists(self._temp_dir):
             shutil.rmtree(self._temp_dir)
+
+
+@contextmanager
+def _exclusive_lock(
+    path: str,
+    deadline: Deadline,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Iterator[None]:
+    """
+    Hold an exclusive flock on a lock file.
+
+    Args:
+        path: Lock file, created if needed
+        deadline: Release time budget; waiting stops when it runs out
+        sleep: Sleep function (for testing)
+
+    Raises:
+        DeadlineExceededError: If the lock is still held when the budget runs out
+    """
+    with open(path, 'a') as f:
+        waiting = False
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                remaining = deadline.timeout('acquiring the SVN working copy lock')
+                if not waiting:
+                    print('Waiting for another deploy to release the SVN working copy')
+                    waiting = True
+                sleep(LOCK_POLL_SECONDS if remaining is None else min(LOCK_POLL_SECONDS, remaining))
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _svn_path(path: str) -> str:
+    """Escape a path so svn does not read an '@' in it as a peg revision."""
+    return f'{path}@' if '@' in path else path
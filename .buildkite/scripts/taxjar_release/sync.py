@@ -0,0 +1,274 @@
+"""Incremental synchronization of a source tree into an SVN working copy."""
+import hashlib
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set
+
+from .staging import STAGE_WORKERS, copy_file, record_copy_methods, run_parallel
+
+if TYPE_CHECKING:
+    from .manifest import Manifest, ManifestEntry
+
+
+HASH_CHUNK_BYTES = 1024 * 1024
+SVN_ADMIN_DIR = '.svn'
+
+_UNCHANGED = 'unchanged'
+_UPDATED = 'updated'
+
+
+@dataclass
+class SyncResult:
+    """
+    Changes made to the target tree.
+
+    Paths are relative to the target and use '/' separators. A new or
+    removed directory is listed once, without its contents, which is what
+    svn add and svn delete expect. A path that changed between file and
+    directory is listed in replaced and added, but not in deleted: the old
+    node is removed before the new one is written (see sync_tree).
+    """
+    added: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    replaced: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        """Return True if anything in the target was written or removed."""
+        return bool(self.added or self.deleted or self.updated)
+
+
+def file_digest(path: str) -> str:
+    """
+    Return the SHA-256 of a file's content.
+
+    Args:
+        path: File path
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sync_tree(
+    source_dir: str,
+    target_dir: str,
+    manifest: Optional['Manifest'] = None,
+    max_workers: int = STAGE_WORKERS,
+    before_replace: Optional[Callable[[List[str]], None]] = None,
+) -> SyncResult:
+    """
+    Make target_dir match source_dir, touching only what differs.
+
+    Both trees are walked with os.scandir. A file is left alone when its
+    size and mtime match the source, or when its size matches and its
+    content hash is the same; otherwise it is copied with its metadata.
+    Entries missing from the source are removed from the target. Hidden
+    entries at the top of the source are not deployed, and .svn
+    directories in the target are never touched.
+
+    With a manifest, only the files it lists are deployed, and its hashes
+    stand in for hashing the source again.
+
+    A path that changed between file and directory is not touched while
+    walking. Once the walk is done, before_replace is called with all such
+    paths while the old nodes are still on disk, so a version control
+    client can delete them; whatever it leaves behind is then removed and
+    the new node is written in its place.
+
+    The walk only plans the work: comparing and copying files then runs
+    on a thread pool, with copy-on-write clones where the filesystem
+    supports them (see staging.copy_file).
+
+    Args:
+        source_dir: Plugin files to deploy
+        target_dir: Working copy directory to update (e.g. trunk)
+        manifest: Files to deploy (everything in source_dir if not provided)
+        max_workers: Threads comparing and copying files
+        before_replace: Called with the paths whose type changed before
+            they are replaced (e.g. to svn delete them)
+
+    Returns:
+        SyncResult listing what svn needs to add and delete
+    """
+    result = SyncResult()
+    tasks: List[_FileTask] = []
+    included = None
+    if manifest is not None:
+        included = set(manifest.entries) | manifest.directories()
+    replacements: List[_Replacement] = []
+    _sync_dir(source_dir, target_dir, '', result, tasks, replacements, included, manifest)
+
+    if replacements:
+        result.replaced = sorted(replacement.relative for replacement in replacements)
+        if before_replace is not None:
+            before_replace(result.replaced)
+        for replacement in replacements:
+            if os.path.lexists(replacement.target.path):
+                _remove(replacement.target)
+            _plan_source(replacement.source, replacement.target.path, replacement.relative,
+                         result, tasks, included, manifest)
+
+    outcomes = run_parallel(tasks, _stage, max_workers)
+    record_copy_methods(outcomes)
+    result.unchanged = outcomes[_UNCHANGED]
+    result.updated = [task.relative for task in tasks if task.outcome == _UPDATED]
+    result.added.sort()
+    result.deleted.sort()
+    result.updated.sort()
+    return result
+
+
+@dataclass
+class _FileTask:
+    """A file to copy, or to compare and copy if it differs."""
+    source: os.DirEntry
+    target_path: str
+    relative: str
+    target: Optional[os.DirEntry] = None
+    entry: Optional['ManifestEntry'] = None
+    outcome: Optional[str] = None
+
+
+@dataclass
+class _Replacement:
+    """A path that changed between file and directory."""
+    source: os.DirEntry
+    target: os.DirEntry
+    relative: str
+
+
+def _stage(task: _FileTask) -> str:
+    """Compare and copy one file; return the copy method or _UNCHANGED."""
+    if task.target is not None and _same_file(task.source, task.target, task.entry):
+        task.outcome = _UNCHANGED
+        return _UNCHANGED
+    method = copy_file(task.source.path, task.target_path)
+    task.outcome = _UPDATED if task.target is not None else method
+    return method
+
+
+def _sync_dir(
+    source_dir: str,
+    target_dir: str,
+    prefix: str,
+    result: SyncResult,
+    tasks: List[_FileTask],
+    replacements: List[_Replacement],
+    included: Optional[Set[str]] = None,
+    manifest: Optional['Manifest'] = None,
+) -> None:
+    """Plan one directory level and recurse into shared directories."""
+    source = _scan(source_dir, skip_hidden=not prefix)
+    if included is not None:
+        source = {name: entry for name, entry in source.items() if prefix + name in included}
+    target = _scan(target_dir, skip_hidden=False)
+    target.pop(SVN_ADMIN_DIR, None)
+
+    for name, entry in target.items():
+        src = source.get(name)
+        if src is None:
+            _remove(entry)
+            result.deleted.append(prefix + name)
+        elif src.is_dir() != entry.is_dir():
+            replacements.append(_Replacement(source=src, target=entry, relative=prefix + name))
+
+    for name, src in source.items():
+        relative = prefix + name
+        dst = target.get(name)
+        dst_path = os.path.join(target_dir, name)
+        if dst is None:
+            _plan_source(src, dst_path, relative, result, tasks, included, manifest)
+        elif dst.is_dir() != src.is_dir():
+            continue
+        elif src.is_dir():
+            _sync_dir(src.path, dst_path, relative + '/', result, tasks, replacements, included, manifest)
+        else:
+            tasks.append(_FileTask(
+                source=src,
+                target_path=dst_path,
+                relative=relative,
+                target=dst,
+                entry=manifest.get(relative) if manifest is not None else None,
+            ))
+
+
+def _plan_source(
+    src: os.DirEntry,
+    target_path: str,
+    relative: str,
+    result: SyncResult,
+    tasks: List[_FileTask],
+    included: Optional[Set[str]],
+    manifest: Optional['Manifest'],
+) -> None:
+    """Plan a source entry that does not exist in the target."""
+    result.added.append(relative)
+    if src.is_dir():
+        _plan_new_dir(src.path, target_path, relative + '/', tasks, included)
+    else:
+        tasks.append(_FileTask(
+            source=src,
+            target_path=target_path,
+            relative=relative,
+            entry=manifest.get(relative) if manifest is not None else None,
+        ))
+
+
+def _plan_new_dir(
+    source_dir: str,
+    target_dir: str,
+    prefix: str,
+    tasks: List[_FileTask],
+    included: Optional[Set[str]],
+) -> None:
+    """Create a new directory tree and queue copies of its files."""
+    os.mkdir(target_dir)
+    shutil.copymode(source_dir, target_dir)
+    for name, src in _scan(source_dir, skip_hidden=False).items():
+        relative = prefix + name
+        if included is not None and relative not in included:
+            continue
+        dst_path = os.path.join(target_dir, name)
+        if src.is_dir():
+            _plan_new_dir(src.path, dst_path, relative + '/', tasks, included)
+        else:
+            tasks.append(_FileTask(source=src, target_path=dst_path, relative=relative))
+
+
+def _scan(path: str, skip_hidden: bool) -> Dict[str, os.DirEntry]:
+    """Return the entries of a directory by name."""
+    with os.scandir(path) as entries:
+        return {
+            entry.name: entry
+            for entry in entries
+            if not (skip_hidden and entry.name.startswith('.'))
+        }
+
+
+def _same_file(source: os.DirEntry, target: os.DirEntry, entry: Optional['ManifestEntry'] = None) -> bool:
+    """Return True if two files have the same content."""
+    source_stat = source.stat()
+    target_stat = target.stat()
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    if source_stat.st_mtime_ns == target_stat.st_mtime_ns:
+        return True
+    source_digest = entry.sha256 if entry else file_digest(source.path)
+    return source_digest == file_digest(target.path)
+
+
+def _remove(entry: os.DirEntry) -> None:
+    """Delete a file or directory tree."""
+    if entry.is_dir(follow_symlinks=False):
+        shutil.rmtree(entry.path)
+    else:
+        os.remove(entry.path)
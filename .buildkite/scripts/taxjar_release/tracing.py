@@ -0,0 +1,179 @@
+"""Span tracing for release operations, exported as Chrome trace JSON."""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+TRACE_FILE_ENV = 'RELEASE_TRACE_FILE'
+
+
+class Tracer:
+    """
+    Records timed spans for external calls.
+
+    Spans are written in the Chrome trace event format, which loads in
+    chrome://tracing and ui.perfetto.dev. A disabled tracer records
+    nothing, so instrumented code pays only for a context manager.
+    """
+
+    def __init__(self, enabled: bool = False):
+        """
+        Initialize Tracer.
+
+        Args:
+            enabled: Whether spans are recorded
+        """
+        self.enabled = enabled
+        self._events: List[Dict[str, Any]] = []
+        self._stages: List[str] = []
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    @property
+    def current_stage(self) -> Optional[str]:
+        """Return the innermost active stage, if any."""
+        return self._stages[-1] if self._stages else None
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        """Return a copy of the recorded trace events."""
+        with self._lock:
+            return list(self._events)
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Record a span around the enclosed block.
+
+        The yielded dict becomes the span's args, so callers can attach
+        results such as exit codes or byte counts before the block ends.
+        Exceptions are recorded as an ``error`` arg and re-raised.
+
+        Args:
+            name: Span name shown in the trace viewer
+            category: Span category (subprocess, http, git, retry, stage)
+            **args: Initial span arguments
+
+        Yields:
+            Mutable span arguments
+        """
+        if not self.enabled:
+            yield args
+            return
+
+        stage = self.current_stage
+        if stage and category != 'stage':
+            args.setdefault('stage', stage)
+
+        start = time.perf_counter_ns()
+        try:
+            yield args
+        except BaseException as e:
+            args.setdefault('error', type(e).__name__)
+            raise
+        finally:
+            self._record({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': (start - self._origin_ns) / 1000,
+                'dur': (time.perf_counter_ns() - start) / 1000,
+                'pid': self._pid,
+                'tid': threading.get_ident(),
+                'args': args,
+            })
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Mark the enclosed block as a release stage.
+
+        Spans recorded inside the block carry the stage name.
+
+        Args:
+            name: Stage name (e.g. checkout, update_trunk, commit, tag)
+        """
+        self._stages.append(name)
+        try:
+            with self.span(name, 'stage'):
+                yield
+        finally:
+            self._stages.pop()
+
+    def counter(self, name: str, values: Dict[str, float]) -> None:
+        """
+        Record a counter sample.
+
+        Args:
+            name: Counter name
+            values: Series name to value
+        """
+        if not self.enabled:
+            return
+
+        self._record({
+            'name': name,
+            'ph': 'C',
+            'ts': (time.perf_counter_ns() - self._origin_ns) / 1000,
+            'pid': self._pid,
+            'args': dict(values),
+        })
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Return recorded events as a Chrome trace document."""
+        return {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path: str) -> None:
+        """
+        Write the trace to a JSON file.
+
+        Args:
+            path: Output file path
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def _record(self, event: Dict[str, Any]) -> None:
+        """Append an event to the trace."""
+        with self._lock:
+            self._events.append(event)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
+
+
+def set_tracer(tracer: Tracer) -> Tracer:
+    """
+    Replace the process-wide tracer.
+
+    Args:
+        tracer: Tracer to install
+
+    Returns:
+        The previously installed tracer
+    """
+    global _tracer
+    previous = _tracer
+    _tracer = tracer
+    return previous
+
+
+def describe_command(cmd: List[str]) -> str:
+    """Return a short span name for a command (program and subcommand)."""
+    parts = [os.path.basename(cmd[0])] if cmd else []
+    for arg in cmd[1:]:
+        if arg.startswith('-'):
+            break
+        parts.append(arg)
+        if len(parts) == 3:
+            break
+    return ' '.join(parts)
@@ -26,6 +26,8 @@ class VersionValidator:
     PLUGIN_FILE = 'taxjar-woocommerce.php'
     README_FILE = 'readme.txt'
     CHANGELOG_FILE = 'CHANGELOG.md'
+    COMPARE_REF = 'origin/master'
+    VERSION_FILES = (PLUGIN_FILE, README_FILE, CHANGELOG_FILE)
 
     def __init__(self, git_client: GitClient, buildkite_client: BuildkiteClient):
         """
@@ -142,14 +144,24 @@ class VersionValidator:
             if current_branch == 'master':
                 return True
 
+            if not self.git.ensure_ref(self.COMPARE_REF, [self.PLUGIN_FILE]):
+                print(f'{self.COMPARE_REF} unavailable - running full validation')
+                return True
+
+            # Fast path: no version-bearing file touched since the branch point
+            merge_base = self.git.merge_base(self.COMPARE_REF, 'HEAD')
+            if merge_base and self.git.paths_unchanged(self.VERSION_FILES, merge_base, 'HEAD'):
+                return False
+
             current = self.git.get_file_content(self.PLUGIN_FILE, 'HEAD')
-            master = self.git.get_file_content(self.PLUGIN_FILE, 'origin/master')
+            master = self.git.get_file_content(self.PLUGIN_FILE, self.COMPARE_REF)
 
             current_version = self._extract_plugin_version(current)
             master_version = self._extract_plugin_version(master)
 
             return current_version != master_version
-        except Exception:
+        except Exception as e:
+            print(f'Could not compare against {self.COMPARE_REF} ({e}) - running full validation')
             return True
 
     def _report_results(self, errors: List[str], warnings: List[str]) -> None:
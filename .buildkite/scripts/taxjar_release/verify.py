@@ -0,0 +1,148 @@
+"""Post-release verification against WordPress.org."""
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from .clients.wordpress import WordPressClient
+from .deadline import Deadline
+from .version import VersionDetector
+
+
+INITIAL_DELAY_SECONDS = 1.0
+MAX_DELAY_SECONDS = 20.0
+BACKOFF_MULTIPLIER = 2.0
+
+
+@dataclass
+class VerificationResult:
+    """Result of release verification."""
+    success: bool
+    version: str
+    api_latency: Optional[float]
+    tag_latency: Optional[float]
+    checks: int
+    message: str
+
+
+class ReleaseVerifier:
+    """Polls WordPress.org until a released version is visible."""
+
+    PLUGIN_SLUG = VersionDetector.PLUGIN_SLUG
+
+    def __init__(
+        self,
+        wordpress_client: WordPressClient,
+        initial_delay: float = INITIAL_DELAY_SECONDS,
+        max_delay: float = MAX_DELAY_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random,
+    ):
+        """
+        Initialize ReleaseVerifier.
+
+        Args:
+            wordpress_client: WordPress.org client
+            initial_delay: Delay before the second check in seconds
+            max_delay: Upper bound on the delay between checks
+            clock: Monotonic clock (for testing)
+            sleep: Sleep function (for testing)
+            jitter: Source of random numbers in [0, 1) (for testing)
+        """
+        self.wordpress = wordpress_client
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+        self._jitter = jitter
+
+    def verify(self, version: str, deadline: Deadline) -> VerificationResult:
+        """
+        Wait until the plugin info API reports a version.
+
+        Each check revalidates the plugin info with a conditional request
+        and, until it appears, looks for the SVN tag. Checks back off
+        exponentially with jitter and stop at the deadline. Every request's
+        timeout is cut to the time left, so a slow request cannot overrun
+        the deadline; the client should not retry on its own (see
+        WordPressClient.create_session). Latencies are measured from the
+        start of verification.
+
+        Args:
+            version: Released version
+            deadline: When to give up
+
+        Returns:
+            VerificationResult with the measured propagation latency
+        """
+        start = self._clock()
+        tag_latency = None
+        delay = self.initial_delay
+        checks = 0
+
+        while True:
+            checks += 1
+            if tag_latency is None and self._check(self._tag_exists, version, deadline):
+                tag_latency = self._clock() - start
+
+            if self._check(self._api_reports, version, deadline):
+                api_latency = self._clock() - start
+                return VerificationResult(
+                    success=True,
+                    version=version,
+                    api_latency=api_latency,
+                    tag_latency=tag_latency,
+                    checks=checks,
+                    message=f'Version {version} is live on WordPress.org '
+                            f'after {api_latency:.1f}s ({checks} checks)',
+                )
+
+            remaining = deadline.remaining()
+            if remaining is not None and remaining <= 0:
+                break
+
+            # Equal jitter: wait between half and all of the current delay.
+            pause = delay / 2 + self._jitter() * delay / 2
+            self._sleep(pause if remaining is None else min(pause, remaining))
+            delay = min(delay * BACKOFF_MULTIPLIER, self.max_delay)
+
+        elapsed = self._clock() - start
+        tag_state = 'SVN tag found' if tag_latency is not None else 'SVN tag not found'
+        return VerificationResult(
+            success=False,
+            version=version,
+            api_latency=None,
+            tag_latency=tag_latency,
+            checks=checks,
+            message=f'Version {version} not yet visible on WordPress.org after '
+                    f'{elapsed:.0f}s ({tag_state}; may take a few minutes)',
+        )
+
+    def _tag_exists(self, version: str, timeout: Tuple[float, float]) -> bool:
+        """Return True if the SVN tag for the version exists."""
+        return self.wordpress.tag_exists(self.PLUGIN_SLUG, version, timeout=timeout)
+
+    def _api_reports(self, version: str, timeout: Tuple[float, float]) -> bool:
+        """Return True if the plugin info API reports the version."""
+        version_found = self.wordpress.get_plugin_version(self.PLUGIN_SLUG, revalidate=True, timeout=timeout)
+        return version_found == version
+
+    def _check(
+        self,
+        probe: Callable[[str, Tuple[float, float]], bool],
+        version: str,
+        deadline: Deadline,
+    ) -> bool:
+        """Run a probe within the deadline, treating request errors as not visible yet."""
+        timeout = self.wordpress.timeout
+        remaining = deadline.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                return False
+            timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+        try:
+            return probe(version, timeout)
+        except Exception as e:
+            print(f'Check failed: {e}')
+            return False
@@ -1,12 +1,14 @@
 """Version detection and WordPress.org integration."""
 import os
 import re
+import sys
 from dataclasses import dataclass
 from typing import Optional
 
 from .clients.git import GitClient
 from .clients.buildkite import BuildkiteClient
 from .clients.wordpress import WordPressClient
+from .exceptions import BuildkiteError, WordPressAPIError
 
 
 @dataclass
@@ -65,13 +67,33 @@ class VersionDetector:
         print(f'Detected version: {version}')
 
         # Check if version exists on WordPress.org
-        exists = self.wordpress.version_exists(self.PLUGIN_SLUG, version)
+        try:
+            exists = self.wordpress.version_exists(self.PLUGIN_SLUG, version)
+        except WordPressAPIError as e:
+            print(f'ERROR: {e}', file=sys.stderr)
+            return VersionDetectionResult(
+                success=False,
+                version=version,
+                exists_on_wporg=False,
+                should_skip=False,
+                message=f'Could not check WordPress.org for version {version}',
+            )
 
         if exists:
             message = f'Version {version} already exists on WordPress.org - skipping release'
             print(f'+++ {message}')
 
-            self.buildkite.set_metadata('SKIP_RELEASE', 'true')
+            try:
+                self.buildkite.set_metadata('SKIP_RELEASE', 'true', required=True)
+            except BuildkiteError as e:
+                print(f'ERROR: {e}', file=sys.stderr)
+                return VersionDetectionResult(
+                    success=False,
+                    version=version,
+                    exists_on_wporg=True,
+                    should_skip=True,
+                    message=f'Could not record that version {version} should be skipped',
+                )
             self.buildkite.annotate(
                 f'Version {version} already deployed to WordPress.org',
                 style='info',
@@ -88,7 +110,17 @@ class VersionDetector:
 
         # New version - export for downstream steps
         print(f'+++ New version {version} detected - proceeding with release')
-        self._export_version(version)
+        try:
+            self._export_version(version)
+        except BuildkiteError as e:
+            print(f'ERROR: {e}', file=sys.stderr)
+            return VersionDetectionResult(
+                success=False,
+                version=version,
+                exists_on_wporg=False,
+                should_skip=False,
+                message=f'Could not export version {version}',
+            )
 
         return VersionDetectionResult(
             success=True,
@@ -118,7 +150,7 @@ class VersionDetector:
             except Exception:
                 pass
 
-        # Set Buildkite meta-data for reliability
-        self.buildkite.set_metadata('release-version', version)
+        # Set Buildkite meta-data for reliability; later steps read it
+        self.buildkite.set_metadata('release-version', version, required=True)
 
         print(f'Exported VERSION={version}')
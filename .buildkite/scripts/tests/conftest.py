@@ -0,0 +1,11 @@
+"""Shared pytest fixtures."""
+import pytest
+from taxjar_release.clients.wordpress import reset_session
+
+
+@pytest.fixture(autouse=True)
+def fresh_wordpress_session():
+    """Give each test its own WordPress.org session and response cache."""
+    reset_session()
+    yield
+    reset_session()
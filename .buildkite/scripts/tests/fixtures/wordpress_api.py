@@ -0,0 +1,119 @@
+"""Local stand-in for the WordPress.org APIs used by the release tool."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+def generate_woocommerce_readme(requires_wp: str = '6.6', tested_wp: str = '6.8') -> str:
+    """Generate a WooCommerce readme.txt with configurable requirements."""
+    return f'''=== WooCommerce ===
+Contributors: automattic, woocommerce
+Tags: online store, ecommerce, shop, shopping cart, sell online
+Requires at least: {requires_wp}
+Tested up to: {tested_wp}
+Requires PHP: 7.4
+Stable tag: trunk
+License: GPLv3
+
+== Description ==
+
+WooCommerce is the open-source ecommerce platform for WordPress.
+'''
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves registered routes, with ETag revalidation."""
+
+    def do_GET(self):
+        self._respond(body=True)
+
+    def do_HEAD(self):
+        self._respond(body=False)
+
+    def _respond(self, body: bool) -> None:
+        api = self.server.api
+        api.requests.append((self.command, self.path))
+        route = api.routes.get(self.path)
+        if route is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        content = route.encode('utf-8')
+        etag = f'"{hash(route) & 0xffffffff:x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if body:
+            self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInWordPressAPI:
+    """
+    Plugin info, core version and SVN endpoints on a local port.
+
+    Pass ``client_kwargs`` to WordPressClient to point it here.
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, str] = {}
+        self.requests: List[tuple] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        """Return the server root URL."""
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    @property
+    def client_kwargs(self) -> Dict[str, str]:
+        """Return WordPressClient arguments that target this server."""
+        return {
+            'api_base': f'{self.base_url}/plugins/info/1.0',
+            'svn_base': f'{self.base_url}/svn',
+            'core_api': f'{self.base_url}/core/version-check/1.7/',
+        }
+
+    def add_plugin(self, slug: str, version: str, versions: Optional[List[str]] = None) -> None:
+        """Serve plugin info with the given current and tagged versions."""
+        tagged = versions or [version]
+        self.routes[f'/plugins/info/1.0/{slug}.json'] = json.dumps({
+            'slug': slug,
+            'version': version,
+            'versions': {v: f'https://downloads.wordpress.org/plugin/{slug}.{v}.zip' for v in tagged + ['trunk']},
+        })
+
+    def add_tag(self, slug: str, version: str, readme: str = '') -> None:
+        """Serve an SVN tag directory and its readme.txt."""
+        self.routes[f'/svn/{slug}/tags/{version}/'] = ''
+        self.routes[f'/svn/{slug}/tags/{version}/readme.txt'] = readme
+
+    def set_core_version(self, version: str) -> None:
+        """Serve the core version-check response."""
+        self.routes['/core/version-check/1.7/'] = json.dumps({
+            'offers': [{'response': 'upgrade', 'version': version, 'current': version}],
+        })
+
+    def start(self) -> 'StandInWordPressAPI':
+        """Start serving on an ephemeral port."""
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.api = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
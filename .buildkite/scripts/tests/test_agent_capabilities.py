@@ -0,0 +1,166 @@
+"""Tests for buildkite-agent capability detection."""
+import pytest
+from unittest.mock import Mock, patch
+from taxjar_release.clients.agent_capabilities import (
+    AgentCapabilities,
+    get_agent_capabilities,
+    reset_agent_capabilities,
+)
+from taxjar_release.clients.buildkite import BuildkiteClient
+from taxjar_release.clients.subprocess_runner import SubprocessRunner
+
+
+AGENT_HELP = """Usage:
+
+  buildkite-agent <command> [options...]
+
+Available commands are:
+
+  annotate          Annotate the build page within the Buildkite UI
+  artifact          Upload/download artifacts from Buildkite jobs
+  meta-data         Get/set data from Buildkite jobs
+  pipeline          Make changes to the pipeline of the currently running build
+
+Use "buildkite-agent <command> --help" for more information about a command.
+"""
+
+ANNOTATE_HELP = """Usage:
+
+  buildkite-agent annotate [body] [options...]
+
+Options:
+
+  --context value  The context of the annotation
+  --style value    The style of the annotation
+  --append         Append to the body of an existing annotation
+"""
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    """Start each test with no detected capabilities."""
+    reset_agent_capabilities()
+    yield
+    reset_agent_capabilities()
+
+
+def help_runner():
+    """Create a runner that answers help probes."""
+    runner = Mock(spec=SubprocessRunner)
+
+    def run(cmd, check=True, **kwargs):
+        output = ANNOTATE_HELP if 'annotate' in cmd else AGENT_HELP
+        return Mock(stdout=output, stderr='', returncode=0)
+
+    runner.run.side_effect = run
+    return runner
+
+
+class TestAgentCapabilities:
+    """Tests for AgentCapabilities."""
+
+    def test_unavailable_without_binary(self):
+        """Test a missing binary is detected without spawning."""
+        runner = Mock(spec=SubprocessRunner)
+        with patch('shutil.which', return_value=None):
+            caps = get_agent_capabilities(runner)
+
+        assert caps.available is False
+        assert caps.supports('annotate') is False
+        runner.run.assert_not_called()
+
+    def test_unavailable_without_token(self):
+        """Test an agent outside a job (no access token) is not used."""
+        with patch('shutil.which', return_value='/usr/bin/buildkite-agent'):
+            with patch.dict('os.environ', {}, clear=True):
+                caps = get_agent_capabilities(Mock(spec=SubprocessRunner))
+
+        assert caps.available is False
+
+    def test_detected_once_per_process(self):
+        """Test detection is cached for the whole process."""
+        with patch('shutil.which', return_value=None) as mock_which:
+            first = get_agent_capabilities()
+            second = get_agent_capabilities()
+
+        assert first is second
+        mock_which.assert_called_once()
+
+    def test_core_subcommands_not_probed(self):
+        """Test annotate and meta-data are assumed without spawning the agent."""
+        runner = help_runner()
+        caps = AgentCapabilities(available=True, runner=runner)
+
+        assert caps.supports('annotate') is True
+        assert caps.supports('meta-data') is True
+        runner.run.assert_not_called()
+
+    def test_other_subcommands_probed_lazily_once(self):
+        """Test help is parsed once and only when asked."""
+        runner = help_runner()
+        caps = AgentCapabilities(available=True, runner=runner)
+
+        runner.run.assert_not_called()
+        assert caps.supports('secret') is False
+        assert caps.supports('artifact') is True
+        assert runner.run.call_count == 1
+
+    def test_flags_probed_per_subcommand(self):
+        """Test flag support is read from the subcommand's help."""
+        runner = help_runner()
+        caps = AgentCapabilities(available=True, runner=runner)
+
+        assert caps.supports_flag('annotate', '--append') is True
+        assert caps.supports_flag('annotate', '--priority') is False
+        assert caps.supports_flag('annotate', '--context') is True
+        assert runner.run.call_count == 1
+        assert runner.run.call_args[0][0] == ['buildkite-agent', 'annotate', '--help']
+
+    def test_unreadable_help_is_permissive(self):
+        """Test unknown help output does not disable the agent."""
+        runner = Mock(spec=SubprocessRunner)
+        runner.run.return_value = Mock(stdout='', stderr='', returncode=1)
+        caps = AgentCapabilities(available=True, runner=runner)
+
+        assert caps.supports('annotate') is True
+        assert caps.supports_flag('annotate', '--append') is True
+
+    def test_probe_results_shared_through_file(self, tmp_path):
+        """Test a later step reuses persisted probe results."""
+        path = str(tmp_path / 'capabilities.json')
+        first = AgentCapabilities(available=True, runner=help_runner(), binary='/bk', persist_path=path)
+        first.supports_flag('annotate', '--append')
+
+        runner = Mock(spec=SubprocessRunner)
+        second = AgentCapabilities(available=True, runner=runner, binary='/bk', persist_path=path)
+
+        assert second.supports('meta-data') is True
+        assert second.supports_flag('annotate', '--append') is True
+        runner.run.assert_not_called()
+
+
+class TestBuildkiteClientCapabilities:
+    """Tests for BuildkiteClient capability use."""
+
+    def test_client_does_not_probe_on_construction(self):
+        """Test constructing clients spawns no agent process."""
+        runner = Mock(spec=SubprocessRunner)
+        with patch('shutil.which', return_value='/usr/bin/buildkite-agent'):
+            with patch.dict('os.environ', {'BUILDKITE_AGENT_ACCESS_TOKEN': 'x'}):
+                BuildkiteClient(runner=runner)
+                BuildkiteClient(runner=runner)
+
+        runner.run.assert_not_called()
+
+    def test_writes_spawn_no_probe(self):
+        """Test annotations and meta-data run the agent without a help probe first."""
+        runner = Mock(spec=SubprocessRunner)
+        runner.run.return_value = Mock(stdout='4.2.0', stderr='', returncode=0)
+        client = BuildkiteClient(runner=runner, capabilities=AgentCapabilities(True, runner=runner))
+
+        client.annotate('hello', style='info')
+        client.set_metadata('release-version', '4.2.0')
+
+        commands = [c[0][0] for c in runner.run.call_args_list]
+        assert all('--help' not in cmd for cmd in commands)
+        assert [cmd[1] for cmd in commands] == ['annotate', 'meta-data']
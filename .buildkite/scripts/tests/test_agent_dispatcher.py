@@ -0,0 +1,143 @@
+"""Tests for AgentDispatcher."""
+import threading
+import time
+import zlib
+from unittest.mock import Mock
+from taxjar_release.clients.agent_dispatcher import AgentDispatcher
+from taxjar_release.clients.subprocess_runner import SubprocessRunner
+
+
+def recording_runner(delay=0.0, returncode=0):
+    """Create a runner that records the commands it runs."""
+    runner = Mock(spec=SubprocessRunner)
+    runner.calls = []
+    lock = threading.Lock()
+
+    def run(cmd, check=True, input=None, **kwargs):
+        time.sleep(delay)
+        with lock:
+            runner.calls.append(cmd)
+        return Mock(returncode=returncode, stdout='', stderr='')
+
+    runner.run.side_effect = run
+    return runner
+
+
+class TestAgentDispatcher:
+    """Tests for AgentDispatcher."""
+
+    def test_submit_does_not_block_on_command(self):
+        """Test submit returns before the command finishes."""
+        runner = recording_runner(delay=0.2)
+        dispatcher = AgentDispatcher(runner)
+
+        start = time.monotonic()
+        dispatcher.submit('key', ['buildkite-agent', 'meta-data', 'set', 'a', '1'])
+
+        assert time.monotonic() - start < 0.1
+        assert dispatcher.join(timeout=5)
+        assert len(runner.calls) == 1
+
+    def test_same_key_runs_in_order(self):
+        """Test commands sharing a key keep submission order."""
+        runner = recording_runner(delay=0.01)
+        dispatcher = AgentDispatcher(runner, lanes=4)
+
+        for i in range(10):
+            dispatcher.submit('meta-data:version', ['set', str(i)])
+        dispatcher.join(timeout=5)
+
+        assert runner.calls == [['set', str(i)] for i in range(10)]
+
+    def test_different_keys_run_concurrently(self):
+        """Test independent keys do not wait for each other."""
+        runner = recording_runner(delay=0.2)
+        dispatcher = AgentDispatcher(runner, lanes=4)
+        keys = ['a', 'b', 'c', 'd']
+        assert len({dispatcher_lane(dispatcher, key) for key in keys}) > 1
+
+        start = time.monotonic()
+        for key in keys:
+            dispatcher.submit(key, [key])
+        dispatcher.join(timeout=5)
+
+        assert time.monotonic() - start < 0.2 * len(keys)
+
+    def test_stdin_input_passed(self):
+        """Test input reaches the runner."""
+        runner = recording_runner()
+        dispatcher = AgentDispatcher(runner)
+
+        dispatcher.submit('key', ['annotate'], input='body')
+        dispatcher.join(timeout=5)
+
+        assert runner.run.call_args[1]['input'] == 'body'
+
+    def test_failures_reported_at_close(self, capsys):
+        """Test failed commands are collected and printed once."""
+        runner = recording_runner(returncode=1)
+        dispatcher = AgentDispatcher(runner)
+
+        dispatcher.submit('key', ['buildkite-agent', 'annotate'])
+        failures = dispatcher.close()
+        dispatcher.close()
+
+        assert len(failures) == 1
+        assert failures[0].returncode == 1
+        assert capsys.readouterr().err.count('1 buildkite-agent call(s) failed') == 1
+
+    def test_errors_recorded_as_failures(self):
+        """Test exceptions from the runner do not kill the lane."""
+        runner = Mock(spec=SubprocessRunner)
+        runner.run.side_effect = [FileNotFoundError('buildkite-agent'), Mock(returncode=0)]
+        dispatcher = AgentDispatcher(runner, lanes=1)
+
+        dispatcher.submit('a', ['first'])
+        dispatcher.submit('a', ['second'])
+
+        failures = dispatcher.close()
+        assert len(failures) == 1
+        assert isinstance(failures[0].error, FileNotFoundError)
+        assert runner.run.call_count == 2
+
+    def test_close_abandons_after_timeout(self, capsys):
+        """Test close does not wait longer than join_timeout."""
+        runner = recording_runner(delay=1.0)
+        dispatcher = AgentDispatcher(runner, join_timeout=0.05)
+
+        dispatcher.submit('key', ['slow'])
+        start = time.monotonic()
+        dispatcher.close()
+
+        assert time.monotonic() - start < 0.5
+        assert 'still pending' in capsys.readouterr().err
+
+    def test_abandoned_calls_reported_as_failures(self):
+        """Test close reports unfinished calls and queued ones never run."""
+        runner = recording_runner(delay=0.3)
+        dispatcher = AgentDispatcher(runner, lanes=1, join_timeout=0.05)
+
+        dispatcher.submit('key', ['running'])
+        dispatcher.submit('key', ['queued'])
+        failures = dispatcher.close()
+
+        assert sorted(failure.cmd[0] for failure in failures) == ['queued', 'running']
+        assert all(failure.abandoned for failure in failures)
+        time.sleep(0.5)
+        assert runner.calls == [['running']]
+        assert len(dispatcher.failures) == 2
+
+    def test_submit_after_close_runs_inline(self):
+        """Test late writes still run once the dispatcher is closed."""
+        runner = recording_runner()
+        dispatcher = AgentDispatcher(runner)
+        dispatcher.close()
+
+        dispatcher.submit('key', ['late'])
+
+        assert runner.calls == [['late']]
+
+
+def dispatcher_lane(dispatcher, key):
+    """Return the lane index a key is routed to."""
+    return zlib.crc32(key.encode('utf-8')) % len(dispatcher._queues)
@@ -1,8 +1,12 @@
 """Tests for BuildkiteClient."""
+import subprocess
 import pytest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
+from taxjar_release.clients.agent_capabilities import AgentCapabilities
+from taxjar_release.clients.agent_dispatcher import AgentDispatcher
 from taxjar_release.clients.buildkite import BuildkiteClient
 from taxjar_release.clients.subprocess_runner import SubprocessRunner
+from taxjar_release.exceptions import BuildkiteError
 
 
 class TestBuildkiteClient:
@@ -108,3 +112,270 @@ class TestBuildkiteClient:
         result = client.metadata_exists('any-key')
 
         assert result is False
+
+
+class TestBufferedBuildkiteClient:
+    """Tests for buffered BuildkiteClient writes."""
+
+    @pytest.fixture
+    def mock_runner(self):
+        """Create a mock runner."""
+        return Mock(spec=SubprocessRunner)
+
+    @pytest.fixture
+    def client(self, mock_runner):
+        """Create a buffered client with an available agent."""
+        with patch('atexit.register'):
+            return BuildkiteClient(runner=mock_runner, available=True, buffered=True)
+
+    def test_writes_held_until_flush(self, client, mock_runner):
+        """Test nothing is spawned before flush."""
+        client.set_metadata('key', 'value')
+        client.annotate('message', context='test')
+
+        mock_runner.run.assert_not_called()
+        mock_runner.run_many.assert_not_called()
+
+    def test_metadata_coalesced_last_write_wins(self, client, mock_runner):
+        """Test repeated writes to a key produce one agent call."""
+        client.set_metadata('release-version', '1.0.0')
+        client.set_metadata('SKIP_RELEASE', 'true')
+        client.set_metadata('release-version', '1.0.1')
+
+        client.flush()
+
+        cmds = mock_runner.run_many.call_args[0][0]
+        assert cmds == [
+            ['buildkite-agent', 'meta-data', 'set', 'release-version', '1.0.1'],
+            ['buildkite-agent', 'meta-data', 'set', 'SKIP_RELEASE', 'true'],
+        ]
+
+    def test_annotations_merged_per_context(self, client, mock_runner):
+        """Test one agent call per context with bodies on stdin."""
+        client.annotate('first', style='info', context='checks')
+        client.annotate('second', style='error', context='checks')
+        client.annotate('other', style='success', context='deploy')
+
+        client.flush()
+
+        assert mock_runner.run.call_count == 2
+        first, second = mock_runner.run.call_args_list
+        assert first[0][0] == ['buildkite-agent', 'annotate', '--style', 'error', '--context', 'checks']
+        assert first[1]['input'] == 'first\n\nsecond'
+        assert second[0][0][-1] == 'deploy'
+        assert second[1]['input'] == 'other'
+
+    def test_second_flush_appends(self, client, mock_runner):
+        """Test a context sent earlier is extended with --append."""
+        client.annotate('first', context='checks')
+        client.flush()
+        client.annotate('second', context='checks')
+        client.flush()
+
+        cmd = mock_runner.run.call_args[0][0]
+        assert '--append' in cmd
+        assert mock_runner.run.call_args[1]['input'] == '\n\nsecond'
+
+    def test_second_flush_resends_without_append_support(self, mock_runner):
+        """Test the full body is resent when --append is unsupported."""
+        capabilities = Mock(spec=AgentCapabilities, available=True)
+        capabilities.supports.return_value = True
+        capabilities.supports_flag.return_value = False
+        with patch('atexit.register'):
+            client = BuildkiteClient(runner=mock_runner, capabilities=capabilities, buffered=True)
+
+        client.annotate('first', context='checks')
+        client.flush()
+        client.annotate('second', context='checks')
+        client.flush()
+
+        assert '--append' not in mock_runner.run.call_args[0][0]
+        assert mock_runner.run.call_args[1]['input'] == 'first\n\nsecond'
+
+    def test_flush_is_idempotent(self, client, mock_runner):
+        """Test an empty buffer spawns nothing."""
+        client.set_metadata('key', 'value')
+        client.flush()
+        client.flush()
+
+        mock_runner.run_many.assert_called_once()
+        mock_runner.run.assert_not_called()
+
+    def test_reads_see_pending_writes(self, client, mock_runner):
+        """Test metadata reads return buffered values without the agent."""
+        client.set_metadata('key', 'value')
+
+        assert client.get_metadata('key') == 'value'
+        assert client.metadata_exists('key') is True
+        mock_runner.run.assert_not_called()
+
+    def test_close_registered_at_exit(self, mock_runner):
+        """Test buffered clients flush at interpreter exit."""
+        with patch('atexit.register') as mock_register:
+            client = BuildkiteClient(runner=mock_runner, available=True, buffered=True)
+
+        mock_register.assert_called_once_with(client.close)
+
+    def test_unavailable_agent_prints_immediately(self, mock_runner, capsys):
+        """Test the print fallback is not buffered."""
+        with patch('atexit.register'):
+            client = BuildkiteClient(runner=mock_runner, available=False, buffered=True)
+
+        client.annotate('message', style='warning')
+
+        assert '[WARNING] message' in capsys.readouterr().out
+
+
+class TestAsynchronousBuildkiteClient:
+    """Tests for BuildkiteClient writes on a background dispatcher."""
+
+    @pytest.fixture
+    def dispatcher(self):
+        """Create a mock dispatcher."""
+        return Mock(spec=AgentDispatcher)
+
+    @pytest.fixture
+    def client(self, dispatcher):
+        """Create an asynchronous client with an available agent."""
+        with patch('atexit.register'):
+            return BuildkiteClient(runner=Mock(spec=SubprocessRunner), available=True, dispatcher=dispatcher)
+
+    def test_writes_submitted_with_ordering_keys(self, client, dispatcher):
+        """Test writes are keyed by metadata key and annotation context."""
+        client.set_metadata('release-version', '1.0.0')
+        client.annotate('message', context='version-check')
+
+        keys = [call[0][0] for call in dispatcher.submit.call_args_list]
+        assert keys == ['meta-data:release-version', 'annotate:version-check']
+        client.runner.run.assert_not_called()
+
+    def test_reads_see_own_writes(self, client):
+        """Test pending writes are visible before they reach the agent."""
+        client.set_metadata('SKIP_RELEASE', 'true')
+
+        assert client.get_metadata('SKIP_RELEASE') == 'true'
+        assert client.metadata_exists('SKIP_RELEASE') is True
+        client.runner.run.assert_not_called()
+
+    def test_buffered_flush_queues_merged_writes(self, dispatcher):
+        """Test flush hands merged writes to the dispatcher."""
+        with patch('atexit.register'):
+            client = BuildkiteClient(
+                runner=Mock(spec=SubprocessRunner), available=True, buffered=True, dispatcher=dispatcher,
+            )
+        client.set_metadata('key', 'a')
+        client.set_metadata('key', 'b')
+        client.annotate('one', context='ctx')
+        client.annotate('two', context='ctx')
+
+        client.flush()
+
+        assert dispatcher.submit.call_count == 2
+        assert dispatcher.submit.call_args_list[0][0][1][-1] == 'b'
+        assert dispatcher.submit.call_args_list[1][1]['input'] == 'one\n\ntwo'
+
+    def test_close_flushes_then_joins(self, client, dispatcher):
+        """Test close waits for the dispatcher and returns its failures."""
+        dispatcher.close.return_value = ['failure']
+
+        assert client.close() == ['failure']
+        dispatcher.close.assert_called_once()
+
+    def test_required_metadata_written_synchronously(self, dispatcher):
+        """Test required writes skip the buffer and the dispatcher."""
+        runner = Mock(spec=SubprocessRunner)
+        with patch('atexit.register'):
+            client = BuildkiteClient(runner=runner, available=True, buffered=True, dispatcher=dispatcher)
+        client.set_metadata('SKIP_RELEASE', 'false')
+
+        client.set_metadata('SKIP_RELEASE', 'true', required=True)
+        client.flush()
+
+        runner.run.assert_called_once_with(['buildkite-agent', 'meta-data', 'set', 'SKIP_RELEASE', 'true'], check=True)
+        dispatcher.submit.assert_not_called()
+        assert client.get_metadata('SKIP_RELEASE') == 'true'
+
+    def test_required_metadata_failure_raises(self, client):
+        """Test a failed required write raises and is not cached."""
+        client.runner.run.side_effect = subprocess.CalledProcessError(1, 'buildkite-agent')
+
+        with pytest.raises(BuildkiteError, match='SKIP_RELEASE'):
+            client.set_metadata('SKIP_RELEASE', 'true', required=True)
+
+        client.runner.run.side_effect = subprocess.CalledProcessError(1, 'buildkite-agent')
+        assert client.get_metadata('SKIP_RELEASE') is None
+
+
+class TestMetadataCache:
+    """Tests for the metadata read-through cache."""
+
+    @pytest.fixture
+    def mock_runner(self):
+        """Create a mock runner."""
+        return Mock(spec=SubprocessRunner)
+
+    def test_get_metadata_cached(self, mock_runner):
+        """Test a key is fetched from the agent once."""
+        mock_runner.run.return_value = Mock(stdout='4.2.0\n')
+        client = BuildkiteClient(runner=mock_runner, available=True)
+
+        assert client.get_metadata('release-version') == '4.2.0'
+        assert client.get_metadata('release-version') == '4.2.0'
+        assert client.metadata_exists('release-version') is True
+        mock_runner.run.assert_called_once()
+
+    def test_missing_key_cached(self, mock_runner):
+        """Test an absent key is remembered as absent."""
+        mock_runner.run.side_effect = subprocess.CalledProcessError(1, 'buildkite-agent')
+        client = BuildkiteClient(runner=mock_runner, available=True)
+
+        assert client.metadata_exists('SKIP_RELEASE') is False
+        assert client.get_metadata('SKIP_RELEASE') is None
+        mock_runner.run.assert_called_once()
+
+    def test_agent_errors_not_cached(self, mock_runner):
+        """Test failures to run the agent are retried on the next read."""
+        mock_runner.run.side_effect = [FileNotFoundError('buildkite-agent'), Mock(stdout='4.2.0')]
+        client = BuildkiteClient(runner=mock_runner, available=True)
+
+        assert client.get_metadata('release-version') is None
+        assert client.get_metadata('release-version') == '4.2.0'
+
+    def test_set_metadata_updates_cache(self, mock_runner):
+        """Test writes replace cached values."""
+        mock_runner.run.return_value = Mock(stdout='4.1.0')
+        client = BuildkiteClient(runner=mock_runner, available=True)
+        client.get_metadata('release-version')
+
+        client.set_metadata('release-version', '4.2.0')
+
+        assert client.get_metadata('release-version') == '4.2.0'
+        assert mock_runner.run.call_count == 2
+
+    def test_prefetch_fetches_concurrently(self):
+        """Test prefetch runs one batch and serves later reads from cache."""
+        def run(cmd, check=True, **kwargs):
+            if cmd[-1] == 'SKIP_RELEASE':
+                raise subprocess.CalledProcessError(1, cmd)
+            return Mock(stdout=f'{cmd[-1]}-value\n')
+
+        runner = SubprocessRunner()
+        with patch.object(runner, 'run', side_effect=run) as mock_run:
+            client = BuildkiteClient(runner=runner, available=True)
+            client.set_metadata('local', 'written')
+            mock_run.reset_mock()
+
+            values = client.prefetch(['release-version', 'SKIP_RELEASE', 'local', 'release-version'])
+
+            assert values == {'release-version': 'release-version-value', 'SKIP_RELEASE': None, 'local': 'written'}
+            assert mock_run.call_count == 2
+            assert client.get_metadata('release-version') == 'release-version-value'
+            assert client.metadata_exists('SKIP_RELEASE') is False
+            assert mock_run.call_count == 2
+
+    def test_prefetch_when_unavailable(self, mock_runner):
+        """Test prefetch returns None for every key without the agent."""
+        client = BuildkiteClient(runner=mock_runner, available=False)
+
+        assert client.prefetch(['a', 'b']) == {'a': None, 'b': None}
+        mock_runner.run_many.assert_not_called()
@@ -0,0 +1,161 @@
+"""Tests for record/replay cassette runners."""
+import json
+import os
+import subprocess
+import tempfile
+import pytest
+from unittest.mock import patch
+from taxjar_release.clients.cassette import (
+    RecordingSubprocessRunner,
+    ReplayingSubprocessRunner,
+    normalize,
+)
+from taxjar_release.exceptions import CassetteError
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    """Return a cassette path inside the test's temp dir."""
+    return str(tmp_path / 'cassette.json')
+
+
+class TestRecordingSubprocessRunner:
+    """Tests for RecordingSubprocessRunner."""
+
+    def test_records_interaction(self, cassette):
+        """Test argv, output, return code and timing are recorded."""
+        recorder = RecordingSubprocessRunner(cassette)
+        result = recorder.run(['echo', 'hello'])
+        recorder.save()
+
+        assert result.stdout == 'hello\n'
+        with open(cassette) as f:
+            interaction = json.load(f)['interactions'][0]
+        assert interaction['argv'] == ['echo', 'hello']
+        assert interaction['stdout'] == 'hello\n'
+        assert interaction['returncode'] == 0
+        assert interaction['duration'] >= 0
+
+    def test_redacts_stdin_secret(self, cassette):
+        """Test stdin is not stored and is scrubbed from output."""
+        recorder = RecordingSubprocessRunner(cassette)
+        recorder.run(['cat'], input='hunter2')
+        recorder.save()
+
+        with open(cassette) as f:
+            text = f.read()
+        assert 'hunter2' not in text
+        interaction = json.loads(text)['interactions'][0]
+        assert interaction['stdout'] == '[REDACTED]'
+        assert interaction['stdin'] is True
+        assert 'salt' not in json.loads(text)
+        assert not any('sha256' in key for key in interaction)
+
+    def test_records_failures(self, cassette):
+        """Test failing commands are recorded and still raise."""
+        recorder = RecordingSubprocessRunner(cassette)
+
+        with pytest.raises(subprocess.CalledProcessError):
+            recorder.run(['false'])
+        with pytest.raises(FileNotFoundError):
+            recorder.run(['definitely-not-a-real-binary'])
+
+        failed, missing = recorder.interactions
+        assert failed['returncode'] == 1
+        assert missing['error'] == 'FileNotFoundError'
+
+    def test_normalizes_temp_paths(self):
+        """Test per-run temp directories are normalized."""
+        path = os.path.join(tempfile.gettempdir(), 'svn-deploy-abc123', 'trunk')
+        assert normalize(path) == '<tmp>/trunk'
+
+
+class TestReplayingSubprocessRunner:
+    """Tests for ReplayingSubprocessRunner."""
+
+    def test_round_trip(self, cassette):
+        """Test a recorded session replays without executing commands."""
+        recorder = RecordingSubprocessRunner(cassette)
+        recorder.run(['echo', 'one'])
+        with pytest.raises(subprocess.CalledProcessError):
+            recorder.run(['false'])
+        recorder.save()
+
+        replayer = ReplayingSubprocessRunner(cassette)
+        with patch('subprocess.run') as mock_run:
+            assert replayer.run(['echo', 'one']).stdout == 'one\n'
+            with pytest.raises(subprocess.CalledProcessError):
+                replayer.run(['false'])
+            mock_run.assert_not_called()
+        assert replayer.remaining == 0
+
+    def test_replays_missing_binary(self, cassette):
+        """Test FileNotFoundError is restored on replay."""
+        recorder = RecordingSubprocessRunner(cassette)
+        with pytest.raises(FileNotFoundError):
+            recorder.run(['definitely-not-a-real-binary', '--version'])
+        recorder.save()
+
+        replayer = ReplayingSubprocessRunner(cassette)
+        with pytest.raises(FileNotFoundError):
+            replayer.run(['definitely-not-a-real-binary', '--version'])
+
+    def test_matches_across_temp_dirs(self, cassette):
+        """Test a recording made in one temp dir replays in another."""
+        first = tempfile.mkdtemp(prefix='svn-deploy-')
+        second = tempfile.mkdtemp(prefix='svn-deploy-')
+        try:
+            recorder = RecordingSubprocessRunner(cassette)
+            recorder.run(['pwd'], cwd=first)
+            recorder.save()
+
+            replayer = ReplayingSubprocessRunner(cassette)
+            replayer.run(['pwd'], cwd=second)
+        finally:
+            os.rmdir(first)
+            os.rmdir(second)
+
+    def test_stdin_presence_is_verified(self, cassette):
+        """Test replay rejects a command whose stdin use differs from the recording."""
+        recorder = RecordingSubprocessRunner(cassette)
+        recorder.run(['cat'], input='secret')
+        recorder.save()
+
+        with pytest.raises(CassetteError, match='stdin'):
+            ReplayingSubprocessRunner(cassette).run(['cat'])
+        ReplayingSubprocessRunner(cassette).run(['cat'], input='different secret')
+
+    def test_unknown_command_raises(self, cassette):
+        """Test replaying an unrecorded command raises CassetteError."""
+        recorder = RecordingSubprocessRunner(cassette)
+        recorder.save()
+
+        with pytest.raises(CassetteError, match='No recorded interaction'):
+            ReplayingSubprocessRunner(cassette).run(['svn', 'status'])
+
+    def test_stream_round_trip(self, cassette):
+        """Test streamed output is recorded and replayed line by line."""
+        recorder = RecordingSubprocessRunner(cassette)
+        assert list(recorder.stream(['printf', 'a\nb\n'])) == ['a', 'b']
+        recorder.save()
+
+        replayer = ReplayingSubprocessRunner(cassette)
+        assert list(replayer.stream(['printf', 'a\nb\n'])) == ['a', 'b']
+
+    def test_time_compression(self, cassette):
+        """Test recorded durations are scaled on replay."""
+        with open(cassette, 'w') as f:
+            json.dump({'version': 2, 'interactions': [{
+                'argv': ['svn', 'update'], 'cwd': None, 'stdin': False,
+                'returncode': 0, 'stdout': '', 'stderr': '', 'duration': 10.0,
+            }]}, f)
+
+        with patch('taxjar_release.clients.cassette.time.sleep') as mock_sleep:
+            ReplayingSubprocessRunner(cassette, time_scale=0.01).run(['svn', 'update'])
+
+        mock_sleep.assert_called_once_with(pytest.approx(0.1))
+
+    def test_unreadable_cassette(self, tmp_path):
+        """Test a missing cassette raises CassetteError."""
+        with pytest.raises(CassetteError):
+            ReplayingSubprocessRunner(str(tmp_path / 'missing.json'))
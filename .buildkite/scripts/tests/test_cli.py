@@ -1,4 +1,5 @@
 """Tests for CLI interface."""
+import shlex
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from taxjar_release.cli import main, create_parser
@@ -25,7 +26,8 @@ class TestCLI:
             MockValidator.return_value = mock_instance
 
             with patch('taxjar_release.cli.GitClient'):
-                with patch('taxjar_release.cli.BuildkiteClient'):
+                with patch('taxjar_release.cli.BuildkiteClient') as MockBuildkite:
+                    MockBuildkite.return_value.close.return_value = []
                     result = main(['validate-version'])
 
             assert result == 0
@@ -39,12 +41,27 @@ class TestCLI:
             MockDetector.return_value = mock_instance
 
             with patch('taxjar_release.cli.GitClient'):
-                with patch('taxjar_release.cli.BuildkiteClient'):
+                with patch('taxjar_release.cli.BuildkiteClient') as MockBuildkite:
+                    MockBuildkite.return_value.close.return_value = []
                     with patch('taxjar_release.cli.WordPressClient'):
                         result = main(['detect-version'])
 
             assert result == 0
 
+    def test_detect_version_ignores_failed_agent_calls(self):
+        """Test failed side-channel agent calls do not fail detect-version."""
+        with patch('taxjar_release.cli.VersionDetector') as MockDetector:
+            MockDetector.return_value.detect.return_value = Mock(success=True, should_skip=False)
+
+            with patch('taxjar_release.cli.GitClient'):
+                with patch('taxjar_release.cli.BuildkiteClient') as MockBuildkite:
+                    MockBuildkite.return_value.close.return_value = [Mock()]
+                    with patch('taxjar_release.cli.WordPressClient'):
+                        result = main(['detect-version'])
+
+            assert result == 0
+            MockBuildkite.return_value.close.assert_called_once()
+
     def test_github_release_requires_version(self):
         """Test github-release fails without version."""
         with patch.dict('os.environ', {}, clear=True):
@@ -57,6 +74,37 @@ class TestCLI:
             result = main(['svn-deploy'])
             assert result == 1
 
+    @pytest.mark.parametrize('argv,env,mode', [
+        (['svn-deploy'], {}, 'sparse'),
+        (['svn-deploy', '--checkout', 'trunk'], {}, 'trunk'),
+        (['svn-deploy'], {'SVN_CHECKOUT_MODE': 'trunk'}, 'trunk'),
+    ])
+    def test_svn_deploy_checkout_mode(self, argv, env, mode):
+        """Test svn-deploy selects the checkout mode from the flag or environment."""
+        env = {'VERSION': '4.2.0', 'WORDPRESS_SVN_USERNAME': 'user', 'WORDPRESS_SVN_PASSWORD': 'pass', **env}
+        with patch.dict('os.environ', env, clear=True):
+            with patch('taxjar_release.cli.SVNDeployManager') as MockManager:
+                result = main(argv)
+
+        assert result == 0
+        assert MockManager.call_args.kwargs['checkout_mode'] == mode
+
+    @pytest.mark.parametrize('argv,cached', [(['svn-deploy'], True), (['svn-deploy', '--no-cache'], False)])
+    def test_svn_deploy_working_copy_cache(self, tmp_path, argv, cached):
+        """Test svn-deploy keeps its working copy under RELEASE_TOOL_CACHE_DIR unless told not to."""
+        env = {
+            'VERSION': '4.2.0',
+            'WORDPRESS_SVN_USERNAME': 'user',
+            'WORDPRESS_SVN_PASSWORD': 'pass',
+            'RELEASE_TOOL_CACHE_DIR': str(tmp_path),
+        }
+        with patch.dict('os.environ', env, clear=True):
+            with patch('taxjar_release.cli.SVNDeployManager') as MockManager:
+                main(argv)
+
+        expected = str(tmp_path / 'svn') if cached else None
+        assert MockManager.call_args.kwargs['cache_dir'] == expected
+
     def test_returns_1_on_failure(self):
         """Test returns 1 when command fails."""
         with patch('taxjar_release.cli.VersionValidator') as MockValidator:
@@ -65,7 +113,101 @@ class TestCLI:
             MockValidator.return_value = mock_instance
 
             with patch('taxjar_release.cli.GitClient'):
-                with patch('taxjar_release.cli.BuildkiteClient'):
+                with patch('taxjar_release.cli.BuildkiteClient') as MockBuildkite:
+                    MockBuildkite.return_value.close.return_value = []
                     result = main(['validate-version'])
 
             assert result == 1
+
+
+class TestMetaExport:
+    """Tests for the meta export command."""
+
+    @pytest.fixture
+    def mock_client(self):
+        """Patch BuildkiteClient with prefetched values."""
+        with patch('taxjar_release.cli.BuildkiteClient') as MockClient:
+            client = MockClient.return_value
+            client.prefetch.return_value = {'release-version': '4.2.0', 'SKIP_RELEASE': None}
+            yield client
+
+    def test_writes_env_file(self, mock_client, tmp_path):
+        """Test keys are fetched together and appended to BUILDKITE_ENV_FILE."""
+        env_file = tmp_path / 'env'
+        env_file.write_text('EXISTING=1\n')
+
+        with patch.dict('os.environ', {'BUILDKITE_ENV_FILE': str(env_file)}):
+            result = main(['meta', 'export', 'release-version=VERSION', 'SKIP_RELEASE'])
+
+        assert result == 0
+        assert list(mock_client.prefetch.call_args[0][0]) == ['release-version', 'SKIP_RELEASE']
+        assert env_file.read_text() == 'EXISTING=1\nVERSION=4.2.0\n'
+
+    def test_print_for_eval(self, mock_client, capsys):
+        """Test --print emits quoted export statements."""
+        mock_client.prefetch.return_value = {'release-version': "4.2.0 'rc'"}
+
+        result = main(['meta', 'export', '--print', 'release-version'])
+
+        assert result == 0
+        assert capsys.readouterr().out == 'export RELEASE_VERSION=\'4.2.0 \'"\'"\'rc\'"\'"\'\'\n'
+
+    def test_print_with_trace_emits_only_exports(self, mock_client, capsys, tmp_path):
+        """Test the trace notice stays out of the output that gets eval'd."""
+        trace = tmp_path / 'trace.json'
+        with patch.dict('os.environ', {'RELEASE_TRACE_FILE': str(trace)}):
+            result = main(['meta', 'export', '--print', 'release-version'])
+
+        captured = capsys.readouterr()
+        assert result == 0
+        assert captured.out == "export RELEASE_VERSION=4.2.0\n"
+        assert f'Trace written to {trace}' in captured.err
+
+    @pytest.mark.parametrize('print_exports', [False, True])
+    def test_rejects_line_breaks_in_values(self, mock_client, tmp_path, print_exports):
+        """Test a value with a line break cannot inject further variables."""
+        mock_client.prefetch.return_value = {'release-version': '4.2.0\nLD_PRELOAD=/tmp/evil.so'}
+        env_file = tmp_path / 'env'
+        argv = ['meta', 'export', 'release-version'] + (['--print'] if print_exports else [])
+
+        with patch.dict('os.environ', {'BUILDKITE_ENV_FILE': str(env_file)}):
+            result = main(argv)
+
+        assert result == 1
+        assert not env_file.exists()
+
+    def test_env_file_keeps_spaces_and_quotes_literal(self, mock_client, tmp_path):
+        """Test values with spaces and quotes are written as they are, one line each."""
+        mock_client.prefetch.return_value = {'release-version': "4.2.0 'rc' \"x\" $HOME"}
+        env_file = tmp_path / 'env'
+
+        with patch.dict('os.environ', {'BUILDKITE_ENV_FILE': str(env_file)}):
+            result = main(['meta', 'export', 'release-version=VERSION'])
+
+        assert result == 0
+        assert env_file.read_text() == 'VERSION=4.2.0 \'rc\' "x" $HOME\n'
+
+    def test_print_quotes_hostile_values(self, mock_client, capsys):
+        """Test --print output evaluates to the value without running anything."""
+        value = '$(touch pwned); `id` ${HOME}'
+        mock_client.prefetch.return_value = {'release-version': value}
+
+        result = main(['meta', 'export', '--print', 'release-version'])
+
+        assert result == 0
+        line = capsys.readouterr().out.strip()
+        assert shlex.split(line) == ['export', f'RELEASE_VERSION={value}']
+
+    @pytest.mark.parametrize('spec', ['release-version=1VERSION', 'release-version=VERSION;id', 'key=A B'])
+    def test_rejects_invalid_variable_names(self, mock_client, spec):
+        """Test only shell identifiers are accepted as variable names."""
+        assert main(['meta', 'export', '--print', spec]) == 1
+        mock_client.prefetch.assert_not_called()
+
+    def test_requires_env_file_without_print(self, mock_client):
+        """Test exporting without a destination fails."""
+        with patch.dict('os.environ', {}, clear=True):
+            result = main(['meta', 'export', 'release-version'])
+
+        assert result == 1
+        mock_client.prefetch.assert_not_called()
@@ -0,0 +1,62 @@
+"""Tests for release time budgets."""
+import pytest
+from taxjar_release.deadline import Deadline
+from taxjar_release.exceptions import DeadlineExceededError
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadline:
+    """Tests for Deadline."""
+
+    def test_unlimited(self):
+        """Test a deadline without budget never expires."""
+        deadline = Deadline()
+
+        assert deadline.unlimited is True
+        assert deadline.remaining() is None
+        assert deadline.timeout() is None
+        assert deadline.allows(10 ** 9) is True
+
+    def test_remaining_counts_down(self):
+        """Test remaining time follows the clock."""
+        clock = FakeClock()
+        deadline = Deadline(60, clock=clock)
+
+        clock.now += 15
+
+        assert deadline.remaining() == 45
+        assert deadline.timeout() == 45
+        assert deadline.allows(45) is True
+        assert deadline.allows(46) is False
+
+    def test_reserve_is_held_back(self):
+        """Test the cleanup reserve is not handed out to commands."""
+        clock = FakeClock()
+        deadline = Deadline(60, reserve=10, clock=clock)
+
+        assert deadline.remaining() == 50
+
+    def test_from_budget_caps_reserve(self):
+        """Test the default reserve is capped at a fraction of small budgets."""
+        assert Deadline.from_budget(100).remaining() == pytest.approx(90, abs=1)
+        assert Deadline.from_budget(840).remaining() == pytest.approx(810, abs=1)
+        assert Deadline.from_budget(None).unlimited is True
+
+    def test_timeout_raises_when_expired(self):
+        """Test no timeout is handed out once the budget is gone."""
+        clock = FakeClock()
+        deadline = Deadline(5, clock=clock)
+        clock.now += 5
+
+        assert deadline.expired is True
+        with pytest.raises(DeadlineExceededError, match='svn commit'):
+            deadline.timeout('svn commit')
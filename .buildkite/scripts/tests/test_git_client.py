@@ -1,36 +1,81 @@
 """Tests for GitClient."""
+import os
+import git
 import pytest
-from unittest.mock import Mock, MagicMock, patch
+from unittest.mock import Mock, MagicMock, PropertyMock, patch
 from taxjar_release.clients.git import GitClient
+from taxjar_release.clients.blob_cache import BlobCache, git_blob_oid
 
 
 class TestGitClient:
     """Tests for GitClient."""
 
-    def test_get_file_content(self):
-        """Test getting file content at ref."""
+    @pytest.fixture
+    def mock_repo(self):
+        """Create a mock repo whose blobs resolve through cat-file."""
         mock_repo = Mock()
-        mock_repo.git.show.return_value = 'file content here'
+        mock_repo.git.get_object_header.return_value = (b'abc123', b'blob', 17)
+        mock_repo.git.get_object_data.return_value = (b'abc123', b'blob', 17, b'file content here')
+        return mock_repo
 
-        client = GitClient(repo=mock_repo)
+    def test_get_file_content(self, mock_repo):
+        """Test getting file content at ref."""
+        client = GitClient(repo=mock_repo, blob_cache=BlobCache())
         content = client.get_file_content('path/to/file.txt', 'HEAD')
 
         assert content == 'file content here'
-        mock_repo.git.show.assert_called_once_with('HEAD:path/to/file.txt')
+        mock_repo.git.get_object_header.assert_called_once_with('HEAD:path/to/file.txt')
+        mock_repo.git.get_object_data.assert_called_once_with('abc123')
 
-    def test_get_file_content_default_ref(self):
+    def test_get_file_content_default_ref(self, mock_repo):
         """Test getting file content uses HEAD by default."""
-        mock_repo = Mock()
-        mock_repo.git.show.return_value = 'content'
-
-        client = GitClient(repo=mock_repo)
+        client = GitClient(repo=mock_repo, blob_cache=BlobCache())
         client.get_file_content('file.txt')
 
-        mock_repo.git.show.assert_called_once_with('HEAD:file.txt')
+        mock_repo.git.get_object_header.assert_called_once_with('HEAD:file.txt')
+
+    def test_get_file_content_rejects_tree(self, mock_repo):
+        """Test reading a directory raises ValueError."""
+        mock_repo.git.get_object_header.return_value = (b'abc123', b'tree', 0)
+
+        client = GitClient(repo=mock_repo, blob_cache=BlobCache())
+
+        with pytest.raises(ValueError, match='not a file'):
+            client.get_file_content('includes')
+
+    def test_same_blob_read_once(self, mock_repo):
+        """Test content is memoized by blob id across refs."""
+        cache = BlobCache()
+        client = GitClient(repo=mock_repo, blob_cache=cache)
+
+        client.get_file_content('plugin.php', 'HEAD')
+        client.get_file_content('plugin.php', 'origin/master')
+
+        mock_repo.git.get_object_data.assert_called_once()
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_get_many_preserves_order(self, mock_repo):
+        """Test batched reads return content in request order."""
+        mock_repo.git.get_object_header.side_effect = [
+            (b'1', b'blob', 1),
+            (b'2', b'blob', 1),
+        ]
+        mock_repo.git.get_object_data.side_effect = [
+            (b'1', b'blob', 1, b'a'),
+            (b'2', b'blob', 1, b'b'),
+        ]
+
+        client = GitClient(repo=mock_repo, blob_cache=BlobCache())
+        contents = client.get_many([('HEAD', 'a.txt'), ('origin/master', 'b.txt')])
+
+        assert contents == ['a', 'b']
+        assert mock_repo.git.get_object_header.call_args_list[1][0][0] == 'origin/master:b.txt'
 
     def test_get_current_branch(self):
         """Test getting current branch name."""
         mock_repo = Mock()
+        mock_repo.head.is_detached = False
         mock_repo.active_branch.name = 'feature/test-branch'
 
         client = GitClient(repo=mock_repo)
@@ -41,20 +86,363 @@ class TestGitClient:
     def test_file_changed_between_refs_true(self):
         """Test detecting file changed between refs."""
         mock_repo = Mock()
-        mock_repo.git.diff.return_value = 'diff output here'
+        mock_repo.git.get_object_header.side_effect = [(b'aaa', b'blob', 1), (b'bbb', b'blob', 1)]
 
-        client = GitClient(repo=mock_repo)
+        client = GitClient(repo=mock_repo, blob_cache=BlobCache())
         changed = client.file_changed('file.txt', 'ref1', 'ref2')
 
         assert changed is True
-        mock_repo.git.diff.assert_called_once_with('ref1', 'ref2', '--', 'file.txt')
+        mock_repo.git.get_object_data.assert_not_called()
 
     def test_file_changed_between_refs_false(self):
         """Test detecting file not changed between refs."""
         mock_repo = Mock()
-        mock_repo.git.diff.return_value = ''
+        mock_repo.git.get_object_header.return_value = (b'aaa', b'blob', 1)
 
-        client = GitClient(repo=mock_repo)
+        client = GitClient(repo=mock_repo, blob_cache=BlobCache())
         changed = client.file_changed('file.txt', 'ref1', 'ref2')
 
         assert changed is False
+
+    def test_detached_head_uses_buildkite_branch(self):
+        """Test branch comes from BUILDKITE_BRANCH on a detached HEAD."""
+        mock_repo = Mock()
+        mock_repo.head.is_detached = True
+
+        client = GitClient(repo=mock_repo)
+        with patch.dict('os.environ', {'BUILDKITE_BRANCH': 'feature/ci'}):
+            assert client.get_current_branch() == 'feature/ci'
+
+    def test_detached_head_without_env_raises(self):
+        """Test detached HEAD without BUILDKITE_BRANCH raises TypeError."""
+        mock_repo = Mock()
+        mock_repo.head.is_detached = True
+
+        client = GitClient(repo=mock_repo)
+        with patch.dict('os.environ', {}, clear=True):
+            with pytest.raises(TypeError):
+                client.get_current_branch()
+
+class TestGitClientRepository:
+    """Tests for GitClient against a real repository."""
+
+    @pytest.fixture
+    def repo(self, tmp_path):
+        """Create a repository with two commits."""
+        repo = git.Repo.init(tmp_path)
+        (tmp_path / 'plugin.php').write_text('* Version: 1.0.0\n')
+        repo.index.add(['plugin.php'])
+        repo.index.commit('first')
+        (tmp_path / 'plugin.php').write_text('* Version: 1.1.0\n')
+        repo.index.add(['plugin.php'])
+        repo.index.commit('second')
+        return repo
+
+    def test_reads_through_one_process(self, repo):
+        """Test repeated reads reuse the persistent cat-file process."""
+        client = GitClient(repo=repo, blob_cache=BlobCache())
+
+        first = client.get_file_content('plugin.php', 'HEAD')
+        process = repo.git.cat_file_all
+        second = client.get_file_content('plugin.php', 'HEAD~1')
+
+        assert first == '* Version: 1.1.0\n'
+        assert second == '* Version: 1.0.0\n'
+        assert repo.git.cat_file_all is process
+        client.close()
+
+    def test_list_files(self, repo, tmp_path):
+        """Test tracked files are listed from the index."""
+        (tmp_path / 'includes').mkdir()
+        (tmp_path / 'includes' / 'class a.php').write_text('<?php')
+        (tmp_path / 'untracked.php').write_text('<?php')
+        repo.index.add(['includes/class a.php'])
+
+        assert GitClient(repo=repo, blob_cache=BlobCache()).list_files() == ['includes/class a.php', 'plugin.php']
+
+    def test_missing_file_raises(self, repo):
+        """Test reading a path missing at ref raises ValueError."""
+        client = GitClient(repo=repo, blob_cache=BlobCache())
+
+        with pytest.raises(ValueError):
+            client.get_file_content('missing.txt')
+
+        # The persistent process is still usable after a miss
+        assert client.get_file_content('plugin.php') == '* Version: 1.1.0\n'
+        client.close()
+
+    def test_disk_cache_skips_git_for_known_commit(self, repo, tmp_path):
+        """Test a later build of the same commit is served from disk."""
+        cache_dir = str(tmp_path / 'cache')
+        commit = repo.head.commit.hexsha
+
+        first = GitClient(repo=repo, blob_cache=BlobCache(directory=cache_dir))
+        assert first.get_file_content('plugin.php', commit) == '* Version: 1.1.0\n'
+        first.close()
+
+        mock_repo = Mock()
+        mock_repo.commit.return_value.hexsha = commit
+        second = GitClient(repo=mock_repo, blob_cache=BlobCache(directory=cache_dir))
+
+        assert second.get_file_content('plugin.php', commit) == '* Version: 1.1.0\n'
+        mock_repo.git.get_object_header.assert_not_called()
+        mock_repo.git.get_object_data.assert_not_called()
+
+
+class TestBlobCache:
+    """Tests for BlobCache."""
+
+    def test_lru_eviction_by_size(self):
+        """Test least recently used blobs are evicted past max_bytes."""
+        cache = BlobCache(max_bytes=10)
+        cache.put('a', b'12345')
+        cache.put('b', b'12345')
+        cache.get('a')
+        cache.put('c', b'12345')
+
+        assert cache.get('a') == b'12345'
+        assert cache.get('b') is None
+        assert cache.get('c') == b'12345'
+        assert cache.stats()['bytes'] == 10
+
+    def test_disk_layer_verifies_content(self, tmp_path):
+        """Test corrupted on-disk blobs are treated as misses."""
+        data = b'hello'
+        oid = git_blob_oid(data)
+        BlobCache(directory=str(tmp_path)).put(oid, data)
+
+        assert BlobCache(directory=str(tmp_path)).get(oid) == data
+
+        blob_path = tmp_path / 'blobs' / oid[:2] / oid[2:]
+        blob_path.write_bytes(b'tampered')
+        assert BlobCache(directory=str(tmp_path)).get(oid) is None
+
+    def test_disk_blobs_evicted_least_recently_used(self, tmp_path):
+        """Test blobs on disk are pruned below max_disk_bytes, oldest use first."""
+        a, b, c = b'a' * 10, b'b' * 10, b'c' * 10
+        cache = BlobCache(directory=str(tmp_path), max_disk_bytes=25)
+        cache.put(git_blob_oid(a), a)
+        cache.put(git_blob_oid(b), b)
+        for data, used in ((a, 1000), (b, 2000)):
+            oid = git_blob_oid(data)
+            os.utime(tmp_path / 'blobs' / oid[:2] / oid[2:], (used, used))
+
+        assert BlobCache(directory=str(tmp_path)).get(git_blob_oid(a)) == a
+        cache.put(git_blob_oid(c), c)
+
+        fresh = BlobCache(directory=str(tmp_path))
+        assert fresh.get(git_blob_oid(a)) == a
+        assert fresh.get(git_blob_oid(b)) is None
+        assert fresh.get(git_blob_oid(c)) == c
+
+    def test_commit_indexes_limited_to_max_commits(self, tmp_path):
+        """Test only the most recently used commit indexes are kept."""
+        cache = BlobCache(directory=str(tmp_path), max_commits=3)
+        for used, commit in enumerate(['c1', 'c2', 'c3'], start=1):
+            cache.put_path_oid(commit, 'plugin.php', f'oid-{commit}')
+            os.utime(tmp_path / 'commits' / f'{commit}.json', (used * 1000, used * 1000))
+
+        assert cache.get_path_oid('c1', 'plugin.php') == 'oid-c1'
+        cache.put_path_oid('c4', 'plugin.php', 'oid-c4')
+
+        assert sorted(os.listdir(tmp_path / 'commits')) == ['c1.json', 'c4.json']
+
+    def test_disk_scanned_only_when_estimate_crosses_limit(self, tmp_path):
+        """Test writes under the limits do not walk the cache directory."""
+        cache = BlobCache(directory=str(tmp_path), max_disk_bytes=100)
+        blobs = [bytes([ord('a') + i]) * 10 for i in range(12)]
+
+        with patch.object(BlobCache, '_scan_disk', wraps=cache._scan_disk) as scan:
+            for data in blobs[:10]:
+                cache.put(git_blob_oid(data), data)
+                cache.put_path_oid('c1', f'{data[:1].decode()}.php', git_blob_oid(data))
+            scans_under_limit = scan.call_count
+            for data in blobs[10:]:
+                cache.put(git_blob_oid(data), data)
+
+        # One measurement on the first write, one prune when the eleventh
+        # blob crosses 100 bytes (down to 80), then the twelfth fits again.
+        assert scans_under_limit == 2
+        assert scan.call_count == 4
+        remaining = sum(len(files) for _, _, files in os.walk(tmp_path / 'blobs'))
+        assert remaining == 9
+
+    def test_git_blob_oid_matches_git(self):
+        """Test blob ids match git hash-object."""
+        assert git_blob_oid(b'') == 'e69de29bb2d1d6434b8b29ae775ad8c2e48c5391'
+
+
+class TestGitClientConstruction:
+    """Tests for lazy GitClient construction."""
+
+    @pytest.fixture
+    def clean_env(self):
+        """Run with no inherited GIT_CONFIG_* variables."""
+        with patch.dict('os.environ', {}, clear=True):
+            yield
+
+    def test_construction_does_not_touch_git(self, clean_env, tmp_path):
+        """Test constructing a client spawns nothing and opens nothing."""
+        with patch('subprocess.Popen') as mock_popen, patch('git.Repo') as mock_repo_cls:
+            client = GitClient(str(tmp_path))
+
+        mock_popen.assert_not_called()
+        mock_repo_cls.assert_not_called()
+        assert 'GIT_CONFIG_COUNT' not in os.environ
+        client.close()
+
+    def test_repo_opened_on_first_use(self, clean_env, tmp_path):
+        """Test the repo is opened lazily and safe.directory is set via env."""
+        git.Repo.init(tmp_path)
+        client = GitClient(str(tmp_path))
+
+        assert client.repo.working_tree_dir == str(tmp_path)
+        assert os.environ['GIT_CONFIG_COUNT'] == '1'
+        assert os.environ['GIT_CONFIG_KEY_0'] == 'safe.directory'
+        assert os.environ['GIT_CONFIG_VALUE_0'] == str(tmp_path)
+
+    def test_safe_directory_is_idempotent(self, clean_env, tmp_path):
+        """Test repeated clients do not append duplicate entries."""
+        os.environ.update({
+            'GIT_CONFIG_COUNT': '1',
+            'GIT_CONFIG_KEY_0': 'core.pager',
+            'GIT_CONFIG_VALUE_0': 'cat',
+        })
+
+        GitClient._configure_safe_directory(str(tmp_path))
+        GitClient._configure_safe_directory(str(tmp_path))
+
+        assert os.environ['GIT_CONFIG_COUNT'] == '2'
+        assert os.environ['GIT_CONFIG_KEY_1'] == 'safe.directory'
+        assert os.environ['GIT_CONFIG_KEY_0'] == 'core.pager'
+
+    @pytest.fixture
+    def old_git(self, clean_env, tmp_path):
+        """Pretend git predates command-line safe.directory, with an empty HOME."""
+        home = tmp_path / 'home'
+        home.mkdir()
+        os.environ['HOME'] = str(home)
+        with patch.object(git.Git, 'version_info', new_callable=PropertyMock, return_value=(2, 37, 1)):
+            yield home
+
+    def test_old_git_uses_global_config(self, old_git, tmp_path):
+        """Test git before 2.38 gets one global entry however often it runs."""
+        GitClient._configure_safe_directory(str(tmp_path))
+        GitClient._configure_safe_directory(str(tmp_path))
+
+        entries = git.Git().config('--global', '--get-all', 'safe.directory').splitlines()
+        assert entries == [str(tmp_path)]
+        assert 'GIT_CONFIG_COUNT' not in os.environ
+
+    def test_old_git_keeps_wildcard_entry(self, old_git, tmp_path):
+        """Test an existing '*' entry is not supplemented."""
+        git.Git().config('--global', '--add', 'safe.directory', '*')
+
+        GitClient._configure_safe_directory(str(tmp_path))
+
+        entries = git.Git().config('--global', '--get-all', 'safe.directory').splitlines()
+        assert entries == ['*']
+
+
+class TestComparisonRef:
+    """Tests for fetching the comparison ref in shallow and partial clones."""
+
+    @pytest.fixture
+    def origin(self, tmp_path):
+        """Create an origin with master and a feature branch."""
+        path = tmp_path / 'origin'
+        repo = git.Repo.init(path, initial_branch='master')
+        repo.config_writer().set_value('uploadpack', 'allowFilter', 'true').release()
+        (path / 'plugin.php').write_text('* Version: 1.0.0\n')
+        repo.index.add(['plugin.php'])
+        repo.index.commit('master')
+        repo.git.checkout('-b', 'feature')
+        (path / 'plugin.php').write_text('* Version: 1.1.0\n')
+        repo.index.add(['plugin.php'])
+        repo.index.commit('feature')
+        return path
+
+    def clone(self, origin, tmp_path, *options):
+        """Clone only the feature branch with extra clone options."""
+        return git.Repo.clone_from(
+            f'file://{origin}',
+            tmp_path / 'clone',
+            multi_options=['--single-branch', '--branch=feature', *options],
+        )
+
+    def test_full_clone_not_shallow_or_partial(self, origin, tmp_path):
+        """Test a regular clone is detected as neither shallow nor partial."""
+        client = GitClient(repo=self.clone(origin, tmp_path), blob_cache=BlobCache())
+
+        assert client.is_shallow is False
+        assert client.is_partial is False
+
+    def test_shallow_clone_fetches_comparison_ref(self, origin, tmp_path):
+        """Test a shallow clone fetches origin/master at depth 1."""
+        client = GitClient(repo=self.clone(origin, tmp_path, '--depth=1'), blob_cache=BlobCache())
+
+        assert client.is_shallow is True
+        assert client.ensure_ref('origin/master', ['plugin.php']) is True
+        assert client.get_file_content('plugin.php', 'origin/master') == '* Version: 1.0.0\n'
+        client.close()
+
+    def test_partial_clone_fetches_without_blobs(self, origin, tmp_path):
+        """Test a partial clone fetches the ref and reads blobs on demand."""
+        client = GitClient(
+            repo=self.clone(origin, tmp_path, '--filter=blob:none'),
+            blob_cache=BlobCache(),
+        )
+
+        assert client.is_partial is True
+        assert client.ensure_ref('origin/master', ['plugin.php']) is True
+        assert client.get_file_content('plugin.php', 'origin/master') == '* Version: 1.0.0\n'
+        client.close()
+
+    def test_existing_ref_is_not_fetched(self, origin, tmp_path):
+        """Test no fetch happens when the ref is already present."""
+        repo = git.Repo.clone_from(f'file://{origin}', tmp_path / 'clone')
+        client = GitClient(repo=repo, blob_cache=BlobCache())
+
+        with patch.object(git.cmd.Git, 'fetch', create=True) as mock_fetch:
+            assert client.ensure_ref('origin/master', ['plugin.php']) is True
+
+        mock_fetch.assert_not_called()
+
+    def test_unknown_branch_returns_false(self, origin, tmp_path):
+        """Test a ref that cannot be fetched is reported unavailable."""
+        client = GitClient(repo=self.clone(origin, tmp_path, '--depth=1'), blob_cache=BlobCache())
+
+        assert client.ensure_ref('origin/does-not-exist') is False
+
+    def test_paths_unchanged_since_merge_base(self, origin, tmp_path):
+        """Test tree comparison from the merge base without reading content."""
+        repo = git.Repo.clone_from(f'file://{origin}', tmp_path / 'clone', branch='feature')
+        client = GitClient(repo=repo, blob_cache=BlobCache())
+
+        base = client.merge_base('origin/master', 'HEAD')
+
+        assert base == repo.commit('origin/master').hexsha
+        assert client.paths_unchanged(['plugin.php'], base, 'HEAD') is False
+        assert client.paths_unchanged(['missing.txt'], base, 'HEAD') is True
+        assert client.blob_cache.stats()['misses'] == 0
+
+    def test_file_changed_detects_changes_under_directory(self, tmp_path):
+        """Test a directory counts as changed when a file under it changes."""
+        repo = git.Repo.init(tmp_path / 'repo')
+        root = tmp_path / 'repo'
+        (root / 'includes').mkdir()
+        (root / 'includes' / 'class-a.php').write_text('<?php // 1')
+        (root / 'assets').mkdir()
+        (root / 'assets' / 'icon.svg').write_text('<svg/>')
+        repo.index.add(['includes/class-a.php', 'assets/icon.svg'])
+        first = repo.index.commit('first').hexsha
+        (root / 'includes' / 'class-a.php').write_text('<?php // 2')
+        repo.index.add(['includes/class-a.php'])
+        second = repo.index.commit('second').hexsha
+        client = GitClient(repo=repo, blob_cache=BlobCache())
+
+        assert client.file_changed('includes', first, second) is True
+        assert client.file_changed('assets', first, second) is False
+        assert client.file_changed('includes/class-a.php', first, second) is True
+        assert client.file_changed('missing', first, second) is False
+        client.close()
@@ -0,0 +1,252 @@
+"""Tests for the disk-backed HTTP cache."""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+import responses
+from taxjar_release.clients.http_cache import CacheEntry, CachingAdapter, HTTPCacheStore
+from taxjar_release.clients.wordpress import WordPressClient
+
+
+URL = 'https://api.wordpress.org/plugins/info/1.0/test-plugin.json'
+
+
+class Clock:
+    """Manually advanced wall clock."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Create a manual clock."""
+    return Clock()
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    """Create a store in a temporary directory."""
+    return HTTPCacheStore(str(tmp_path), clock=clock)
+
+
+@pytest.fixture
+def session(store):
+    """Create a session with the caching adapter mounted."""
+    session = requests.Session()
+    session.mount('https://', CachingAdapter(store))
+    return session
+
+
+class TestCachingAdapter:
+    """Tests for CachingAdapter."""
+
+    @responses.activate
+    def test_fresh_entry_served_without_request(self, session, clock):
+        """Test max-age responses are reused while fresh."""
+        responses.add(responses.GET, URL, json={'version': '4.1.0'}, headers={'Cache-Control': 'max-age=60'})
+
+        first = session.get(URL)
+        clock.now += 30
+        second = session.get(URL)
+
+        assert first.cache_status == 'miss'
+        assert second.cache_status == 'hit'
+        assert second.json() == {'version': '4.1.0'}
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_stale_entry_revalidated_with_etag(self, session, clock):
+        """Test a 304 serves the stored body."""
+        responses.add(responses.GET, URL, json={'version': '4.1.0'}, headers={'ETag': '"v1"'})
+        responses.add(responses.GET, URL, status=304, headers={'ETag': '"v1"'})
+
+        session.get(URL)
+        second = session.get(URL)
+
+        assert responses.calls[1].request.headers['If-None-Match'] == '"v1"'
+        assert second.status_code == 200
+        assert second.cache_status == 'revalidated'
+        assert second.json() == {'version': '4.1.0'}
+
+    @responses.activate
+    def test_last_modified_sent_as_if_modified_since(self, session):
+        """Test Last-Modified is used when there is no ETag."""
+        modified = 'Wed, 01 Oct 2025 00:00:00 GMT'
+        responses.add(responses.GET, URL, json={'version': '4.1.0'}, headers={'Last-Modified': modified})
+        responses.add(responses.GET, URL, json={'version': '4.2.0'}, headers={'Last-Modified': modified})
+
+        session.get(URL)
+        second = session.get(URL)
+
+        assert responses.calls[1].request.headers['If-Modified-Since'] == modified
+        assert second.cache_status == 'miss'
+        assert second.json() == {'version': '4.2.0'}
+
+    @responses.activate
+    def test_no_store_not_cached(self, session, tmp_path):
+        """Test no-store responses never reach the disk."""
+        responses.add(responses.GET, URL, json={}, headers={'Cache-Control': 'no-store', 'ETag': '"v1"'})
+
+        session.get(URL)
+
+        assert os.listdir(tmp_path) == []
+
+    @responses.activate
+    def test_max_freshness_caps_server_max_age(self, store, clock):
+        """Test the adapter never trusts a response longer than its cap."""
+        session = requests.Session()
+        session.mount('https://', CachingAdapter(store, max_freshness=10))
+        responses.add(responses.GET, URL, json={}, headers={'Cache-Control': 'max-age=3600'})
+
+        session.get(URL)
+        clock.now += 11
+        session.get(URL)
+
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_errors_not_cached(self, session):
+        """Test error responses are passed through and not stored."""
+        responses.add(responses.GET, URL, status=500, headers={'Cache-Control': 'max-age=60'})
+        responses.add(responses.GET, URL, json={'version': '4.1.0'})
+
+        assert session.get(URL).status_code == 500
+        assert session.get(URL).json() == {'version': '4.1.0'}
+
+
+class _KeepAliveETagHandler(BaseHTTPRequestHandler):
+    """Answers with an ETag over keep-alive connections and counts them."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            return
+        body = b'{"version": "4.2.0"}'
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestRevalidationConnections:
+    """Tests for connection reuse on revalidation."""
+
+    @pytest.fixture
+    def server(self):
+        """Run a keep-alive ETag server on a local port."""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveETagHandler)
+        server.connections = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    def test_revalidations_reuse_connection(self, server):
+        """Test 304 responses release their connection back to the pool."""
+        session = requests.Session()
+        session.mount('http://', CachingAdapter(HTTPCacheStore()))
+        url = f'http://127.0.0.1:{server.server_port}/plugin.json'
+
+        statuses = [session.get(url).cache_status for _ in range(6)]
+
+        assert statuses == ['miss'] + ['revalidated'] * 5
+        assert server.connections == 1
+        session.close()
+
+
+class TestHTTPCacheStore:
+    """Tests for HTTPCacheStore."""
+
+    def test_entries_expire_after_ttl(self, tmp_path, clock):
+        """Test entries are dropped once not validated for ttl seconds."""
+        store = HTTPCacheStore(str(tmp_path), ttl=100, clock=clock)
+        store.put(CacheEntry(url=URL, headers={}, stored_at=clock.now, body=b'x'))
+
+        clock.now += 101
+
+        assert store.get(URL) is None
+        assert os.listdir(tmp_path) == []
+
+    def test_memory_store(self, clock):
+        """Test entries are kept in memory without a directory."""
+        store = HTTPCacheStore(clock=clock, ttl=100)
+        store.put(CacheEntry(url=URL, headers={'ETag': '"v1"'}, stored_at=clock.now, body=b'x'))
+
+        entry = store.get(URL)
+        entry.headers['ETag'] = '"changed"'
+
+        assert store.get(URL).etag == '"v1"'
+        clock.now += 101
+        assert store.get(URL) is None
+
+    def test_size_bounded_eviction(self, tmp_path, clock):
+        """Test the least recently used entries are evicted first."""
+        store = HTTPCacheStore(str(tmp_path), max_bytes=25, clock=clock)
+        for name in ('a', 'b'):
+            store.put(CacheEntry(url=f'{URL}?{name}', headers={}, stored_at=clock.now, body=b'x' * 10))
+        os.utime(store._paths(f'{URL}?a')[0], (1, 1))
+        os.utime(store._paths(f'{URL}?b')[0], (2, 2))
+        store.get(f'{URL}?a')
+
+        store.put(CacheEntry(url=f'{URL}?c', headers={}, stored_at=clock.now, body=b'x' * 10))
+
+        assert store.get(f'{URL}?a') is not None
+        assert store.get(f'{URL}?b') is None
+        assert store.get(f'{URL}?c') is not None
+
+
+class TestWordPressClientCache:
+    """Tests for WordPressClient cache wiring."""
+
+    @responses.activate
+    def test_cache_used_when_configured(self, tmp_path, monkeypatch):
+        """Test repeated lookups revalidate against the agent cache."""
+        responses.add(responses.GET, URL, json={'version': '4.1.0'}, headers={'ETag': '"v1"'})
+        responses.add(responses.GET, URL, status=304)
+
+        monkeypatch.setenv('RELEASE_TOOL_CACHE_DIR', str(tmp_path))
+        assert WordPressClient().get_plugin_version('test-plugin') == '4.1.0'
+        assert WordPressClient().get_plugin_version('test-plugin') == '4.1.0'
+
+        assert responses.calls[1].request.headers['If-None-Match'] == '"v1"'
+
+    def test_memory_cache_without_cache_dir(self, monkeypatch):
+        """Test responses are kept in memory when caching is not configured."""
+        monkeypatch.delenv('RELEASE_TOOL_CACHE_DIR', raising=False)
+
+        adapter = WordPressClient().session.get_adapter('https://api.wordpress.org')
+
+        assert isinstance(adapter, CachingAdapter)
+        assert adapter.store.directory is None
+
+    @responses.activate
+    def test_revalidate_skips_fresh_entry(self):
+        """Test revalidate sends a conditional request for a fresh entry."""
+        headers = {'Cache-Control': 'max-age=60', 'ETag': '"v1"'}
+        responses.add(responses.GET, URL, json={'version': '4.1.0'}, headers=headers)
+        responses.add(responses.GET, URL, status=304, headers=headers)
+        client = WordPressClient()
+
+        client.get_plugin_version('test-plugin')
+        client.get_plugin_version('test-plugin')
+        client.get_plugin_version('test-plugin', revalidate=True)
+
+        assert len(responses.calls) == 2
+        assert responses.calls[1].request.headers['If-None-Match'] == '"v1"'
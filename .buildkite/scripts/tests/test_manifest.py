@@ -0,0 +1,141 @@
+"""Tests for the deploy manifest."""
+import os
+import git
+import pytest
+from taxjar_release.clients.git import GitClient
+from taxjar_release.manifest import DistIgnore, Manifest, ManifestEntry, build_manifest
+from taxjar_release.sync import file_digest
+
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..', '..', '..')
+
+
+class TestDistIgnore:
+    """Tests for .distignore matching."""
+
+    @pytest.mark.parametrize('patterns,path,ignored', [
+        (['README.md'], 'README.md', True),
+        (['README.md'], 'docs/README.md', True),
+        (['/README.md'], 'docs/README.md', False),
+        (['tests/'], 'tests/test-plugin.php', True),
+        (['tests/'], 'includes/tests/helper.php', True),
+        (['tests/'], 'tests', False),
+        (['docs/api'], 'docs/api/index.html', True),
+        (['docs/api'], 'src/docs/api/index.html', False),
+        (['*.log'], 'logs/debug.log', True),
+        (['*.log'], 'debug.log.php', False),
+        (['includes/*.php'], 'includes/a.php', True),
+        (['includes/*.php'], 'includes/sub/a.php', False),
+        (['includes/**/*.php'], 'includes/sub/deep/a.php', True),
+        (['**/fixtures'], 'a/b/fixtures/x.json', True),
+        (['vendor/**'], 'vendor/lib/a.php', True),
+        (['file?.txt'], 'file1.txt', True),
+        (['file[0-9].txt'], 'filea.txt', False),
+        (['file[!0-9].txt'], 'filea.txt', True),
+        (['*.md', '!readme.md'], 'readme.md', False),
+        (['*.md', '!readme.md', 'readme.md'], 'readme.md', True),
+        (['build/', '!build/keep.php'], 'build/keep.php', True),
+        (['\\#notes'], '#notes', True),
+        (['# comment', ''], 'comment', False),
+        (['trailing.txt   '], 'trailing.txt', True),
+    ])
+    def test_gitignore_semantics(self, patterns, path, ignored):
+        """Test patterns follow gitignore rules."""
+        assert DistIgnore(patterns).is_ignored(path) is ignored
+
+    def test_directory_only_pattern(self):
+        """Test a trailing slash matches directories, not files."""
+        rules = DistIgnore(['cache/'])
+
+        assert rules.is_ignored('cache', is_dir=True) is True
+        assert rules.is_ignored('cache') is False
+
+    def test_missing_file_ignores_nothing(self, tmp_path):
+        """Test a missing .distignore excludes nothing."""
+        assert DistIgnore.from_file(str(tmp_path / '.distignore')).rules == []
+
+    def test_repository_distignore(self):
+        """Test the plugin's .distignore drops development files."""
+        rules = DistIgnore.from_file(os.path.join(REPO_ROOT, '.distignore'))
+
+        for path in ('tests/bootstrap.php', 'composer.json', 'composer.lock', 'phpcs.ruleset.xml',
+                     'README.md', 'CHANGELOG.md', '.buildkite/pipeline.yml'):
+            assert rules.is_ignored(path), path
+        for path in ('taxjar-woocommerce.php', 'readme.txt', 'includes/class-taxjar-integration.php'):
+            assert not rules.is_ignored(path), path
+
+
+class TestBuildManifest:
+    """Tests for build_manifest."""
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        """Create a plugin repository with development files."""
+        files = {
+            'taxjar-woocommerce.php': '<?php // plugin',
+            'includes/class-taxjar.php': '<?php // class',
+            'tests/test-plugin.php': '<?php // test',
+            'composer.json': '{}',
+            'README.md': '# TaxJar',
+            '.distignore': 'tests/\ncomposer.json\nREADME.md\n',
+            '.editorconfig': 'root = true',
+        }
+        for path, content in files.items():
+            (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / path).write_text(content)
+        repo = git.Repo.init(tmp_path)
+        repo.index.add(list(files))
+        (tmp_path / 'untracked.php').write_text('<?php')
+        return tmp_path
+
+    def test_lists_tracked_shipped_files(self, source):
+        """Test only tracked, non-hidden, non-ignored files are listed."""
+        manifest = build_manifest(str(source))
+
+        assert [entry.path for entry in manifest] == ['includes/class-taxjar.php', 'taxjar-woocommerce.php']
+
+    def test_entries_have_size_and_hash(self, source):
+        """Test entries record size and SHA-256."""
+        entry = build_manifest(str(source)).get('taxjar-woocommerce.php')
+
+        assert entry.size == len('<?php // plugin')
+        assert entry.sha256 == file_digest(str(source / 'taxjar-woocommerce.php'))
+
+    def test_skips_tracked_files_missing_from_disk(self, source):
+        """Test files deleted from the working tree are not listed."""
+        (source / 'includes' / 'class-taxjar.php').unlink()
+
+        manifest = build_manifest(str(source), GitClient(str(source)))
+
+        assert 'includes/class-taxjar.php' not in manifest
+
+    def test_repository_manifest(self):
+        """Test the plugin's own manifest ships only runtime files."""
+        manifest = build_manifest(REPO_ROOT)
+
+        top_level = {entry.path.split('/')[0] for entry in manifest}
+        assert 'taxjar-woocommerce.php' in top_level
+        assert not top_level & {'tests', 'composer.json', 'README.md', 'CHANGELOG.md', '.buildkite'}
+
+
+class TestManifest:
+    """Tests for Manifest."""
+
+    def test_directories_and_size(self):
+        """Test parent directories and total size are derived from entries."""
+        manifest = Manifest([
+            ManifestEntry('includes/admin/views/a.php', 3, 'x'),
+            ManifestEntry('readme.txt', 4, 'y'),
+        ])
+
+        assert manifest.directories() == {'includes', 'includes/admin', 'includes/admin/views'}
+        assert manifest.total_size == 7
+
+    def test_write_and_read(self, tmp_path):
+        """Test a manifest round-trips through JSON."""
+        manifest = Manifest([ManifestEntry('readme.txt', 4, 'abc')])
+        path = str(tmp_path / 'manifest.json')
+
+        manifest.write(path)
+
+        assert list(Manifest.read(path)) == list(manifest)
@@ -0,0 +1,171 @@
+"""Tests for the version matrix refresh."""
+import os
+import pytest
+from unittest.mock import Mock
+from taxjar_release.cli import main
+from taxjar_release.clients.wordpress import WordPressClient
+from taxjar_release.exceptions import WordPressAPIError
+from taxjar_release.matrix import VersionMatrixRefresher, parse_matrix, render_matrix
+from tests.fixtures.plugin_files import generate_plugin_header
+from tests.fixtures.wordpress_api import StandInWordPressAPI, generate_woocommerce_readme
+
+
+MATRIX_PATH = os.path.join(os.path.dirname(__file__), '..', 'version-matrix.sh')
+
+MATRIX = '''set_version_matrix() {
+  case "${BUILDKITE_MATRIX:-}" in
+    "8.x")
+      export WC_VERSION="8.9.1"
+      export PHP_VERSION="8.1"
+      export WP_VERSION="6.3"
+      ;;
+    "9.x")
+      export WC_VERSION="9.9.4"
+      export PHP_VERSION="8.2"
+      export WP_VERSION="6.5"
+      ;;
+    *)
+      if [ -z "${WC_VERSION:-}" ]; then
+        export WC_VERSION="9.9.4"
+        export PHP_VERSION="8.2"
+        export WP_VERSION="6.5"
+      fi
+      ;;
+  esac
+}
+'''
+
+
+@pytest.fixture
+def api():
+    """Run a stand-in WordPress.org with WooCommerce 8.x-10.x releases."""
+    api = StandInWordPressAPI().start()
+    api.add_plugin('woocommerce', '10.1.0', ['8.9.1', '8.9.3', '9.9.4', '9.9.5', '10.0.0-rc.1', '10.1.0'])
+    api.add_tag('woocommerce', '8.9.3', generate_woocommerce_readme(requires_wp='6.4'))
+    api.add_tag('woocommerce', '9.9.5', generate_woocommerce_readme(requires_wp='6.6'))
+    api.add_tag('woocommerce', '10.1.0', generate_woocommerce_readme(requires_wp='6.7'))
+    api.set_core_version('6.8.3')
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def refresher(api):
+    """Create a refresher pointed at the stand-in API."""
+    return VersionMatrixRefresher(WordPressClient(**api.client_kwargs))
+
+
+class TestMatrixFile:
+    """Tests for parsing and rendering version-matrix.sh."""
+
+    def test_parses_repository_matrix(self):
+        """Test the real matrix file parses into per-major entries."""
+        with open(MATRIX_PATH) as f:
+            entries = parse_matrix(f.read())
+
+        assert [entry.major for entry in entries] == [7, 8, 9, 10]
+        assert all(entry.wc_version and entry.php_version and entry.wp_version for entry in entries)
+
+    def test_render_round_trips(self):
+        """Test rendering unchanged entries leaves the file untouched."""
+        with open(MATRIX_PATH) as f:
+            content = f.read()
+
+        assert render_matrix(content, parse_matrix(content)) == content
+
+
+class TestVersionMatrixRefresher:
+    """Tests for VersionMatrixRefresher against a local stand-in API."""
+
+    def test_updates_each_major(self, refresher):
+        """Test WC and WP versions are refreshed and PHP pins kept."""
+        result = refresher.refresh(MATRIX, generate_plugin_header(wc_tested='10.1.0'))
+
+        assert result.changed is True
+        assert [(e.major, e.wc_version, e.php_version, e.wp_version) for e in result.entries] == [
+            (8, '8.9.3', '8.1', '6.4'),
+            (9, '9.9.5', '8.2', '6.6'),
+        ]
+        assert 'export WC_VERSION="9.9.5"' in result.content
+        # The fallback mirrors 9.x and follows it.
+        assert result.content.count('export WP_VERSION="6.6"') == 2
+
+    def test_readmes_fetched_per_major(self, refresher, api):
+        """Test one readme per tracked major plus the core version are fetched."""
+        refresher.refresh(MATRIX, generate_plugin_header(wc_tested='10.1.0'))
+
+        paths = [path for _, path in api.requests]
+        assert sorted(path for path in paths if path.endswith('readme.txt')) == [
+            '/svn/woocommerce/tags/8.9.3/readme.txt',
+            '/svn/woocommerce/tags/9.9.5/readme.txt',
+        ]
+        assert '/core/version-check/1.7/' in paths
+
+    def test_flags_untracked_major_and_stale_header(self, refresher):
+        """Test warnings for a newer major and an old 'WC tested up to'."""
+        result = refresher.refresh(MATRIX, generate_plugin_header(wc_tested='9.9.0'))
+
+        assert any('10.x (10.1.0) is not tracked' in warning for warning in result.warnings)
+        assert any('WC tested up to: 9.9.0' in warning for warning in result.warnings)
+
+    def test_wp_capped_at_latest_release(self, refresher, api):
+        """Test a readme requiring an unreleased WordPress is capped."""
+        api.set_core_version('6.5.2')
+
+        result = refresher.refresh(MATRIX, generate_plugin_header(wc_tested='10.1.0'))
+
+        assert result.entries[1].wp_version == '6.5'
+
+    def test_up_to_date_matrix_unchanged(self, refresher):
+        """Test a current matrix produces no changes."""
+        first = refresher.refresh(MATRIX, generate_plugin_header(wc_tested='10.1.0'))
+        second = refresher.refresh(first.content, generate_plugin_header(wc_tested='10.1.0'))
+
+        assert second.changed is False
+
+    def test_no_releases_raises(self):
+        """Test an empty version list is an API error."""
+        wordpress = Mock(spec=WordPressClient)
+        wordpress.get_plugin_info.return_value = {'versions': {'trunk': ''}}
+
+        with pytest.raises(WordPressAPIError):
+            VersionMatrixRefresher(wordpress).refresh(MATRIX, '')
+
+
+class TestMatrixRefreshCommand:
+    """Tests for the matrix-refresh command."""
+
+    @pytest.fixture
+    def files(self, tmp_path):
+        """Write matrix and plugin files."""
+        matrix = tmp_path / 'version-matrix.sh'
+        matrix.write_text(MATRIX)
+        plugin = tmp_path / 'taxjar-woocommerce.php'
+        plugin.write_text(generate_plugin_header(wc_tested='10.1.0'))
+        return matrix, plugin
+
+    @pytest.fixture
+    def stand_in_client(self, api, monkeypatch):
+        """Make the command's WordPressClient use the stand-in API."""
+        monkeypatch.setattr(
+            'taxjar_release.cli.WordPressClient',
+            lambda: WordPressClient(**api.client_kwargs),
+        )
+
+    def test_writes_matrix(self, files, stand_in_client):
+        """Test the matrix file is rewritten."""
+        matrix, plugin = files
+
+        result = main(['matrix-refresh', '--matrix-file', str(matrix), '--plugin-file', str(plugin)])
+
+        assert result == 0
+        assert 'export WC_VERSION="8.9.3"' in matrix.read_text()
+
+    def test_check_mode_reports_without_writing(self, files, stand_in_client):
+        """Test --check fails on an outdated matrix and leaves it alone."""
+        matrix, plugin = files
+
+        result = main(['matrix-refresh', '--check', '--matrix-file', str(matrix), '--plugin-file', str(plugin)])
+
+        assert result == 1
+        assert matrix.read_text() == MATRIX
@@ -2,6 +2,8 @@
 import pytest
 from unittest.mock import Mock, patch
 from taxjar_release.retry import retry
+from taxjar_release.deadline import Deadline
+from taxjar_release.exceptions import DeadlineExceededError
 
 
 class TestRetryDecorator:
@@ -71,3 +73,50 @@ class TestRetryDecorator:
             test_func()
 
             mock_sleep.assert_called_once_with(5)
+
+
+class TestRetryDeadline:
+    """Tests for deadline-aware retries."""
+
+    class Worker:
+        """Object exposing a deadline, like the release managers."""
+
+        def __init__(self, deadline, func):
+            self.deadline = deadline
+            self.func = func
+
+        @retry(max_attempts=3, backoff=[5, 5], min_attempt_seconds=10)
+        def work(self):
+            return self.func()
+
+    def test_no_attempt_without_budget(self):
+        """Test the first attempt is not started when it cannot finish."""
+        func = Mock(return_value='ok')
+        worker = self.Worker(Deadline(5), func)
+
+        with pytest.raises(DeadlineExceededError):
+            worker.work()
+
+        func.assert_not_called()
+
+    def test_stops_retrying_when_budget_runs_out(self):
+        """Test retries stop once backoff plus an attempt exceed the budget."""
+        func = Mock(side_effect=Exception('fail'))
+        worker = self.Worker(Deadline(12), func)
+
+        with patch('taxjar_release.retry.time.sleep') as mock_sleep:
+            with pytest.raises(Exception, match='fail'):
+                worker.work()
+
+        assert func.call_count == 1
+        mock_sleep.assert_not_called()
+
+    def test_retries_with_ample_budget(self):
+        """Test retries proceed normally when the budget allows."""
+        func = Mock(side_effect=[Exception('fail'), 'ok'])
+        worker = self.Worker(Deadline(600), func)
+
+        with patch('taxjar_release.retry.time.sleep'):
+            assert worker.work() == 'ok'
+
+        assert func.call_count == 2
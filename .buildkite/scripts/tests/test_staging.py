@@ -0,0 +1,159 @@
+"""Tests for parallel copy-on-write staging."""
+import errno
+import os
+import threading
+import pytest
+from unittest.mock import patch
+from taxjar_release import staging
+from taxjar_release.staging import (
+    METHOD_CLONE, METHOD_COPY, METHOD_COPY_FILE_RANGE, copy_file, reset_copy_methods, run_parallel,
+)
+
+
+@pytest.fixture(autouse=True)
+def forget_copy_methods():
+    """Start each test without remembered copy failures."""
+    reset_copy_methods()
+    yield
+    reset_copy_methods()
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Create a source file with an old mtime and a non-default mode."""
+    path = tmp_path / 'source.php'
+    path.write_bytes(b'<?php // ' + b'x' * 100000)
+    os.chmod(path, 0o640)
+    os.utime(path, ns=(1_600_000_000_123_456_789, 1_600_000_000_123_456_789))
+    return path
+
+
+def unsupported(*args, **kwargs):
+    """Fail like a filesystem without the requested copy method."""
+    raise OSError(errno.EOPNOTSUPP, 'Operation not supported')
+
+
+class TestCopyFile:
+    """Tests for copy_file."""
+
+    def test_copies_content_mode_and_mtime(self, source, tmp_path):
+        """Test content, permissions and nanosecond mtime are preserved."""
+        target = tmp_path / 'target.php'
+
+        method = copy_file(str(source), str(target))
+
+        assert method in (METHOD_CLONE, METHOD_COPY_FILE_RANGE, METHOD_COPY)
+        assert target.read_bytes() == source.read_bytes()
+        assert os.stat(target).st_mode == os.stat(source).st_mode
+        assert os.stat(target).st_mtime_ns == os.stat(source).st_mtime_ns
+
+    def test_replacing_hardlink_leaves_other_link_alone(self, source, tmp_path):
+        """Test a target hard-linked elsewhere is replaced, not written through."""
+        target = tmp_path / 'target.php'
+        target.write_text('old')
+        other = tmp_path / 'other.php'
+        os.link(target, other)
+
+        copy_file(str(source), str(target))
+
+        assert other.read_text() == 'old'
+        assert target.read_bytes() == source.read_bytes()
+
+    def test_falls_back_to_copy_file_range(self, source, tmp_path):
+        """Test copy_file_range is used when cloning is not supported."""
+        if not hasattr(os, 'copy_file_range'):
+            pytest.skip('copy_file_range not available')
+
+        with patch('taxjar_release.staging.fcntl.ioctl', side_effect=unsupported):
+            method = copy_file(str(source), str(tmp_path / 'target.php'))
+
+        assert method == METHOD_COPY_FILE_RANGE
+        assert (tmp_path / 'target.php').read_bytes() == source.read_bytes()
+
+    def test_falls_back_to_plain_copy(self, source, tmp_path):
+        """Test a read/write copy is made when no kernel copy works."""
+        with patch('taxjar_release.staging.fcntl.ioctl', side_effect=unsupported), \
+                patch('taxjar_release.staging.os.copy_file_range', side_effect=unsupported, create=True):
+            method = copy_file(str(source), str(tmp_path / 'target.php'))
+
+        assert method == METHOD_COPY
+        assert (tmp_path / 'target.php').read_bytes() == source.read_bytes()
+
+    def test_copy_file_range_copying_nothing_falls_back(self, source, tmp_path):
+        """Test a copy_file_range that reports end of file at once is not trusted."""
+        with patch('taxjar_release.staging.fcntl.ioctl', side_effect=unsupported), \
+                patch('taxjar_release.staging.os.copy_file_range', return_value=0, create=True) as copy_range:
+            first = copy_file(str(source), str(tmp_path / 'a.php'))
+            second = copy_file(str(source), str(tmp_path / 'b.php'))
+
+        assert (first, second) == (METHOD_COPY, METHOD_COPY)
+        assert (tmp_path / 'a.php').read_bytes() == source.read_bytes()
+        assert copy_range.call_count == 1
+
+    def test_short_copy_file_range_falls_back(self, source, tmp_path):
+        """Test a copy_file_range that stops early is redone with a plain copy."""
+        counts = iter([1000, 0])
+
+        def short_copy(src, dst, count, *args):
+            return os.write(dst, os.read(src, next(counts)))
+
+        with patch('taxjar_release.staging.fcntl.ioctl', side_effect=unsupported), \
+                patch('taxjar_release.staging.os.copy_file_range', side_effect=short_copy, create=True):
+            method = copy_file(str(source), str(tmp_path / 'target.php'))
+
+        assert method == METHOD_COPY
+        assert (tmp_path / 'target.php').read_bytes() == source.read_bytes()
+
+    def test_unsupported_method_not_retried(self, source, tmp_path):
+        """Test a method that failed between two devices is skipped afterwards."""
+        with patch('taxjar_release.staging.fcntl.ioctl', side_effect=unsupported) as ioctl:
+            copy_file(str(source), str(tmp_path / 'a.php'))
+            copy_file(str(source), str(tmp_path / 'b.php'))
+
+        assert ioctl.call_count == 1
+
+    def test_other_errors_propagate_and_clean_up(self, source, tmp_path):
+        """Test real I/O errors are raised and leave no temporary file."""
+        with patch('taxjar_release.staging.fcntl.ioctl', side_effect=OSError(errno.EIO, 'I/O error')):
+            with pytest.raises(OSError):
+                copy_file(str(source), str(tmp_path / 'target.php'))
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['source.php']
+
+
+class TestRunParallel:
+    """Tests for run_parallel."""
+
+    def test_counts_outcomes(self):
+        """Test outcome labels are counted and None is ignored."""
+        outcomes = run_parallel(range(6), lambda n: 'even' if n % 2 == 0 else None, max_workers=3)
+
+        assert outcomes == {'even': 3}
+
+    def test_uses_worker_threads(self):
+        """Test work runs on pool threads."""
+        threads = set()
+
+        def work(_):
+            threads.add(threading.current_thread().name)
+
+        run_parallel(range(4), work, max_workers=2)
+
+        assert all(name.startswith('stage') for name in threads)
+
+    def test_single_worker_runs_inline(self):
+        """Test max_workers=1 runs on the calling thread."""
+        threads = set()
+
+        run_parallel(range(3), lambda _: threads.add(threading.current_thread().name), max_workers=1)
+
+        assert threads == {threading.current_thread().name}
+
+    def test_error_propagates(self):
+        """Test an error in one task is raised."""
+        def work(n):
+            if n == 2:
+                raise ValueError('boom')
+
+        with pytest.raises(ValueError, match='boom'):
+            run_parallel(range(4), work, max_workers=2)
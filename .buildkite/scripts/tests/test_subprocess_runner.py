@@ -1,5 +1,7 @@
 """Tests for SubprocessRunner client."""
+import os
 import subprocess
+import time
 import pytest
 from taxjar_release.clients.subprocess_runner import SubprocessRunner
 
@@ -31,3 +33,148 @@ class TestSubprocessRunner:
         runner = SubprocessRunner()
         result = runner.run(['false'], check=False)
         assert result.returncode != 0
+
+
+class TestRunMany:
+    """Tests for SubprocessRunner.run_many."""
+
+    def test_results_keep_submission_order(self):
+        """Test results are returned in the order commands were given."""
+        runner = SubprocessRunner()
+        cmds = [['sh', '-c', f'sleep 0.0{5 - i}; echo {i}'] for i in range(5)]
+
+        batch = runner.run_many(cmds, max_workers=5)
+
+        assert batch.success is True
+        assert [r.stdout.strip() for r in batch.results] == ['0', '1', '2', '3', '4']
+
+    def test_collects_errors_per_command(self):
+        """Test a failing command does not stop the others."""
+        runner = SubprocessRunner()
+
+        batch = runner.run_many([['true'], ['false'], ['echo', 'ok']])
+
+        assert batch.success is False
+        assert len(batch.failures) == 1
+        assert batch.failures[0].cmd == ['false']
+        assert isinstance(batch.failures[0].error, subprocess.CalledProcessError)
+        assert batch.outcomes[2].result.stdout.strip() == 'ok'
+
+    def test_cancel_on_failure_skips_pending(self):
+        """Test commands not yet started are cancelled after a failure."""
+        runner = SubprocessRunner()
+
+        batch = runner.run_many(
+            [['false'], ['echo', 'a'], ['echo', 'b']],
+            max_workers=1,
+            cancel_on_failure=True,
+        )
+
+        assert batch.outcomes[0].error is not None
+        assert all(o.cancelled for o in batch.outcomes[1:])
+        assert all(o.result is None for o in batch.outcomes[1:])
+
+    def test_raise_first_error(self):
+        """Test raise_first_error re-raises the collected exception."""
+        runner = SubprocessRunner()
+        batch = runner.run_many([['true'], ['false']])
+
+        with pytest.raises(subprocess.CalledProcessError):
+            batch.raise_first_error()
+
+    def test_empty_batch(self):
+        """Test running no commands succeeds trivially."""
+        batch = SubprocessRunner().run_many([])
+        assert batch.success is True
+        assert batch.outcomes == []
+
+
+class TestStream:
+    """Tests for SubprocessRunner.stream."""
+
+    def test_yields_lines(self):
+        """Test text mode yields decoded lines without newlines."""
+        runner = SubprocessRunner()
+        lines = list(runner.stream(['printf', 'one\ntwo\nthree']))
+        assert lines == ['one', 'two', 'three']
+
+    def test_yields_binary_chunks(self):
+        """Test binary mode yields raw bytes."""
+        runner = SubprocessRunner()
+        data = b''.join(runner.stream(['printf', 'abc\ndef'], binary=True))
+        assert data == b'abc\ndef'
+
+    def test_tee_writes_log_file(self, tmp_path):
+        """Test output is copied to the tee log file."""
+        log_path = tmp_path / 'out.log'
+        runner = SubprocessRunner()
+
+        list(runner.stream(['echo', 'logged'], tee=str(log_path)))
+
+        assert log_path.read_text() == 'logged\n'
+
+    def test_failing_command_raises_with_stderr(self):
+        """Test non-zero exit raises after output is consumed."""
+        runner = SubprocessRunner()
+        stream = runner.stream(['sh', '-c', 'echo partial; echo boom >&2; exit 3'])
+
+        assert next(stream) == 'partial'
+        with pytest.raises(subprocess.CalledProcessError) as exc_info:
+            next(stream)
+
+        assert exc_info.value.returncode == 3
+        assert 'boom' in exc_info.value.stderr
+
+    def test_failing_command_no_raise(self):
+        """Test check=False swallows non-zero exit."""
+        runner = SubprocessRunner()
+        assert list(runner.stream(['false'], check=False)) == []
+
+    def test_closing_early_terminates_process(self):
+        """Test abandoning the generator kills the running process."""
+        runner = SubprocessRunner()
+        stream = runner.stream(['sh', '-c', 'echo $$; exec sleep 30'])
+
+        pid = int(next(stream))
+        stream.close()
+
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                break
+            assert time.monotonic() < deadline, f'process {pid} still running after close()'
+            time.sleep(0.05)
+
+
+class TestTimeout:
+    """Tests for SubprocessRunner timeouts."""
+
+    def test_completes_within_timeout(self):
+        """Test a fast command is unaffected by a timeout."""
+        result = SubprocessRunner().run(['echo', 'quick'], timeout=10)
+        assert result.stdout.strip() == 'quick'
+
+    def test_timeout_kills_process_group(self, tmp_path):
+        """Test the whole process tree is terminated on timeout."""
+        marker = tmp_path / 'child-survived'
+        script = f'(sleep 1; touch {marker}) & wait'
+
+        with pytest.raises(subprocess.TimeoutExpired):
+            SubprocessRunner().run(['sh', '-c', script], timeout=0.2)
+
+        time.sleep(1.2)
+        assert not marker.exists()
+
+    def test_stream_timeout(self):
+        """Test a stalled streamed command is terminated."""
+        stream = SubprocessRunner().stream(['sh', '-c', 'echo start; sleep 30'], timeout=0.2)
+
+        with pytest.raises(subprocess.TimeoutExpired):
+            list(stream)
+
+    def test_failing_command_with_timeout_raises(self):
+        """Test check still applies when a timeout is set."""
+        with pytest.raises(subprocess.CalledProcessError):
+            SubprocessRunner().run(['false'], timeout=10)
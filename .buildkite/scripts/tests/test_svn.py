@@ -1,10 +1,17 @@
 """Tests for SVN deploy manager."""
+import fcntl
+import os
+import shutil
 import subprocess
+import git
 import pytest
 from unittest.mock import Mock, patch, call
-from taxjar_release.svn import SVNDeployManager
+from taxjar_release.manifest import Manifest, ManifestEntry
+from taxjar_release.svn import SVNDeployManager, _exclusive_lock
+from taxjar_release.sync import SyncResult
 from taxjar_release.clients.subprocess_runner import SubprocessRunner
-from taxjar_release.exceptions import SVNDeployError
+from taxjar_release.exceptions import DeadlineExceededError, SVNDeployError
+from taxjar_release.deadline import Deadline
 
 
 class TestSVNDeployManager:
@@ -74,8 +81,8 @@ class TestSVNDeployManager:
                     mock_rmtree.assert_called()
 
     def test_checkout_uses_correct_depth(self, mock_runner):
-        """Test checkout uses correct SVN depth flags."""
-        manager = SVNDeployManager(runner=mock_runner)
+        """Test sparse checkout uses correct SVN depth flags."""
+        manager = SVNDeployManager(runner=mock_runner, checkout_mode='sparse')
         manager._temp_dir = '/tmp/test-dir'
 
         manager._checkout_repo()
@@ -96,66 +103,312 @@ class TestSVNDeployManager:
         assert '--set-depth' in second_call
         assert 'infinity' in second_call
 
-    def test_update_trunk_copies_files(self, mock_runner):
-        """Test trunk update copies files from source."""
+    def test_sparse_checkout_is_default(self, mock_runner):
+        """Test the root is checked out sparsely unless trunk is asked for."""
+        assert SVNDeployManager(runner=mock_runner).checkout_mode == 'sparse'
+
+    def test_trunk_checkout_fetches_trunk_alone(self, mock_runner):
+        """Test the trunk checkout fetches trunk alone in one command."""
+        manager = SVNDeployManager(runner=mock_runner, checkout_mode='trunk')
+        manager._temp_dir = '/tmp/test-dir'
+
+        manager._checkout_repo()
+
+        mock_runner.run.assert_called_once()
+        cmd = mock_runner.run.call_args[0][0]
+        assert cmd[:4] == ['svn', 'checkout', f'{SVNDeployManager.SVN_URL}/trunk', '/tmp/test-dir/trunk']
+        assert 'immediates' not in cmd
+
+    @pytest.mark.parametrize('mode,cwd', [
+        ('trunk', '/tmp/test-dir/trunk'),
+        ('sparse', '/tmp/test-dir'),
+    ])
+    def test_commit_runs_in_working_copy_root(self, mock_runner, mode, cwd):
+        """Test the commit runs from the root of whichever layout was checked out."""
+        manager = SVNDeployManager(runner=mock_runner, checkout_mode=mode)
+        manager._temp_dir = '/tmp/test-dir'
+
+        manager._commit_changes('4.2.0', 'user', 'pass')
+
+        assert mock_runner.run.call_args.kwargs['cwd'] == cwd
+
+    def test_rejects_unknown_checkout_mode(self, mock_runner):
+        """Test an unknown checkout mode is rejected."""
+        with pytest.raises(ValueError, match='checkout mode'):
+            SVNDeployManager(runner=mock_runner, checkout_mode='full')
+
+    def test_update_trunk_syncs_source(self, mock_runner, tmp_path):
+        """Test trunk update copies changed files and stages new and removed ones."""
+        source = tmp_path / 'src'
+        (source / 'includes').mkdir(parents=True)
+        (source / 'tests').mkdir()
+        (source / 'taxjar-woocommerce.php').write_text('<?php // 4.2.0')
+        (source / 'includes' / 'class-taxjar.php').write_text('<?php')
+        (source / 'tests' / 'test-plugin.php').write_text('<?php')
+        (source / 'README.md').write_text('# TaxJar')
+        (source / '.distignore').write_text('tests/\nREADME.md\n')
+        (source / 'untracked.php').write_text('<?php')
+        repo = git.Repo.init(source)
+        repo.index.add(['taxjar-woocommerce.php', 'includes/class-taxjar.php', 'tests/test-plugin.php',
+                        'README.md', '.distignore'])
+        trunk = tmp_path / 'svn' / 'trunk'
+        (trunk / '.svn').mkdir(parents=True)
+        (trunk / 'taxjar-woocommerce.php').write_text('<?php // 4.1.0')
+        (trunk / 'old.php').write_text('<?php')
+
         manager = SVNDeployManager(runner=mock_runner)
+        manager._temp_dir = str(tmp_path / 'svn')
+        manager._update_trunk('4.2.0', source_dir=str(source))
+
+        assert (trunk / 'taxjar-woocommerce.php').read_text() == '<?php // 4.2.0'
+        assert (trunk / 'includes' / 'class-taxjar.php').exists()
+        assert not (trunk / 'old.php').exists()
+        assert not (trunk / '.git').exists()
+        assert not (trunk / '.distignore').exists()
+        assert not (trunk / 'tests').exists()
+        assert not (trunk / 'README.md').exists()
+        assert not (trunk / 'untracked.php').exists()
+        assert (trunk / '.svn').exists()
+
+        commands = [c[0][0][:2] for c in mock_runner.run.call_args_list]
+        assert commands == [['svn', 'delete'], ['svn', 'add']]
+        mock_runner.stream.assert_not_called()
 
-        with patch('tempfile.mkdtemp', return_value='/tmp/svn-test'):
-            with patch('os.listdir') as mock_listdir:
-                with patch('shutil.copytree') as mock_copytree:
-                    with patch('shutil.copy2') as mock_copy:
-                        with patch('os.path.isdir') as mock_isdir:
-                            # Setup: trunk has .svn dir, source has files
-                            mock_listdir.side_effect = [
-                                ['.svn'],  # trunk contents
-                                ['taxjar-woocommerce.php', 'includes'],  # source contents
-                            ]
-                            mock_isdir.side_effect = [False, True]  # php file, includes dir
-
-                            manager._temp_dir = '/tmp/svn-test'
-                            with patch.object(manager, '_stage_svn_changes'):
-                                manager._update_trunk('4.2.0', source_dir='/src')
-
-                            # Verify files copied
-                            mock_copy.assert_called_once()
-                            mock_copytree.assert_called_once()
-
-    def test_stage_svn_changes_adds_and_deletes(self, mock_runner):
-        """Test SVN staging correctly adds new files and deletes removed files."""
-        # Mock svn status output showing:
-        # - new_file.php: unversioned (?)
-        # - old_file.php: missing/deleted (!)
-        # - modified.php: modified (M) - should be ignored
-        mock_runner.run.return_value = Mock(
-            stdout='?       new_file.php\n!       old_file.php\nM       modified.php\n',
-            returncode=0
+    @pytest.fixture
+    def targets_runner(self, mock_runner):
+        """Record the paths each svn call reads from its --targets file."""
+        mock_runner.targets = []
+
+        def run(cmd, **kwargs):
+            if '--targets' in cmd:
+                with open(cmd[cmd.index('--targets') + 1]) as f:
+                    mock_runner.targets.append((cmd[1], f.read().splitlines()))
+            return Mock(stdout='', stderr='', returncode=0)
+
+        mock_runner.run.side_effect = run
+        return mock_runner
+
+    def test_type_change_deleted_before_replacement(self, targets_runner, tmp_path):
+        """Test a path turning from file into directory is svn deleted before it is rewritten."""
+        source = tmp_path / 'src'
+        (source / 'assets').mkdir(parents=True)
+        (source / 'assets' / 'icon.png').write_text('png')
+        trunk = tmp_path / 'svn' / 'trunk'
+        (trunk / '.svn').mkdir(parents=True)
+        (trunk / 'assets').write_text('old file')
+        run = targets_runner.run.side_effect
+
+        def run_and_check(cmd, **kwargs):
+            if cmd[1] == 'delete':
+                assert (trunk / 'assets').is_file()
+            return run(cmd, **kwargs)
+
+        targets_runner.run.side_effect = run_and_check
+        manager = SVNDeployManager(runner=targets_runner)
+        manager._temp_dir = str(tmp_path / 'svn')
+        manager._update_trunk('4.2.0', source_dir=str(source),
+                              manifest=Manifest([ManifestEntry('assets/icon.png', 3, '')]))
+
+        assert targets_runner.targets == [('delete', ['assets']), ('add', ['assets'])]
+        assert (trunk / 'assets' / 'icon.png').read_text() == 'png'
+
+    def test_stage_svn_changes_adds_and_deletes(self, targets_runner):
+        """Test SVN staging runs one delete and one add for all paths."""
+        result = SyncResult(
+            added=['includes/new.php', 'assets'],
+            deleted=['old_file.php', 'vendor'],
+            updated=['modified.php'],
         )
 
+        manager = SVNDeployManager(runner=targets_runner)
+        manager._stage_svn_changes('/tmp/trunk', result)
+
+        # No svn status scan is needed
+        targets_runner.stream.assert_not_called()
+        assert targets_runner.run.call_count == 2
+        assert targets_runner.targets == [
+            ('delete', ['old_file.php', 'vendor']),
+            ('add', ['includes/new.php', 'assets']),
+        ]
+        add_cmd = targets_runner.run.call_args_list[1][0][0]
+        assert '--parents' in add_cmd
+        assert all(c.kwargs['cwd'] == '/tmp/trunk' for c in targets_runner.run.call_args_list)
+
+    def test_stage_svn_changes_chunks_paths(self, targets_runner):
+        """Test large path lists are split across several calls."""
+        added = [f'assets/icon-{i}.png' for i in range(5)]
+
+        manager = SVNDeployManager(runner=targets_runner)
+        with patch('taxjar_release.svn.STAGE_CHUNK_SIZE', 2):
+            manager._stage_svn_changes('/tmp/trunk', SyncResult(added=added))
+
+        assert [paths for _, paths in targets_runner.targets] == [added[0:2], added[2:4], added[4:]]
+
+    def test_stage_svn_changes_escapes_peg_revisions(self, targets_runner):
+        """Test paths containing '@' are not read as peg revisions."""
+        manager = SVNDeployManager(runner=targets_runner)
+        manager._stage_svn_changes('/tmp/trunk', SyncResult(added=['assets/icon@2x.png']))
+
+        assert targets_runner.targets == [('add', ['assets/icon@2x.png@'])]
+
+    def test_stage_svn_changes_reports_failed_paths(self, mock_runner):
+        """Test a failed batch is retried per path and failures are named."""
+        def run(cmd, **kwargs):
+            if '--targets' in cmd or cmd[-1] == 'bad.php':
+                return Mock(stdout='', stderr='svn: E155010: bad.php', returncode=1)
+            return Mock(stdout='A         good.php', stderr='', returncode=0)
+
+        mock_runner.run.side_effect = run
+
         manager = SVNDeployManager(runner=mock_runner)
-        manager._stage_svn_changes('/tmp/trunk')
+        with pytest.raises(SVNDeployError, match='bad.php'):
+            manager._stage_svn_changes('/tmp/trunk', SyncResult(added=['good.php', 'bad.php']))
 
-        # Verify svn status was called
-        assert mock_runner.run.call_count >= 1
-        status_call = mock_runner.run.call_args_list[0]
-        assert 'svn' in status_call[0][0]
-        assert 'status' in status_call[0][0]
+        retried = [c[0][0] for c in mock_runner.run.call_args_list[1:]]
+        assert retried == [
+            ['svn', 'add', '--parents', '--force', 'good.php'],
+            ['svn', 'add', '--parents', '--force', 'bad.php'],
+        ]
 
-        # Verify svn add was called for new file
-        add_calls = [c for c in mock_runner.run.call_args_list if 'add' in c[0][0]]
-        assert len(add_calls) == 1
-        assert 'new_file.php' in add_calls[0][0][0]
+    def test_stage_svn_changes_removes_targets_files(self, targets_runner, tmp_path):
+        """Test --targets files are deleted after use."""
+        with patch('tempfile.tempdir', str(tmp_path)):
+            manager = SVNDeployManager(runner=targets_runner)
+            manager._stage_svn_changes('/tmp/trunk', SyncResult(added=['a.php'], deleted=['b.php']))
 
-        # Verify svn delete was called for removed file
-        delete_calls = [c for c in mock_runner.run.call_args_list if 'delete' in c[0][0]]
-        assert len(delete_calls) == 1
-        assert 'old_file.php' in delete_calls[0][0][0]
+        assert list(tmp_path.iterdir()) == []
 
-    def test_stage_svn_changes_handles_empty_status(self, mock_runner):
+    def test_stage_svn_changes_handles_no_changes(self, mock_runner):
         """Test SVN staging handles no changes gracefully."""
-        mock_runner.run.return_value = Mock(stdout='', returncode=0)
-
         manager = SVNDeployManager(runner=mock_runner)
-        manager._stage_svn_changes('/tmp/trunk')
+        manager._stage_svn_changes('/tmp/trunk', SyncResult(unchanged=3))
+
+        assert mock_runner.run.call_count == 0
+
+    def test_commands_receive_remaining_budget(self, mock_runner):
+        """Test SVN commands get the remaining budget as their timeout."""
+        manager = SVNDeployManager(runner=mock_runner, deadline=Deadline(600))
+        manager._temp_dir = '/tmp/test-dir'
+
+        manager._checkout_repo()
+
+        for call_item in mock_runner.run.call_args_list:
+            assert 0 < call_item.kwargs['timeout'] <= 600
+
+
+class TestCachedWorkingCopy:
+    """Tests for reusing a working copy kept on the agent."""
+
+    TRUNK_URL = f'{SVNDeployManager.SVN_URL}/trunk'
+
+    @pytest.fixture
+    def runner(self):
+        """Runner that creates a working copy on checkout and reports its URL."""
+        runner = Mock(spec=SubprocessRunner)
+        runner.info_url = self.TRUNK_URL
+
+        def run(cmd, **kwargs):
+            if cmd[1] == 'checkout':
+                os.makedirs(os.path.join(cmd[3], '.svn'))
+            if cmd[1] == 'info':
+                return Mock(stdout=f'{runner.info_url}\n', returncode=0)
+            return Mock(stdout='', returncode=0)
+
+        runner.run.side_effect = run
+        return runner
+
+    @pytest.fixture
+    def deploy(self, runner, tmp_path):
+        """Run a deploy with the cache under tmp_path and later stages stubbed."""
+        def deploy():
+            manager = SVNDeployManager(runner=runner, checkout_mode='trunk', cache_dir=str(tmp_path))
+            with patch.object(manager, '_update_trunk'), \
+                    patch.object(manager, '_commit_changes'), \
+                    patch.object(manager, '_create_tag'):
+                manager.deploy('4.2.0', username='user', password='pass')
+            return manager
+        return deploy
+
+    def commands(self, runner):
+        """Return the svn subcommands run so far."""
+        return [c[0][0][:2] for c in runner.run.call_args_list]
+
+    def test_first_deploy_checks_out_and_keeps_working_copy(self, deploy, runner):
+        """Test an empty cache is filled by a checkout that survives the deploy."""
+        manager = deploy()
+
+        assert self.commands(runner) == [['svn', 'checkout']]
+        assert os.path.isdir(os.path.join(manager._trunk_dir, '.svn'))
+
+    def test_later_deploy_refreshes_working_copy(self, deploy, runner):
+        """Test a cached working copy is cleaned, reverted and updated, not checked out."""
+        manager = deploy()
+        runner.run.reset_mock()
+
+        deploy()
+
+        assert self.commands(runner) == [
+            ['svn', 'cleanup'],
+            ['svn', 'revert'],
+            ['svn', 'cleanup'],
+            ['svn', 'update'],
+            ['svn', 'info'],
+        ]
+        assert all(c.kwargs['cwd'] == manager._trunk_dir for c in runner.run.call_args_list)
+        assert '--remove-unversioned' in runner.run.call_args_list[2][0][0]
+
+    def test_broken_working_copy_is_checked_out_again(self, deploy, runner):
+        """Test a working copy that fails to update is replaced."""
+        manager = deploy()
+        stray = os.path.join(manager._trunk_dir, 'stray.php')
+        open(stray, 'w').close()
+        runner.run.side_effect = [
+            Mock(stdout='', returncode=0),
+            subprocess.CalledProcessError(1, ['svn', 'revert']),
+            Mock(stdout='', returncode=0),
+        ]
+
+        deploy()
+
+        assert self.commands(runner)[-1] == ['svn', 'checkout']
+        assert not os.path.exists(stray)
+
+    def test_working_copy_for_other_url_is_replaced(self, deploy, runner):
+        """Test a working copy pointing elsewhere is not reused."""
+        deploy()
+        runner.info_url = 'https://plugins.svn.wordpress.org/other-plugin/trunk'
+        runner.run.reset_mock()
+
+        with patch('taxjar_release.svn.shutil.rmtree', wraps=shutil.rmtree) as rmtree:
+            deploy()
+
+        rmtree.assert_called_once()
+        assert self.commands(runner)[-1] == ['svn', 'checkout']
+
+    def test_waits_for_lock_until_deadline(self, tmp_path):
+        """Test a held lock is waited on and gives up when the budget runs out."""
+        lock_path = str(tmp_path / 'wc.lock')
+        sleeps = []
+        now = [0.0]
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        with open(lock_path, 'w') as holder:
+            fcntl.flock(holder, fcntl.LOCK_EX)
+            deadline = Deadline(2.5, clock=lambda: now[0])
+            with pytest.raises(DeadlineExceededError):
+                with _exclusive_lock(lock_path, deadline, sleep=sleep):
+                    pass
+
+        assert sleeps == [1.0, 1.0, 0.5]
+
+    def test_lock_released_after_use(self, tmp_path):
+        """Test the lock can be taken again once released."""
+        lock_path = str(tmp_path / 'wc.lock')
 
-        # Only svn status should be called, no add/delete
-        assert mock_runner.run.call_count == 1
+        with _exclusive_lock(lock_path, Deadline()):
+            pass
+        with open(lock_path) as f:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
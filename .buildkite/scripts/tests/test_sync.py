@@ -0,0 +1,218 @@
+"""Tests for the trunk sync engine."""
+import os
+import shutil
+import pytest
+from unittest.mock import patch
+from taxjar_release.manifest import Manifest, ManifestEntry
+from taxjar_release.sync import SyncResult, file_digest, sync_tree
+
+
+def write(path, content=''):
+    """Write a file, creating parent directories."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+@pytest.fixture
+def trees(tmp_path):
+    """Create a source tree and a trunk working copy with matching content."""
+    source = tmp_path / 'src'
+    trunk = tmp_path / 'trunk'
+    for root in (source, trunk):
+        write(root / 'taxjar-woocommerce.php', '<?php // plugin')
+        write(root / 'readme.txt', '=== TaxJar ===')
+        write(root / 'includes' / 'class-taxjar.php', '<?php // class')
+    (trunk / '.svn').mkdir()
+    write(trunk / '.svn' / 'wc.db', 'sqlite')
+    return source, trunk
+
+
+class TestSyncTree:
+    """Tests for sync_tree."""
+
+    def test_identical_trees_unchanged(self, trees):
+        """Test nothing is written when content matches."""
+        source, trunk = trees
+        before = os.stat(trunk / 'readme.txt').st_mtime_ns
+
+        result = sync_tree(str(source), str(trunk))
+
+        assert result == SyncResult(unchanged=3)
+        assert result.changed is False
+        assert os.stat(trunk / 'readme.txt').st_mtime_ns == before
+
+    def test_modified_file_copied(self, trees):
+        """Test a file with different content is rewritten."""
+        source, trunk = trees
+        write(source / 'readme.txt', '=== TaxJar 4.2 ===')
+
+        result = sync_tree(str(source), str(trunk))
+
+        assert result.updated == ['readme.txt']
+        assert result.added == [] and result.deleted == []
+        assert (trunk / 'readme.txt').read_text() == '=== TaxJar 4.2 ==='
+
+    def test_same_size_different_content_detected(self, trees):
+        """Test equal sizes still fall back to comparing hashes."""
+        source, trunk = trees
+        write(source / 'readme.txt', '=== TaxJor ===')
+
+        result = sync_tree(str(source), str(trunk))
+
+        assert result.updated == ['readme.txt']
+
+    def test_matching_size_and_mtime_skip_hashing(self, trees):
+        """Test files with equal size and mtime are not read."""
+        source, trunk = trees
+        for name in ('taxjar-woocommerce.php', 'readme.txt', 'includes/class-taxjar.php'):
+            stat = os.stat(source / name)
+            os.utime(trunk / name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        with patch('taxjar_release.sync.file_digest') as digest:
+            result = sync_tree(str(source), str(trunk))
+
+        digest.assert_not_called()
+        assert result.unchanged == 3
+
+    def test_new_and_removed_paths(self, trees):
+        """Test new directories are listed once and removed files are deleted."""
+        source, trunk = trees
+        write(source / 'assets' / 'js' / 'admin.js', '//')
+        write(source / 'includes' / 'new.php', '<?php')
+        (trunk / 'includes' / 'class-taxjar.php').unlink()
+        write(trunk / 'includes' / 'old.php', '<?php')
+        write(trunk / 'legacy' / 'a.php', '<?php')
+        (source / 'includes' / 'class-taxjar.php').unlink()
+
+        result = sync_tree(str(source), str(trunk))
+
+        assert result.added == ['assets', 'includes/new.php']
+        assert result.deleted == ['includes/old.php', 'legacy']
+        assert (trunk / 'assets' / 'js' / 'admin.js').exists()
+        assert not (trunk / 'legacy').exists()
+
+    def test_hidden_top_level_and_svn_dir_ignored(self, trees):
+        """Test top-level dotfiles are not deployed and .svn is never removed."""
+        source, trunk = trees
+        write(source / '.distignore', 'tests')
+        write(source / 'includes' / '.htaccess', 'deny')
+
+        result = sync_tree(str(source), str(trunk))
+
+        assert result.added == ['includes/.htaccess']
+        assert not (trunk / '.distignore').exists()
+        assert (trunk / '.svn' / 'wc.db').exists()
+
+    def test_file_replaced_by_directory(self, trees):
+        """Test a file becoming a directory is replaced after before_replace sees the file."""
+        source, trunk = trees
+        (source / 'readme.txt').unlink()
+        write(source / 'readme.txt' / 'index.php', '<?php')
+        seen = []
+
+        def before_replace(paths):
+            seen.extend((path, (trunk / path).is_file()) for path in paths)
+
+        result = sync_tree(str(source), str(trunk), before_replace=before_replace)
+
+        assert seen == [('readme.txt', True)]
+        assert result.replaced == ['readme.txt']
+        assert result.added == ['readme.txt']
+        assert result.deleted == []
+        assert (trunk / 'readme.txt' / 'index.php').read_text() == '<?php'
+
+    def test_directory_replaced_by_file(self, trees):
+        """Test a directory becoming a file is replaced after before_replace sees the directory."""
+        source, trunk = trees
+        shutil.rmtree(source / 'includes')
+        write(source / 'includes', 'now a file')
+        seen = []
+
+        def before_replace(paths):
+            seen.extend((path, (trunk / path).is_dir()) for path in paths)
+            # Like svn delete, remove part of the old node.
+            (trunk / 'includes' / 'class-taxjar.php').unlink()
+
+        result = sync_tree(str(source), str(trunk), before_replace=before_replace)
+
+        assert seen == [('includes', True)]
+        assert result.replaced == ['includes']
+        assert result.added == ['includes']
+        assert result.deleted == []
+        assert (trunk / 'includes').read_text() == 'now a file'
+
+    def test_copied_files_keep_mtime(self, trees):
+        """Test copied files take the source mtime so a resync skips them."""
+        source, trunk = trees
+        write(source / 'includes' / 'new.php', '<?php')
+
+        sync_tree(str(source), str(trunk))
+
+        assert (os.stat(trunk / 'includes' / 'new.php').st_mtime_ns
+                == os.stat(source / 'includes' / 'new.php').st_mtime_ns)
+
+    def test_manifest_limits_deployed_files(self, trees):
+        """Test only manifest files are deployed and the rest removed from trunk."""
+        source, trunk = trees
+        write(source / 'tests' / 'test-plugin.php', '<?php')
+        write(source / 'assets' / 'icon.png', 'png')
+        write(source / 'assets' / 'source.psd', 'psd')
+        paths = ['taxjar-woocommerce.php', 'includes/class-taxjar.php', 'assets/icon.png']
+        manifest = Manifest(
+            ManifestEntry(path, os.path.getsize(source / path), file_digest(str(source / path)))
+            for path in paths
+        )
+
+        result = sync_tree(str(source), str(trunk), manifest)
+
+        assert result.added == ['assets']
+        assert result.deleted == ['readme.txt']
+        assert (trunk / 'assets' / 'icon.png').exists()
+        assert not (trunk / 'assets' / 'source.psd').exists()
+        assert not (trunk / 'tests').exists()
+
+    def test_manifest_hash_used_for_source(self, trees):
+        """Test the source is not hashed again when the manifest has its digest."""
+        source, trunk = trees
+        path = 'readme.txt'
+        manifest = Manifest([ManifestEntry(path, os.path.getsize(source / path), file_digest(str(source / path)))])
+        os.utime(trunk / path, ns=(0, 0))
+
+        with patch('taxjar_release.sync.file_digest', wraps=file_digest) as digest:
+            sync_tree(str(source), str(trunk), manifest)
+
+        digest.assert_called_once_with(os.path.join(str(trunk), path))
+
+    def test_serial_and_parallel_agree(self, trees, tmp_path):
+        """Test the result does not depend on the number of workers."""
+        source, trunk = trees
+        for i in range(20):
+            write(source / 'includes' / f'class-{i}.php', f'<?php // {i}')
+        write(source / 'readme.txt', '=== TaxJar 4.2 ===')
+        other = tmp_path / 'other'
+        shutil.copytree(trunk, other)
+
+        serial = sync_tree(str(source), str(trunk), max_workers=1)
+        parallel = sync_tree(str(source), str(other), max_workers=8)
+
+        assert serial == parallel
+        assert serial.updated == ['readme.txt']
+        assert len(serial.added) == 20
+
+    def test_new_directory_files_keep_mtime(self, trees):
+        """Test files staged into a new directory keep their source mtime."""
+        source, trunk = trees
+        write(source / 'assets' / 'js' / 'admin.js', '//')
+
+        sync_tree(str(source), str(trunk))
+
+        assert (os.stat(trunk / 'assets' / 'js' / 'admin.js').st_mtime_ns
+                == os.stat(source / 'assets' / 'js' / 'admin.js').st_mtime_ns)
+
+
+def test_file_digest(tmp_path):
+    """Test file_digest hashes file content."""
+    path = write(tmp_path / 'a.txt', 'abc')
+
+    assert file_digest(str(path)) == 'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad'
@@ -0,0 +1,149 @@
+"""Tests for span tracing."""
+import json
+import subprocess
+import pytest
+from unittest.mock import Mock, patch
+from taxjar_release.tracing import Tracer, describe_command, get_tracer, set_tracer
+from taxjar_release.retry import retry
+from taxjar_release.clients.subprocess_runner import SubprocessRunner
+from taxjar_release.cli import main
+
+
+@pytest.fixture
+def tracer():
+    """Install an enabled tracer for the duration of a test."""
+    tracer = Tracer(enabled=True)
+    previous = set_tracer(tracer)
+    yield tracer
+    set_tracer(previous)
+
+
+class TestTracer:
+    """Tests for Tracer."""
+
+    def test_disabled_tracer_records_nothing(self):
+        """Test a disabled tracer records no events."""
+        tracer = Tracer(enabled=False)
+
+        with tracer.span('work', 'subprocess') as span:
+            span['exit_code'] = 0
+
+        assert tracer.events == []
+
+    def test_span_records_complete_event(self):
+        """Test span records name, category, duration and args."""
+        tracer = Tracer(enabled=True)
+
+        with tracer.span('svn status', 'subprocess', cmd=['svn', 'status']) as span:
+            span['exit_code'] = 0
+
+        event = tracer.events[0]
+        assert event['name'] == 'svn status'
+        assert event['cat'] == 'subprocess'
+        assert event['ph'] == 'X'
+        assert event['dur'] >= 0
+        assert event['args'] == {'cmd': ['svn', 'status'], 'exit_code': 0}
+
+    def test_span_records_error(self):
+        """Test exceptions are recorded and re-raised."""
+        tracer = Tracer(enabled=True)
+
+        with pytest.raises(ValueError):
+            with tracer.span('fails', 'git'):
+                raise ValueError('boom')
+
+        assert tracer.events[0]['args']['error'] == 'ValueError'
+
+    def test_stage_is_attached_to_nested_spans(self):
+        """Test spans inside a stage carry the stage name."""
+        tracer = Tracer(enabled=True)
+
+        with tracer.stage('commit'):
+            with tracer.span('svn commit', 'subprocess'):
+                pass
+
+        span, stage = tracer.events
+        assert span['args']['stage'] == 'commit'
+        assert stage['cat'] == 'stage'
+        assert stage['name'] == 'commit'
+        assert tracer.current_stage is None
+
+    def test_counter_event(self):
+        """Test counters are recorded as counter events."""
+        tracer = Tracer(enabled=True)
+
+        tracer.counter('blob_cache', {'hits': 2, 'misses': 1})
+
+        assert tracer.events[0]['ph'] == 'C'
+        assert tracer.events[0]['args'] == {'hits': 2, 'misses': 1}
+
+    def test_write_chrome_trace(self, tmp_path):
+        """Test trace is written as Chrome trace JSON."""
+        tracer = Tracer(enabled=True)
+        with tracer.span('work', 'http'):
+            pass
+
+        path = tmp_path / 'trace.json'
+        tracer.write(str(path))
+
+        data = json.loads(path.read_text())
+        assert data['traceEvents'][0]['name'] == 'work'
+
+    def test_describe_command(self):
+        """Test span names use program and subcommands."""
+        assert describe_command(['svn', 'commit', '--quiet', '-m', 'x']) == 'svn commit'
+        assert describe_command(['/usr/bin/gh', 'release', 'create', '4.2.0']) == 'gh release create'
+
+
+class TestInstrumentation:
+    """Tests for instrumented external calls."""
+
+    def test_subprocess_runner_records_span(self, tracer):
+        """Test SubprocessRunner.run records exit code and output size."""
+        SubprocessRunner().run(['echo', 'hello'])
+
+        event = tracer.events[0]
+        assert event['cat'] == 'subprocess'
+        assert event['args']['exit_code'] == 0
+        assert event['args']['output_bytes'] == len('hello\n')
+
+    def test_subprocess_runner_records_failure(self, tracer):
+        """Test failing commands still record their exit code."""
+        with pytest.raises(subprocess.CalledProcessError):
+            SubprocessRunner().run(['false'])
+
+        assert tracer.events[0]['args']['exit_code'] == 1
+
+    def test_retry_records_each_attempt(self, tracer):
+        """Test every retry attempt gets its own span."""
+        func = Mock(side_effect=[Exception('fail'), 'ok'])
+
+        @retry(max_attempts=2, backoff=[0])
+        def flaky():
+            return func()
+
+        flaky()
+
+        attempts = [e for e in tracer.events if e['cat'] == 'retry']
+        assert [e['args']['attempt'] for e in attempts] == [1, 2]
+        assert attempts[0]['args']['error'] == 'Exception'
+
+
+class TestCLITrace:
+    """Tests for the --trace option."""
+
+    def test_trace_file_written(self, tmp_path):
+        """Test --trace writes a trace including the command stage."""
+        path = tmp_path / 'trace.json'
+
+        with patch('taxjar_release.cli.VersionValidator') as MockValidator:
+            MockValidator.return_value.validate.return_value = Mock(success=True)
+            with patch('taxjar_release.cli.GitClient'):
+                with patch('taxjar_release.cli.BuildkiteClient') as MockBuildkite:
+                    MockBuildkite.return_value.close.return_value = []
+                    result = main(['--trace', str(path), 'validate-version'])
+
+        assert result == 0
+        data = json.loads(path.read_text())
+        assert any(e['name'] == 'validate-version' for e in data['traceEvents'])
+        assert get_tracer().enabled is False
@@ -59,7 +59,9 @@ class TestVersionValidation:
     @pytest.fixture
     def mock_git(self):
         """Create mock git client."""
-        return Mock()
+        mock_git = Mock()
+        mock_git.paths_unchanged.return_value = False
+        return mock_git
 
     @pytest.fixture
     def mock_buildkite(self):
@@ -126,3 +128,47 @@ class TestVersionValidation:
 
         assert result.success is True
         assert len(result.errors) == 0
+
+    def test_full_validation_when_comparison_ref_unavailable(self, mock_git, mock_buildkite, capsys):
+        """Test validation runs, and says why, when origin/master cannot be fetched."""
+        mock_git.ensure_ref.return_value = False
+        mock_git.get_file_content.side_effect = lambda filepath, ref='HEAD': {
+            'taxjar-woocommerce.php': generate_plugin_header(version='4.2.0'),
+            'readme.txt': generate_readme(stable_tag='4.2.0'),
+            'CHANGELOG.md': generate_changelog(version='4.2.0'),
+        }[filepath]
+
+        validator = VersionValidator(mock_git, mock_buildkite)
+        result = validator.validate()
+
+        assert result.success is True
+        assert 'origin/master unavailable' in capsys.readouterr().out
+        mock_git.ensure_ref.assert_called_once_with('origin/master', ['taxjar-woocommerce.php'])
+
+    def test_fast_path_skips_content_reads(self, mock_git, mock_buildkite):
+        """Test unchanged version files skip validation without reading them."""
+        mock_git.get_current_branch.return_value = 'feature/x'
+        mock_git.merge_base.return_value = 'abc123'
+        mock_git.paths_unchanged.return_value = True
+
+        validator = VersionValidator(mock_git, mock_buildkite)
+        result = validator.validate()
+
+        assert result.success is True
+        mock_git.paths_unchanged.assert_called_once_with(
+            ('taxjar-woocommerce.php', 'readme.txt', 'CHANGELOG.md'), 'abc123', 'HEAD',
+        )
+        mock_git.get_file_content.assert_not_called()
+
+    def test_no_merge_base_falls_back_to_content(self, mock_git, mock_buildkite):
+        """Test missing shared history falls back to comparing versions."""
+        mock_git.get_current_branch.return_value = 'feature/x'
+        mock_git.merge_base.return_value = None
+        mock_git.get_file_content.return_value = generate_plugin_header(version='4.1.0')
+
+        validator = VersionValidator(mock_git, mock_buildkite)
+        result = validator.validate()
+
+        assert result.success is True
+        mock_git.paths_unchanged.assert_not_called()
+        assert mock_git.get_file_content.call_count == 2
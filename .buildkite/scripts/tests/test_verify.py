@@ -0,0 +1,221 @@
+"""Tests for ReleaseVerifier."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from unittest.mock import Mock, patch
+from taxjar_release.cli import main
+from taxjar_release.clients.wordpress import WordPressClient
+from taxjar_release.deadline import Deadline
+from taxjar_release.verify import ReleaseVerifier
+
+
+SLUG = ReleaseVerifier.PLUGIN_SLUG
+
+
+class StandInWordPress(BaseHTTPRequestHandler):
+    """Serves the plugin info API and SVN tags from server state."""
+
+    def do_GET(self):
+        state = self.server.state
+        state['requests'].append(self.path)
+        if self.path != f'/plugins/info/1.0/{SLUG}.json':
+            self.send_error(404)
+            return
+
+        version = state['version']
+        etag = f'"{version}"'
+        if self.headers.get('If-None-Match') == etag:
+            state['not_modified'] += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        body = json.dumps({'version': version, 'sections': {'changelog': 'x' * 4096}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        state = self.server.state
+        state['requests'].append(self.path)
+        exists = self.path == f'/svn/{SLUG}/tags/{state["tag"]}/'
+        self.send_response(200 if exists else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Run a stand-in WordPress.org on a local port."""
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInWordPress)
+    httpd.state = {'version': '4.1.0', 'tag': '4.1.0', 'requests': [], 'not_modified': 0}
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client(server, monkeypatch):
+    """Create a WordPressClient pointed at the stand-in server."""
+    monkeypatch.delenv('RELEASE_TOOL_CACHE_DIR', raising=False)
+    base = f'http://127.0.0.1:{server.server_port}'
+    return WordPressClient(api_base=f'{base}/plugins/info/1.0', svn_base=f'{base}/svn')
+
+
+class TestReleaseVerifier:
+    """Tests for ReleaseVerifier against a local server."""
+
+    def test_returns_when_version_visible(self, server, client):
+        """Test verification stops on the first check that sees the version."""
+        server.state.update(version='4.2.0', tag='4.2.0')
+        verifier = ReleaseVerifier(client, initial_delay=0.01)
+
+        result = verifier.verify('4.2.0', Deadline(5))
+
+        assert result.success is True
+        assert result.checks == 1
+        assert result.api_latency is not None
+        assert result.tag_latency is not None
+
+    def test_polls_until_propagated(self, server, client):
+        """Test polling uses conditional requests until the version appears."""
+        server.state['tag'] = '4.2.0'
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                server.state['version'] = '4.2.0'
+
+        verifier = ReleaseVerifier(client, initial_delay=1, sleep=sleep, jitter=lambda: 1.0)
+        result = verifier.verify('4.2.0', Deadline(60))
+
+        assert result.success is True
+        assert result.checks == 4
+        assert sleeps == [1, 2, 4]
+        assert server.state['not_modified'] == 2
+        # The tag is found once and not probed again.
+        assert sum('/tags/' in path for path in server.state['requests']) == 1
+
+    def test_gives_up_at_deadline(self, server, client):
+        """Test verification reports failure once the deadline passes."""
+        verifier = ReleaseVerifier(client, initial_delay=0.01, max_delay=0.02)
+
+        result = verifier.verify('4.2.0', Deadline(0.2))
+
+        assert result.success is False
+        assert result.tag_latency is None
+        assert 'not yet visible' in result.message
+        assert result.checks > 1
+
+    def test_request_errors_keep_polling(self, client):
+        """Test failed checks count as not visible."""
+        wordpress = Mock(spec=WordPressClient)
+        wordpress.timeout = (5, 20)
+        wordpress.tag_exists.return_value = True
+        wordpress.get_plugin_version.side_effect = [ConnectionError('reset'), '4.2.0']
+        verifier = ReleaseVerifier(wordpress, sleep=lambda seconds: None)
+
+        result = verifier.verify('4.2.0', Deadline(60))
+
+        assert result.success is True
+        assert result.checks == 2
+
+    def test_sleep_capped_by_deadline(self):
+        """Test the last pause never runs past the deadline."""
+        wordpress = Mock(spec=WordPressClient)
+        wordpress.timeout = (5, 20)
+        wordpress.tag_exists.return_value = False
+        wordpress.get_plugin_version.return_value = '4.1.0'
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        clock = lambda: now[0]
+        verifier = ReleaseVerifier(wordpress, initial_delay=4, clock=clock, sleep=sleep, jitter=lambda: 1.0)
+        result = verifier.verify('4.2.0', Deadline(10, clock=clock))
+
+        assert result.success is False
+        assert sleeps == [4, 6]
+
+    def test_request_timeouts_capped_by_deadline(self):
+        """Test no request may wait longer than the time left."""
+        wordpress = Mock(spec=WordPressClient)
+        wordpress.timeout = (5, 20)
+        wordpress.tag_exists.return_value = False
+        wordpress.get_plugin_version.return_value = '4.1.0'
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        clock = lambda: now[0]
+        verifier = ReleaseVerifier(wordpress, initial_delay=8, clock=clock, sleep=sleep, jitter=lambda: 1.0)
+        verifier.verify('4.2.0', Deadline(11, clock=clock))
+
+        tag_timeouts = [call.kwargs['timeout'] for call in wordpress.tag_exists.call_args_list]
+        api_timeouts = [call.kwargs['timeout'] for call in wordpress.get_plugin_version.call_args_list]
+        assert tag_timeouts == [(5, 11), (3, 3)]
+        assert api_timeouts == [(5, 11), (3, 3)]
+
+    def test_no_request_after_deadline(self):
+        """Test an expired deadline stops checks without sending requests."""
+        wordpress = Mock(spec=WordPressClient)
+        wordpress.timeout = (5, 20)
+        now = [0.0]
+        verifier = ReleaseVerifier(wordpress, clock=lambda: now[0])
+
+        result = verifier.verify('4.2.0', Deadline(0, clock=lambda: now[0]))
+
+        assert result.success is False
+        wordpress.tag_exists.assert_not_called()
+        wordpress.get_plugin_version.assert_not_called()
+
+    def test_verify_session_does_not_retry(self):
+        """Test the command's client leaves retrying to the verifier."""
+        with patch('taxjar_release.cli.ReleaseVerifier') as MockVerifier:
+            MockVerifier.return_value.verify.return_value = Mock(success=False, message='not yet visible')
+            main(['verify-release', '--version', '4.2.0', '--timeout', '30'])
+
+        wordpress = MockVerifier.call_args.args[0]
+        assert wordpress.session.get_adapter('https://api.wordpress.org').max_retries.total == 0
+
+
+class TestVerifyReleaseCommand:
+    """Tests for the verify-release command."""
+
+    def test_requires_version(self):
+        """Test verify-release fails without a version."""
+        with patch.dict('os.environ', {}, clear=True):
+            assert main(['verify-release']) == 1
+
+    def test_reports_latency(self, capsys):
+        """Test the command prints the propagation latency and links."""
+        with patch('taxjar_release.cli.WordPressClient'), \
+                patch('taxjar_release.cli.ReleaseVerifier') as MockVerifier:
+            MockVerifier.return_value.verify.return_value = Mock(
+                success=True, message='Version 4.2.0 is live on WordPress.org after 3.0s (2 checks)',
+                tag_latency=0.5,
+            )
+            MockVerifier.PLUGIN_SLUG = SLUG
+
+            result = main(['verify-release', '--version', '4.2.0', '--timeout', '30'])
+
+        output = capsys.readouterr().out
+        assert result == 0
+        assert '+++ Version 4.2.0 is live on WordPress.org after 3.0s' in output
+        assert 'SVN tag 4.2.0 visible after 0.5s' in output
+        assert 'releases/tag/4.2.0' in output
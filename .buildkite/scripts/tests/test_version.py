@@ -6,6 +6,7 @@ from taxjar_release.version import VersionDetector, VersionDetectionResult
 from taxjar_release.clients.git import GitClient
 from taxjar_release.clients.buildkite import BuildkiteClient
 from taxjar_release.clients.wordpress import WordPressClient
+from taxjar_release.exceptions import BuildkiteError, WordPressAPIError
 from tests.fixtures.plugin_files import generate_plugin_header
 
 
@@ -35,6 +36,18 @@ class TestVersionDetector:
         assert result.version == '4.2.0'
         assert result.success is True
 
+    def test_detect_fails_when_wporg_unreachable(self, mock_git, mock_buildkite, mock_wordpress):
+        """Test an API failure fails detection instead of releasing again."""
+        mock_git.get_file_content.return_value = generate_plugin_header(version='4.2.0')
+        mock_wordpress.version_exists.side_effect = WordPressAPIError('timed out')
+
+        detector = VersionDetector(mock_git, mock_buildkite, mock_wordpress)
+        result = detector.detect()
+
+        assert result.success is False
+        assert result.should_skip is False
+        mock_buildkite.set_metadata.assert_not_called()
+
     def test_detect_version_exists_on_wporg(self, mock_git, mock_buildkite, mock_wordpress):
         """Test detection when version exists on WordPress.org."""
         mock_git.get_file_content.return_value = generate_plugin_header(version='4.2.0')
@@ -68,7 +81,21 @@ class TestVersionDetector:
         detector = VersionDetector(mock_git, mock_buildkite, mock_wordpress)
         detector.detect()
 
-        mock_buildkite.set_metadata.assert_called_with('release-version', '4.2.0')
+        mock_buildkite.set_metadata.assert_called_with('release-version', '4.2.0', required=True)
+
+    @pytest.mark.parametrize('exists', [True, False])
+    def test_detect_fails_when_metadata_not_written(self, mock_git, mock_buildkite, mock_wordpress, exists):
+        """Test a failed SKIP_RELEASE or release-version write fails detection."""
+        mock_git.get_file_content.return_value = generate_plugin_header(version='4.2.0')
+        mock_wordpress.version_exists.return_value = exists
+        mock_buildkite.set_metadata.side_effect = BuildkiteError('agent unreachable')
+
+        detector = VersionDetector(mock_git, mock_buildkite, mock_wordpress)
+        with patch.dict('os.environ', {}, clear=True):
+            result = detector.detect()
+
+        assert result.success is False
+        assert result.should_skip is exists
 
     def test_detect_fails_on_missing_version(self, mock_git, mock_buildkite, mock_wordpress):
         """Test detection fails when version cannot be extracted."""
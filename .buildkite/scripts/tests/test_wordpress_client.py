@@ -1,7 +1,14 @@
 """Tests for WordPressClient."""
+import threading
+import time
 import pytest
+import requests
+from unittest.mock import Mock
 import responses
-from taxjar_release.clients.wordpress import WordPressClient
+from taxjar_release.clients.wordpress import WordPressClient, get_session, transport_retry
+from taxjar_release.exceptions import WordPressAPIError
+from taxjar_release.svn import SVNDeployManager
+from taxjar_release.version import VersionDetector
 
 
 class TestWordPressClient:
@@ -69,7 +76,7 @@ class TestWordPressClient:
 
     @responses.activate
     def test_version_exists_api_error(self):
-        """Test version_exists returns False on API error."""
+        """Test version_exists reports API errors instead of returning False."""
         responses.add(
             responses.GET,
             'https://api.wordpress.org/plugins/info/1.0/test-plugin.json',
@@ -78,6 +85,180 @@ class TestWordPressClient:
         )
 
         client = WordPressClient()
-        exists = client.version_exists('test-plugin', '4.1.0')
 
-        assert exists is False
+        with pytest.raises(WordPressAPIError):
+            client.version_exists('test-plugin', '4.1.0')
+
+    @responses.activate
+    def test_connection_error_reported(self):
+        """Test transport failures raise WordPressAPIError."""
+        responses.add(
+            responses.GET,
+            'https://api.wordpress.org/plugins/info/1.0/test-plugin.json',
+            body=requests.ConnectionError('connection reset'),
+        )
+
+        client = WordPressClient()
+
+        with pytest.raises(WordPressAPIError):
+            client.get_plugin_version('test-plugin')
+
+    @responses.activate
+    def test_requests_use_timeouts(self):
+        """Test every request carries connect and read timeouts."""
+        responses.add(
+            responses.GET,
+            'https://api.wordpress.org/plugins/info/1.0/test-plugin.json',
+            json={'version': '4.1.0'},
+        )
+        responses.add(
+            responses.HEAD,
+            'https://plugins.svn.wordpress.org/test-plugin/tags/4.1.0/',
+        )
+
+        client = WordPressClient(timeout=(1, 2))
+        client.get_plugin_version('test-plugin')
+        client.tag_exists('test-plugin', '4.1.0')
+
+        assert [call.request.req_kwargs['timeout'] for call in responses.calls] == [(1, 2), (1, 2)]
+
+    @responses.activate
+    def test_tag_exists_true(self):
+        """Test tag_exists when the SVN tag directory exists."""
+        responses.add(
+            responses.HEAD,
+            'https://plugins.svn.wordpress.org/test-plugin/tags/4.1.0/',
+            status=200,
+        )
+
+        client = WordPressClient()
+
+        assert client.tag_exists('test-plugin', '4.1.0') is True
+
+    @responses.activate
+    def test_tag_exists_false(self):
+        """Test tag_exists when the SVN tag directory is missing."""
+        responses.add(
+            responses.HEAD,
+            'https://plugins.svn.wordpress.org/test-plugin/tags/4.2.0/',
+            status=404,
+        )
+
+        client = WordPressClient()
+
+        assert client.tag_exists('test-plugin', '4.2.0') is False
+
+
+class TestVersionExists:
+    """Tests for the concurrent version_exists lookup."""
+
+    API_URL = 'https://api.wordpress.org/plugins/info/1.0/test-plugin.json'
+    TAG_URL = 'https://plugins.svn.wordpress.org/test-plugin/tags/4.0.0/'
+
+    @responses.activate
+    def test_older_tag_exists(self):
+        """Test a tagged version that is no longer current still exists."""
+        responses.add(responses.GET, self.API_URL, json={'version': '4.1.0'})
+        responses.add(responses.HEAD, self.TAG_URL, status=200)
+
+        assert WordPressClient().version_exists('test-plugin', '4.0.0') is True
+
+    @responses.activate
+    def test_missing_tag_is_definitive(self):
+        """Test a missing tag means the version does not exist."""
+        responses.add(responses.GET, self.API_URL, json={'version': '4.1.0'})
+        responses.add(responses.HEAD, self.TAG_URL, status=404)
+
+        assert WordPressClient().version_exists('test-plugin', '4.0.0') is False
+
+    @responses.activate
+    def test_falls_back_to_api_when_svn_fails(self):
+        """Test the API answer is used if the tag lookup errors."""
+        responses.add(responses.GET, self.API_URL, json={'version': '4.0.0'})
+        responses.add(responses.HEAD, self.TAG_URL, status=503)
+
+        assert WordPressClient().version_exists('test-plugin', '4.0.0') is True
+
+    @responses.activate
+    def test_api_answer_used_when_tag_lookup_fails(self):
+        """Test the API mismatch answers when the SVN lookup fails."""
+        responses.add(responses.GET, self.API_URL, json={'version': '4.1.0'})
+        responses.add(responses.HEAD, self.TAG_URL, status=503)
+
+        assert WordPressClient().version_exists('test-plugin', '4.0.0') is False
+
+    @responses.activate
+    def test_both_lookups_failing_raises(self):
+        """Test an error is reported when nothing could be checked."""
+        responses.add(responses.GET, self.API_URL, status=500)
+        responses.add(responses.HEAD, self.TAG_URL, status=503)
+
+        with pytest.raises(WordPressAPIError):
+            WordPressClient().version_exists('test-plugin', '4.0.0')
+
+    def test_tag_hit_does_not_wait_for_api(self):
+        """Test a tag hit returns without waiting for the API."""
+        release = threading.Event()
+        client = WordPressClient()
+        client.tag_exists = Mock(return_value=True)
+        client.get_plugin_version = Mock(side_effect=lambda slug: release.wait(5) and '4.1.0')
+
+        start = time.monotonic()
+        try:
+            assert client.version_exists('test-plugin', '4.0.0') is True
+            assert time.monotonic() - start < 1
+        finally:
+            release.set()
+
+    @pytest.mark.parametrize('first', ['tag', 'api'])
+    def test_missing_tag_wins_regardless_of_order(self, first):
+        """Test an untagged current version does not exist, whichever lookup finishes first."""
+        tag_done = threading.Event()
+        api_done = threading.Event()
+
+        def tag_exists(slug, version):
+            if first == 'api':
+                api_done.wait(5)
+            tag_done.set()
+            return False
+
+        def get_plugin_version(slug):
+            if first == 'tag':
+                tag_done.wait(5)
+            api_done.set()
+            return '4.0.0'
+
+        client = WordPressClient()
+        client.tag_exists = Mock(side_effect=tag_exists)
+        client.get_plugin_version = Mock(side_effect=get_plugin_version)
+
+        assert client.version_exists('test-plugin', '4.0.0') is False
+
+    def test_tag_url_matches_svn_deploy(self):
+        """Test the lookup uses the repository svn-deploy commits to."""
+        assert f'{WordPressClient.SVN_BASE}/{VersionDetector.PLUGIN_SLUG}' == SVNDeployManager.SVN_URL
+
+
+class TestWordPressTransport:
+    """Tests for the shared WordPress.org transport."""
+
+    def test_session_shared_per_process(self):
+        """Test clients reuse one pooled session."""
+        assert WordPressClient().session is WordPressClient().session is get_session()
+
+    def test_retry_policy(self):
+        """Test only idempotent requests on 429/5xx are retried."""
+        retry = WordPressClient().session.get_adapter('https://api.wordpress.org').max_retries
+
+        assert retry.total == transport_retry().total
+        assert 429 in retry.status_forcelist
+        assert 503 in retry.status_forcelist
+        assert retry.allowed_methods == frozenset({'GET', 'HEAD'})
+        assert retry.respect_retry_after_header is True
+        assert retry.is_retry('POST', 503) is False
+
+    def test_retry_after_capped(self):
+        """Test a long Retry-After does not stall the release."""
+        response = Mock(headers={'Retry-After': '3600'})
+
+        assert transport_retry().get_retry_after(response) == 30